@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+"""
+Общие помощники backend-скриптов: атомарная запись файлов и пулы процессов
+Временные файлы получают уникальные имена, поэтому параллельные писатели (--watch и pipeline.py) не мешают друг другу
+"""
+
+import os
+import json
+import tempfile
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+def temp_path_for(path):
+    """Создать уникальный временный файл рядом с path и вернуть (fd, путь)"""
+    directory = os.path.dirname(path) or '.'
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(prefix=f".{os.path.basename(path)}.", suffix='.tmp', dir=directory)
+    # mkstemp creates 0600 files; the site serves news.json, team.json and the shards to other users
+    os.fchmod(fd, 0o644)
+    return fd, tmp_path
+
+def write_bytes_atomic(path, data: bytes):
+    """Записать файл атомарно: читатель видит либо старую, либо новую версию"""
+    fd, tmp_path = temp_path_for(path)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+def write_json_atomic(path, data, indent=2, separators=None):
+    """Записать JSON во временный файл и атомарно подменить им path"""
+    fd, tmp_path = temp_path_for(path)
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=indent, separators=separators)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+def process_pool(max_workers):
+    """Пул процессов, безопасный для вызова из рабочих потоков pipeline.py"""
+    # Forking from a worker thread while another stage holds torch/numba locks can deadlock the child
+    return ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context('forkserver'))
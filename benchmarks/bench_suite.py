@@ -0,0 +1,378 @@
+#!/usr/bin/env python3
+"""
+Набор бенчмарков этапов публикаций и новостей на синтетических корпусах с сохранением baseline
+Запуск: python benchmarks/bench_suite.py [--cases parse fetch json umap news] [--save default | --compare default]
+
+Каждый прогон выполняется в отдельном процессе в своём рабочем каталоге: время (wall/CPU)
+и пиковый RSS относятся к одному этапу, а не к накопленному состоянию интерпретатора.
+PubMed заменён записанными ответами efetch/esearch (режим replay), эмбеддинги - детерминированными
+векторами, заранее положенными в кэш эмбеддингов. Случаи parse_article и json_legacy прогоняют прежние
+реализации из reference.py для сравнения с parse и json_build.
+"""
+
+import os
+import io
+import sys
+import json
+import time
+import shutil
+import platform
+import argparse
+import resource
+import tempfile
+import contextlib
+import subprocess
+from datetime import datetime
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+from synthetic import (synthetic_publications, synthetic_embeddings, write_synthetic_efetch,
+                       write_synthetic_news, record_pubmed_replay)
+import reference
+import update_publications_backend as backend
+import update_news_backend as news_backend
+
+BASELINES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines")
+PUBLICATION_SIZES = [500, 5000, 50000]
+NEWS_SIZES = [100, 5000]
+DEFAULT_TOLERANCE = 0.25  # Allowed slowdown / memory growth before a case counts as a regression
+METRICS = {'wall_s': 0.05, 'cpu_s': 0.05, 'peak_rss_mb': 5.0}  # metric -> absolute change treated as noise
+
+
+# ==================== CASES ====================
+# prepare(size) runs once in the suite process and writes the inputs into the current directory,
+# load(size) runs in the benchmark process before timing, run(inputs) is the timed stage.
+
+def prepare_efetch(size):
+    """Ответ efetch из size статей"""
+    write_synthetic_efetch("efetch.xml", size)
+
+
+def load_path(size):
+    """Путь к подготовленному ответу efetch"""
+    return "efetch.xml"
+
+
+def run_parse(path):
+    """Потоковый парсер iter_pubmed_records"""
+    with open(path, 'rb') as f:
+        return {'records': sum(1 for _ in backend.iter_pubmed_records(f))}
+
+
+def run_parse_article(path):
+    """Entrez.read + прежний parse_article"""
+    from Bio import Entrez
+    with open(path, 'rb') as f:
+        data = Entrez.read(f)
+    records = [r for r in map(reference.parse_article, data['PubmedArticle']) if r is not None]
+    return {'records': len(records)}
+
+
+def prepare_fetch(size):
+    """Записать ответы Entrez за все годы полного обновления"""
+    years = list(range(backend.FIRST_YEAR, datetime.now().year + 1))
+    record_pubmed_replay(backend, os.path.abspath("replay"), size, years)
+
+
+def load_replay(size):
+    """Включить режим replay: ни одного запроса в сеть"""
+    backend.configure_entrez_cache(enabled=False, replay_dir=os.path.abspath("replay"))
+
+
+def run_fetch(_):
+    """get_articles_by_year по всем годам (update_publications_full)"""
+    df, years = backend.update_publications_full()
+    return {'records': 0 if df is None else len(df), 'years': len(years)}
+
+
+def prepare_publications(size):
+    """Датасет публикаций"""
+    synthetic_publications(size).to_pickle("publications.pkl")
+
+
+def load_publications(size):
+    """Загрузить датасет публикаций"""
+    import pandas as pd
+    return pd.read_pickle("publications.pkl")
+
+
+def run_json(df):
+    """generate_publications_json: шарды по годам"""
+    output_data = backend.generate_publications_json(df)
+    return {'records': output_data['total_publications']}
+
+
+def run_json_build(df):
+    """build_publications_data: колоночная сборка без записи файлов"""
+    return {'records': backend.build_publications_data(df)['total_publications']}
+
+
+def run_json_legacy(df):
+    """Прежняя сборка по годам через iterrows"""
+    return {'records': sum(len(items) for items in reference.build_publications_by_year(df).values())}
+
+
+def prepare_umap(size):
+    """Датасет публикаций и кэш эмбеддингов для всех его текстов"""
+    prepare_publications(size)
+    encode_texts = backend.encode_texts
+    backend.encode_texts = synthetic_embeddings
+    try:
+        backend.embed_corpus(load_publications(size))
+    finally:
+        backend.encode_texts = encode_texts
+
+
+def run_umap(df):
+    """generate_umap_visualization с холодным UMAP reducer и тёплым кэшем эмбеддингов"""
+    backend.generate_umap_visualization(df)
+    return {'records': len(df)}
+
+
+def prepare_news(size):
+    """Каталог markdown новостей"""
+    write_synthetic_news(news_backend.NEWS_DIR, size)
+
+
+def prepare_news_warm(size):
+    """Каталог новостей и манифест после первой сборки"""
+    prepare_news(size)
+    news_backend.generate_news_json()
+
+
+def run_news(_):
+    """generate_news_json"""
+    news_backend.generate_news_json()
+    with open(news_backend.OUTPUT_JSON, 'r', encoding='utf-8') as f:
+        return {'records': json.load(f)['total_news']}
+
+
+# name -> (sizes, prepare, load, run, paths removed before every repeat)
+CASES = {
+    'parse': (PUBLICATION_SIZES, prepare_efetch, load_path, run_parse, []),
+    'parse_article': (PUBLICATION_SIZES, prepare_efetch, load_path, run_parse_article, []),
+    'fetch': (PUBLICATION_SIZES, prepare_fetch, load_replay, run_fetch, [".cache/journal_index.pkl"]),
+    'json': (PUBLICATION_SIZES, prepare_publications, load_publications, run_json, ["frontend/public/publications"]),
+    'json_build': (PUBLICATION_SIZES, prepare_publications, load_publications, run_json_build, []),
+    'json_legacy': (PUBLICATION_SIZES, prepare_publications, load_publications, run_json_legacy, []),
+    'umap': (PUBLICATION_SIZES, prepare_umap, load_publications, run_umap, [".cache/umap_3d.pkl"]),
+    'news': (NEWS_SIZES, prepare_news, lambda size: None, run_news,
+             [".cache/news_manifest.json", ".cache/image_manifest.json", "frontend/public/data/derived"]),
+    'news_warm': (NEWS_SIZES, prepare_news_warm, lambda size: None, run_news, []),
+}
+
+
+# ==================== MEASUREMENT ====================
+def proc_status_mb(field):
+    """Поле VmRSS/VmHWM из /proc/self/status в МБ; None там, где /proc нет"""
+    try:
+        with open('/proc/self/status', 'r') as f:
+            for line in f:
+                if line.startswith(field + ':'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+def reset_peak_rss():
+    """Сбросить VmHWM до текущего RSS (Linux): пик считается только за время этапа"""
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+    except OSError:
+        pass
+
+
+def peak_rss_mb():
+    """Пиковый RSS в МБ. ru_maxrss на Linux наследуется через exec от родителя,
+    поэтому он используется только там, где нет /proc"""
+    peak = proc_status_mb('VmHWM')
+    if peak is not None:
+        return peak
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return maxrss / 1024 / 1024 if sys.platform == 'darwin' else maxrss / 1024
+
+
+def cpu_seconds():
+    """CPU время процесса и завершённых дочерних процессов (пулы рендеринга)"""
+    self_usage = resource.getrusage(resource.RUSAGE_SELF)
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return self_usage.ru_utime + self_usage.ru_stime + children.ru_utime + children.ru_stime
+
+
+def measure_case(name, size):
+    """Выполнить один этап в текущем процессе и вернуть метрики"""
+    _, _, load, run, _ = CASES[name]
+    with contextlib.redirect_stdout(io.StringIO()):
+        inputs = load(size)
+        rss_before = proc_status_mb('VmRSS') or peak_rss_mb()
+        reset_peak_rss()
+        cpu_started = cpu_seconds()
+        started = time.perf_counter()
+        counters = run(inputs)
+        wall = time.perf_counter() - started
+        cpu = cpu_seconds() - cpu_started
+    return dict(
+        wall_s=round(wall, 4),
+        cpu_s=round(cpu, 4),
+        peak_rss_mb=round(peak_rss_mb(), 1),
+        rss_growth_mb=round(peak_rss_mb() - rss_before, 1),
+        **counters,
+    )
+
+
+def run_in_subprocess(name, size, work_dir):
+    """Прогнать этап в отдельном интерпретаторе и прочитать метрики из последней строки stdout"""
+    result = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), '--run-case', name, '--size', str(size)],
+        cwd=work_dir, capture_output=True, text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"{name}/{size} failed:\n{result.stderr[-2000:]}")
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def run_suite(cases, sizes_override, news_sizes_override, repeats, keep_work_dir=False):
+    """Подготовить входы и прогнать все выбранные этапы; лучший из repeats прогонов по wall time"""
+    results = {}
+    root = tempfile.mkdtemp(prefix="bench_suite_")
+    try:
+        for name in cases:
+            default_sizes, prepare, _, _, reset_paths = CASES[name]
+            sizes = news_sizes_override if default_sizes is NEWS_SIZES else sizes_override
+            for size in sizes or default_sizes:
+                work_dir = os.path.join(root, f"{name}-{size}")
+                os.makedirs(work_dir)
+                cwd = os.getcwd()
+                with contextlib.redirect_stdout(io.StringIO()):
+                    os.chdir(work_dir)
+                    try:
+                        prepare(size)
+                    finally:
+                        os.chdir(cwd)
+
+                runs = []
+                for _ in range(repeats):
+                    for path in reset_paths:
+                        path = os.path.join(work_dir, path)
+                        if os.path.isdir(path):
+                            shutil.rmtree(path)
+                        elif os.path.exists(path):
+                            os.remove(path)
+                    runs.append(run_in_subprocess(name, size, work_dir))
+                best = min(runs, key=lambda r: r['wall_s'])
+                results[f"{name}/{size}"] = best
+                print(f"{name:<14} {size:>7} | {best['wall_s']:>9.3f} | {best['cpu_s']:>9.3f} | "
+                      f"{best['peak_rss_mb']:>9.1f} | {best.get('records', ''):>8}")
+    finally:
+        if keep_work_dir:
+            print(f"\nWork directories kept in {root}")
+        else:
+            shutil.rmtree(root, ignore_errors=True)
+    return results
+
+
+# ==================== BASELINES ====================
+def baseline_path(name):
+    """Путь к baseline по имени"""
+    return os.path.join(BASELINES_DIR, f"{name}.json")
+
+
+def machine_info():
+    """Описание машины: сравнивать baseline имеет смысл только на той же"""
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+        'cpu_count': os.cpu_count(),
+    }
+
+
+def save_baseline(name, results):
+    """Сохранить результаты как baseline"""
+    os.makedirs(BASELINES_DIR, exist_ok=True)
+    path = baseline_path(name)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({
+            'created_at': datetime.now().isoformat(timespec='seconds'),
+            'machine': machine_info(),
+            'results': results,
+        }, f, indent=2, sort_keys=True)
+        f.write("\n")
+    print(f"\nBaseline saved to {path}")
+
+
+def compare_with_baseline(name, results, tolerance):
+    """Сравнить с baseline; вернуть список регрессий"""
+    with open(baseline_path(name), 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+    if baseline['machine'] != machine_info():
+        print(f"\nWarning: baseline {name} was recorded on {baseline['machine']['platform']} "
+              f"({baseline['machine']['cpu_count']} CPUs), timings may not be comparable")
+
+    regressions = []
+    print(f"\n{'case':<22} | {'metric':<11} | {'baseline':>9} | {'current':>9} | {'change':>7}")
+    print("-" * 70)
+    for key, current in results.items():
+        previous = baseline['results'].get(key)
+        if previous is None:
+            continue
+        for metric, noise in METRICS.items():
+            ratio = current[metric] / previous[metric] if previous[metric] else 1.0
+            flag = ""
+            if ratio > 1 + tolerance and current[metric] - previous[metric] > noise:
+                regressions.append((key, metric, ratio))
+                flag = "  REGRESSION"
+            print(f"{key:<22} | {metric:<11} | {previous[metric]:>9.3f} | {current[metric]:>9.3f} | "
+                  f"{ratio - 1:>+7.0%}{flag}")
+    return regressions
+
+
+def parse_args(argv=None):
+    """Разобрать аргументы командной строки"""
+    parser = argparse.ArgumentParser(description="Benchmark suite for the publication and news pipelines")
+    parser.add_argument('--cases', nargs='+', default=list(CASES), metavar='CASE',
+                        help=f"Cases to run: {', '.join(CASES)} (default: all)")
+    parser.add_argument('--sizes', type=int, nargs='+', help=f"Publication corpus sizes (default: {PUBLICATION_SIZES})")
+    parser.add_argument('--news-sizes', type=int, nargs='+', help=f"News corpus sizes (default: {NEWS_SIZES})")
+    parser.add_argument('--repeats', type=int, default=1, help="Runs per case, the fastest one is reported")
+    parser.add_argument('--save', metavar='NAME', help="Save results as benchmarks/baselines/NAME.json")
+    parser.add_argument('--compare', metavar='NAME', help="Compare with benchmarks/baselines/NAME.json, exit 1 on regression")
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help=f"Allowed relative growth of a metric (default: {DEFAULT_TOLERANCE})")
+    parser.add_argument('--keep-work-dir', action='store_true', help="Keep generated corpora and outputs")
+    parser.add_argument('--run-case', help=argparse.SUPPRESS)
+    parser.add_argument('--size', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+    unknown = [name for name in args.cases if name not in CASES]
+    if unknown:
+        parser.error(f"unknown cases: {', '.join(unknown)}")
+    return args
+
+
+def main(argv=None):
+    """Главная функция"""
+    args = parse_args(argv)
+    if args.run_case:
+        print(json.dumps(measure_case(args.run_case, args.size)))
+        return 0
+
+    print(f"{'case':<14} {'size':>7} | {'wall, s':>9} | {'CPU, s':>9} | {'peak, MB':>9} | {'records':>8}")
+    print("-" * 68)
+    results = run_suite(args.cases, args.sizes, args.news_sizes, args.repeats, args.keep_work_dir)
+
+    if args.save:
+        save_baseline(args.save, results)
+    if args.compare:
+        regressions = compare_with_baseline(args.compare, results, args.tolerance)
+        if regressions:
+            print(f"\n{len(regressions)} regressions above {args.tolerance:.0%}")
+            return 1
+        print("\nNo regressions")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
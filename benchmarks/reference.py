@@ -0,0 +1,64 @@
+"""
+Прежние реализации этапов, с которыми бенчмарки сравнивают текущие; в рабочем коде не используются
+"""
+
+import pandas as pd
+
+from update_publications_backend import extract_year
+
+
+def parse_article(article):
+    """Распарсить статью из дерева Entrez.read (прежний парсер update_publications_backend.py)"""
+    try:
+        journal = article['MedlineCitation']['Article']['Journal']['Title']
+        # if 'bioRxiv' in journal or 'biorxiv' in journal or 'medRxiv' in journal or 'medrxiv' in journal:
+        #     return None
+            
+        pub_date = article['MedlineCitation']['Article']['Journal']['JournalIssue']['PubDate']
+        date = pub_date.get('MedlineDate', f"{pub_date.get('Year', '')}-{pub_date.get('Month', '')}")
+        
+        doi = None
+        pmid = None
+        for article_id in article['PubmedData']['ArticleIdList']:
+            if article_id.attributes.get('IdType') == 'doi':
+                doi = str(article_id)
+            elif article_id.attributes.get('IdType') == 'pubmed':
+                pmid = str(article_id)
+        
+        return {
+            'title': article['MedlineCitation']['Article']['ArticleTitle'],
+            'journal': journal,
+            'journal_lower': journal.lower(),
+            'date': date,
+            'authors': [f"{a['LastName']} {a['Initials']}" 
+                       for a in article['MedlineCitation']['Article']['AuthorList']],
+            'abstract': article['MedlineCitation']['Article'].get('Abstract', {}).get('AbstractText', [''])[0],
+            'doi': doi,
+            'pmid': pmid,
+        }
+    except KeyError:
+        return None
+
+
+def build_publications_by_year(df):
+    """Прежняя сборка publications.json: фильтр по каждому году и iterrows"""
+    df = df.copy()
+    df['year'] = df['date'].apply(extract_year)
+    df = df[df['year'].notna()].copy()
+    publications_by_year = {}
+    for year in sorted(df['year'].unique(), reverse=True):
+        year_df = df[df['year'] == year].copy()
+        publications = []
+        for _, row in year_df.iterrows():
+            publications.append({
+                'title': row['title'],
+                'authors': row['authors'],
+                'journal': row['journal'],
+                'date': row['date'],
+                'year': int(row['year']),
+                'abstract': row['abstract'] if pd.notna(row['abstract']) else '',
+                'doi': row['doi'] if pd.notna(row['doi']) else None,
+                'pmid': row['pmid'] if pd.notna(row['pmid']) else None,
+            })
+        publications_by_year[str(int(year))] = publications
+    return publications_by_year
@@ -0,0 +1,261 @@
+"""
+Синтетические данные для бенчмарков: ответы efetch PubMed, записанные ответы Entrez, датасет публикаций и новости
+"""
+
+import io
+import os
+import re
+import zlib
+import struct
+import random
+from datetime import date, timedelta
+from urllib.error import HTTPError
+
+JOURNALS = [
+    ("Nature medicine", "Nat Med", "9502015"),
+    ("Cell metabolism", "Cell Metab", "101233170"),
+    ("Aging cell", "Aging Cell", "101130839"),
+    ("Nature communications", "Nat Commun", "101528555"),
+    ("Proceedings of the National Academy of Sciences of the United States of America", "Proc Natl Acad Sci U S A", "7505876"),
+    ("The Journal of biological chemistry", "J Biol Chem", "2985121R"),
+]
+MONTHS = ["Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"]
+LAST_NAMES = ["Smith", "Zhang", "Ivanov", "Tyshkovskiy", "Moqri", "Ying", "Lee", "Kaya", "Garcia", "Mariotti"]
+WORDS = (
+    "aging lifespan selenium protein clock methylation rejuvenation mice human cell tissue "
+    "organ mortality biomarker transcriptome metabolism longevity damage repair oxidative redox"
+).split()
+SECTIONS = ["BACKGROUND", "METHODS", "RESULTS", "CONCLUSIONS"]
+
+EFETCH_HEADER = (
+    '<?xml version="1.0" ?>\n'
+    '<!DOCTYPE PubmedArticleSet PUBLIC "-//NLM//DTD PubMedArticle, 1st January 2024//EN" '
+    '"https://dtd.nlm.nih.gov/ncbi/pubmed/out/pubmed_240101.dtd">\n'
+    '<PubmedArticleSet>\n'
+)
+EFETCH_FOOTER = '</PubmedArticleSet>\n'
+
+
+def sentence(rng, n_words):
+    """Случайное предложение из словаря"""
+    return " ".join(rng.choice(WORDS) for _ in range(n_words)).capitalize() + "."
+
+
+def synthetic_authors(rng):
+    """Случайный список авторов, в половине случаев с Gladyshev VN последним"""
+    authors = [(rng.choice(LAST_NAMES), rng.choice("ABCDEFGH") + rng.choice(["", "N", "V"]))
+               for _ in range(rng.randint(2, 12))]
+    if rng.random() < 0.5:
+        authors.append(("Gladyshev", "VN"))
+    else:
+        authors.insert(rng.randrange(len(authors)), ("Gladyshev", "VN"))
+    return authors
+
+
+def synthetic_article_xml(pmid, rng, year=None):
+    """Один <PubmedArticle> со структурированным аннотированием"""
+    title, iso, nlm_id = rng.choice(JOURNALS)
+    year = year or rng.randint(1994, 2025)
+    authors = "".join(
+        f'<Author ValidYN="Y"><LastName>{last}</LastName><ForeName>{initials}</ForeName>'
+        f'<Initials>{initials}</Initials></Author>'
+        for last, initials in synthetic_authors(rng)
+    )
+    abstract = "".join(
+        f'<AbstractText Label="{label}" NlmCategory="{label}">{sentence(rng, 40)} '
+        f'<i>{rng.choice(WORDS)}</i> {sentence(rng, 20)}</AbstractText>'
+        for label in SECTIONS
+    )
+    return (
+        '<PubmedArticle><MedlineCitation Status="MEDLINE" Owner="NLM">'
+        f'<PMID Version="1">{pmid}</PMID><Article PubModel="Print-Electronic"><Journal>'
+        '<ISSN IssnType="Electronic">1546-170X</ISSN><JournalIssue CitedMedium="Internet">'
+        f'<Volume>{rng.randint(1, 60)}</Volume><PubDate><Year>{year}</Year><Month>{rng.choice(MONTHS)}</Month></PubDate>'
+        f'</JournalIssue><Title>{title}</Title><ISOAbbreviation>{iso}</ISOAbbreviation></Journal>'
+        f'<ArticleTitle>{sentence(rng, 14)}</ArticleTitle>'
+        f'<Abstract>{abstract}</Abstract>'
+        f'<AuthorList CompleteYN="Y">{authors}</AuthorList><Language>eng</Language></Article>'
+        f'<MedlineJournalInfo><Country>United States</Country><MedlineTA>{iso}</MedlineTA>'
+        f'<NlmUniqueID>{nlm_id}</NlmUniqueID></MedlineJournalInfo></MedlineCitation>'
+        '<PubmedData><ArticleIdList>'
+        f'<ArticleId IdType="pubmed">{pmid}</ArticleId><ArticleId IdType="doi">10.1000/synthetic.{pmid}</ArticleId>'
+        '</ArticleIdList></PubmedData></PubmedArticle>\n'
+    )
+
+
+def synthetic_efetch_xml(n_articles, seed=42, first_pmid=30000000):
+    """Ответ efetch (PubmedArticleSet) из n_articles синтетических статей"""
+    rng = random.Random(seed)
+    body = "".join(synthetic_article_xml(first_pmid + i, rng) for i in range(n_articles))
+    return EFETCH_HEADER + body + EFETCH_FOOTER
+
+
+def write_synthetic_efetch(path, n_articles, seed=42, first_pmid=30000000):
+    """Записать синтетический ответ efetch в файл, не держа его целиком в памяти"""
+    rng = random.Random(seed)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(EFETCH_HEADER)
+        for i in range(n_articles):
+            f.write(synthetic_article_xml(first_pmid + i, rng))
+        f.write(EFETCH_FOOTER)
+
+
+def synthetic_publications(n_publications, seed=42):
+    """Датасет публикаций в формате all_publications.csv (authors - список строк)"""
+    import pandas as pd
+
+    rng = random.Random(seed)
+    rows = []
+    for i in range(n_publications):
+        title, _, _ = rng.choice(JOURNALS)
+        year = rng.randint(1994, 2025)
+        rows.append({
+            'title': sentence(rng, 14)[:-1],
+            'journal': title,
+            'journal_lower': title.lower(),
+            'date': f"{year}-{rng.choice(MONTHS)}",
+            'authors': [f"{last} {initials}" for last, initials in synthetic_authors(rng)],
+            'abstract': " ".join(sentence(rng, 40) for _ in range(4)) if rng.random() > 0.1 else None,
+            'doi': f"10.1000/synthetic.{i}" if rng.random() > 0.05 else None,
+            'pmid': str(30000000 + i),
+            'Rank': float(rng.randint(1, 5000)) if rng.random() > 0.2 else None,
+        })
+    return pd.DataFrame(rows)
+
+
+ESEARCH_TEMPLATE = (
+    '<?xml version="1.0" encoding="UTF-8" ?>\n'
+    '<!DOCTYPE eSearchResult PUBLIC "-//NLM//DTD esearch 20060628//EN" '
+    '"https://eutils.ncbi.nlm.nih.gov/eutils/dtd/20060628/esearch.dtd">\n'
+    '<eSearchResult><Count>{count}</Count><RetMax>{retmax}</RetMax><RetStart>0</RetStart>'
+    '<QueryKey>1</QueryKey><WebEnv>{webenv}</WebEnv><IdList>{ids}</IdList>'
+    '<TranslationSet/><QueryTranslation>synthetic</QueryTranslation></eSearchResult>\n'
+)
+
+
+class SyntheticEntrez:
+    """Заменитель esearch/efetch NCBI: n_articles статей, равномерно разложенных по годам.
+    add_articles() и revise() имитируют новые и исправленные записи для запросов по [EDAT]/[LR],
+    expire_sessions() - истечение сессий history server."""
+
+    def __init__(self, n_articles, years, first_pmid=30000000):
+        self.years = list(years)
+        self.pmids_by_year = {year: [] for year in self.years}
+        for i in range(n_articles):
+            self.pmids_by_year[self.years[i % len(self.years)]].append(str(first_pmid + i))
+        self.year_by_pmid = {pmid: year for year, pmids in self.pmids_by_year.items() for pmid in pmids}
+        self.next_pmid = first_pmid + n_articles
+        self.revisions = {}
+        self.updated = []
+        self.terms = []
+        self.session = 0
+
+    def add_articles(self, n_articles, year):
+        """Новые статьи за year; возвращает их PMID"""
+        pmids = [str(self.next_pmid + i) for i in range(n_articles)]
+        self.next_pmid += n_articles
+        self.pmids_by_year.setdefault(year, []).extend(pmids)
+        self.year_by_pmid.update((pmid, year) for pmid in pmids)
+        self.updated.extend(pmids)
+        return pmids
+
+    def revise(self, pmid):
+        """Исправить запись: следующий efetch вернёт для неё другое содержимое"""
+        self.revisions[pmid] = self.revisions.get(pmid, 0) + 1
+        self.updated.append(pmid)
+
+    def expire_sessions(self):
+        """Истечь все выданные WebEnv, как это делает history server NCBI через несколько часов"""
+        self.session += 1
+
+    def esearch(self, term, retmax=10000, **params):
+        self.terms.append(term)
+        match = re.search(r'"(\d{4})/01/01"\[PDAT\]', term)
+        if '[EDAT]' in term:
+            key, pmids = 'updates', list(dict.fromkeys(self.updated))
+        else:
+            key = match.group(1) if match else 'none'
+            pmids = self.pmids_by_year.get(int(match.group(1)), []) if match else []
+        ids = "".join(f"<Id>{pmid}</Id>" for pmid in pmids[:retmax])
+        xml = ESEARCH_TEMPLATE.format(count=len(pmids), retmax=min(len(pmids), retmax),
+                                      webenv=f"synthetic-{self.session}-{key}", ids=ids)
+        return io.BytesIO(xml.encode('utf-8'))
+
+    def efetch(self, id=None, retstart=0, retmax=None, webenv=None, **params):
+        if id is None:
+            _, session, key = webenv.split('-')
+            if int(session) != self.session:
+                raise HTTPError("https://eutils.ncbi.nlm.nih.gov/entrez/eutils/efetch.fcgi", 400,
+                                "Unable to obtain query #1", None, None)
+            pmids = list(dict.fromkeys(self.updated)) if key == 'updates' else self.pmids_by_year[int(key)]
+            id = pmids[retstart:retstart + retmax]
+        body = "".join(
+            synthetic_article_xml(pmid, random.Random(f"{pmid}-{self.revisions.get(pmid, 0)}"),
+                                  year=self.year_by_pmid[pmid])
+            for pmid in id
+        )
+        return io.BytesIO((EFETCH_HEADER + body + EFETCH_FOOTER).encode('utf-8'))
+
+
+def record_pubmed_replay(backend, replay_dir, n_articles, years):
+    """Записать ответы Entrez для всех лет в replay_dir через настоящий путь кэширования backend"""
+    stand_in = SyntheticEntrez(n_articles, years)
+    entrez = backend.get_entrez()
+    saved = (entrez.esearch, entrez.efetch, backend.ENTREZ_CACHE_DIR,
+             backend.ENTREZ_CACHE_ENABLED, backend.ENTREZ_REPLAY_DIR, backend._entrez_bucket)
+    entrez.esearch, entrez.efetch = stand_in.esearch, stand_in.efetch
+    backend.ENTREZ_CACHE_DIR = replay_dir
+    backend.configure_entrez_cache(enabled=True, replay_dir=None)
+    # The stand-in is local: recording must not be throttled to the NCBI rate
+    backend._entrez_bucket = backend.TokenBucket(rate=1e9, capacity=1e9)
+    try:
+        for year in years:
+            backend.fetch_pubmed_articles(year)
+    finally:
+        (entrez.esearch, entrez.efetch, backend.ENTREZ_CACHE_DIR,
+         backend.ENTREZ_CACHE_ENABLED, backend.ENTREZ_REPLAY_DIR, backend._entrez_bucket) = saved
+
+
+def tiny_png(index):
+    """PNG 1x1 с цветом, зависящим от index, - у каждой новости своё содержимое и свой хэш"""
+    def chunk(kind, data):
+        return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data))
+
+    pixel = bytes([0, index % 256, index // 256 % 256, index // 65536 % 256])
+    return (b'\x89PNG\r\n\x1a\n'
+            + chunk(b'IHDR', struct.pack('>IIBBBBB', 1, 1, 8, 2, 0, 0, 0))
+            + chunk(b'IDAT', zlib.compress(pixel))
+            + chunk(b'IEND', b''))
+
+
+def write_synthetic_news(news_dir, n_posts, seed=42, image_fraction=0.2):
+    """Записать n_posts markdown-новостей (YYYY-MM-DD.md), часть с изображениями"""
+    rng = random.Random(seed)
+    os.makedirs(news_dir, exist_ok=True)
+    first_day = date(2005, 1, 1)
+    for i in range(n_posts):
+        basename = (first_day + timedelta(days=i)).isoformat()
+        paragraphs = "\n\n".join(
+            " ".join(sentence(rng, rng.randint(8, 25)) for _ in range(rng.randint(2, 5)))
+            for _ in range(rng.randint(1, 4))
+        )
+        with open(os.path.join(news_dir, f"{basename}.md"), 'w', encoding='utf-8') as f:
+            f.write(f"# {sentence(rng, 6)[:-1]}\n\n{paragraphs}\n\n"
+                    f"[Read more](https://example.org/{i}) about *{rng.choice(WORDS)}*.\n")
+        if rng.random() < image_fraction:
+            with open(os.path.join(news_dir, f"{basename}.png"), 'wb') as f:
+                f.write(tiny_png(i))
+
+
+def synthetic_embeddings(texts, dim=1024, n_topics=6, seed=42):
+    """Детерминированные единичные эмбеддинги вокруг n_topics центров - замена модели для бенчмарка UMAP"""
+    import hashlib
+    import numpy as np
+
+    centers = np.random.default_rng(seed).standard_normal((n_topics, dim))
+    vectors = np.empty((len(texts), dim), dtype=np.float32)
+    for i, text in enumerate(texts):
+        digest = int.from_bytes(hashlib.sha256(text.encode('utf-8')).digest()[:8], 'little')
+        rng = np.random.default_rng(digest)
+        vectors[i] = centers[digest % n_topics] + 0.5 * rng.standard_normal(dim)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+"""
+Локальный сервис эмбеддингов: держит модель MODEL_NAME в памяти между запусками backend скриптов
+Запуск: python embedding_server.py [--host 127.0.0.1] [--port 8765]
+Backend скрипты обращаются к нему по EMBEDDING_SERVER_URL и кодируют сами, если сервис не запущен
+Семантический поиск по публикациям: GET /search?q=<запрос>&k=20 (только для локальных клиентов, сайт его не использует)
+"""
+
+import os
+import json
+import time
+import queue
+import base64
+import argparse
+import threading
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+import numpy as np
+from sentence_transformers import SentenceTransformer
+
+from update_publications_backend import (MODEL_NAME, EMBEDDING_BATCH_SIZE, QUERY_PREFIX, SEARCH_INDEX_DIR,
+                                         load_search_index)
+
+# CONFIGURATION
+HOST = "127.0.0.1"
+PORT = 8765
+BATCH_WINDOW_SECONDS = 0.02  # How long to wait for other callers before encoding a batch
+MAX_TEXTS_PER_BATCH = 512
+SEARCH_DEFAULT_K = 20
+SEARCH_MAX_K = 200
+
+
+class EncodeBatcher:
+    """Очередь запросов на кодирование: запросы разных клиентов объединяются в один батч"""
+
+    def __init__(self, model):
+        self.model = model
+        self.requests = queue.Queue()
+        self.worker = threading.Thread(target=self._run, daemon=True)
+        self.worker.start()
+
+    def encode(self, texts):
+        """Поставить тексты в очередь и дождаться их эмбеддингов"""
+        future = Future()
+        self.requests.put((texts, future))
+        return future.result()
+
+    def _collect(self):
+        """Собрать батч: первый запрос ждём без ограничений, остальные - BATCH_WINDOW_SECONDS"""
+        batch = [self.requests.get()]
+        n_texts = len(batch[0][0])
+        deadline = time.monotonic() + BATCH_WINDOW_SECONDS
+        while n_texts < MAX_TEXTS_PER_BATCH:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                item = self.requests.get(timeout=timeout)
+            except queue.Empty:
+                break
+            batch.append(item)
+            n_texts += len(item[0])
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            texts = [text for item_texts, _ in batch for text in item_texts]
+            try:
+                vectors = self.model.encode(
+                    texts,
+                    show_progress_bar=False,
+                    convert_to_numpy=True,
+                    normalize_embeddings=True,
+                    batch_size=EMBEDDING_BATCH_SIZE
+                ).astype(np.float32)
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+
+            offset = 0
+            for item_texts, future in batch:
+                future.set_result(vectors[offset:offset + len(item_texts)])
+                offset += len(item_texts)
+            print(f"Encoded {len(texts)} texts from {len(batch)} request(s)")
+
+
+class SearchIndex:
+    """Индекс семантического поиска, перечитывается при обновлении index.json"""
+
+    def __init__(self, index_dir):
+        self.index_dir = index_dir
+        self.lock = threading.Lock()
+        self.mtime = None
+        self.meta = None
+        self.matrix = None
+
+    def _refresh(self):
+        mtime = os.path.getmtime(os.path.join(self.index_dir, "index.json"))
+        if mtime != self.mtime:
+            self.meta, self.matrix = load_search_index(self.index_dir)
+            self.mtime = mtime
+            print(f"Loaded search index with {self.meta['count']} papers")
+
+    def search(self, query_vector, k):
+        """PMID и скоры k ближайших статей"""
+        with self.lock:
+            self._refresh()
+            meta, matrix = self.meta, self.matrix
+        if meta['model'] != MODEL_NAME:
+            raise ValueError(f"search index was built with {meta['model']}, server runs {MODEL_NAME}")
+
+        scores = matrix @ query_vector
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k] if k else np.array([], dtype=np.int64)
+        top = top[np.argsort(-scores[top])]
+        return [{'pmid': meta['pmids'][i], 'score': round(float(scores[i]), 4)} for i in top]
+
+
+class EmbeddingHandler(BaseHTTPRequestHandler):
+    """HTTP API: GET /health, GET /search?q=...&k=..., POST /encode {"model": ..., "texts": [...]}"""
+
+    batcher = None
+    search_index = None
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path == '/health':
+            self._send_json(200, {'status': 'ok', 'model': MODEL_NAME})
+        elif url.path == '/search':
+            self._search(parse_qs(url.query))
+        else:
+            self._send_json(404, {'error': 'not found'})
+
+    def _search(self, params):
+        query = params.get('q', [''])[0].strip()
+        if not query:
+            self._send_json(400, {'error': 'missing q'})
+            return
+        try:
+            k = max(0, min(int(params.get('k', [SEARCH_DEFAULT_K])[0]), SEARCH_MAX_K))
+        except ValueError:
+            self._send_json(400, {'error': 'k must be an integer'})
+            return
+
+        started = time.perf_counter()
+        query_vector = self.batcher.encode([QUERY_PREFIX + query])[0]
+        encoded = time.perf_counter()
+        try:
+            results = self.search_index.search(query_vector, k)
+        except (OSError, ValueError) as e:
+            self._send_json(503, {'error': f"search index unavailable: {e}"})
+            return
+        self._send_json(200, {
+            'query': query,
+            'results': results,
+            'encode_ms': round((encoded - started) * 1000, 2),
+            'search_ms': round((time.perf_counter() - encoded) * 1000, 3),
+        })
+
+    def do_POST(self):
+        if self.path != '/encode':
+            self._send_json(404, {'error': 'not found'})
+            return
+
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+            request = json.loads(self.rfile.read(length))
+            texts = request['texts']
+        except (ValueError, KeyError) as e:
+            self._send_json(400, {'error': f"bad request: {e}"})
+            return
+
+        if request.get('model', MODEL_NAME) != MODEL_NAME:
+            self._send_json(409, {'error': f"server runs {MODEL_NAME}", 'model': MODEL_NAME})
+            return
+
+        vectors = self.batcher.encode(texts) if texts else np.empty((0, 0), dtype=np.float32)
+        self._send_json(200, {
+            'model': MODEL_NAME,
+            'dim': int(vectors.shape[1]) if len(texts) else 0,
+            'dtype': 'float32',
+            'embeddings': base64.b64encode(vectors.tobytes()).decode('ascii'),
+        })
+
+    def log_message(self, format, *args):
+        pass
+
+
+def main():
+    """Главная функция"""
+    parser = argparse.ArgumentParser(description="Keep the embedding model resident and serve encode requests")
+    parser.add_argument('--host', default=HOST)
+    parser.add_argument('--port', type=int, default=PORT)
+    parser.add_argument('--search-index', default=SEARCH_INDEX_DIR,
+                        help="directory with the semantic search index written by update_publications_backend.py")
+    args = parser.parse_args()
+
+    print(f"Loading {MODEL_NAME}...")
+    started = time.perf_counter()
+    EmbeddingHandler.batcher = EncodeBatcher(SentenceTransformer(MODEL_NAME))
+    print(f"Model loaded in {time.perf_counter() - started:.1f}s")
+    EmbeddingHandler.search_index = SearchIndex(args.search_index)
+
+    server = ThreadingHTTPServer((args.host, args.port), EmbeddingHandler)
+    print(f"Embedding server listening on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
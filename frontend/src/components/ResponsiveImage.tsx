@@ -0,0 +1,33 @@
+import React from 'react'
+
+type ResponsiveImageProps = {
+  src: string
+  alt: string
+  className?: string
+  width?: number
+  height?: number
+  // MIME type -> srcset of resized copies, as written by image_derivatives.py
+  srcset?: { [type: string]: string }
+  sizes?: string
+}
+
+const ResponsiveImage: React.FC<ResponsiveImageProps> = (props) => {
+  const { src, alt, className, width, height, srcset, sizes } = props
+  return (
+    <picture>
+      {srcset && Object.entries(srcset).map(([type, set]) => (
+        <source key={type} type={type} srcSet={set} sizes={sizes} />
+      ))}
+      <img
+        src={src}
+        alt={alt}
+        width={width}
+        height={height}
+        loading="lazy"
+        decoding="async"
+        className={className}
+      />
+    </picture>
+  )
+}
+export default ResponsiveImage
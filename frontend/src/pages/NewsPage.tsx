@@ -1,4 +1,5 @@
 import React, { useState, useEffect } from 'react'
+import ResponsiveImage from '../components/ResponsiveImage'
 
 interface NewsItem {
   date: string
@@ -6,6 +7,9 @@ interface NewsItem {
   year: number
   content: string
   image?: string
+  image_width?: number
+  image_height?: number
+  image_srcset?: { [type: string]: string }
   title?: string
 }
 
@@ -178,10 +182,14 @@ const NewsPage: React.FC = () => {
 
                     {/* Image */}
                     {item.image && (
-                      <img 
-                        src={item.image} 
-                        alt="News" 
-                        className="max-h-140 object-cover rounded-lg mb-4"
+                      <ResponsiveImage
+                        src={item.image}
+                        alt="News"
+                        width={item.image_width}
+                        height={item.image_height}
+                        srcset={item.image_srcset}
+                        sizes="(min-width: 1024px) 640px, 100vw"
+                        className="max-h-140 w-auto h-auto object-cover rounded-lg mb-4"
                       />
                     )}
 
@@ -6,9 +6,11 @@ interface Publication {
   journal: string
   date: string
   year: number
-  abstract: string
+  abstract?: string
+  has_abstract?: boolean
   doi: string | null
   pmid: string | null
+  related?: string[]
 }
 
 interface PublicationsData {
@@ -18,8 +20,37 @@ interface PublicationsData {
   publications_by_year: { [year: string]: Publication[] }
 }
 
+interface ShardInfo {
+  file: string
+  size: number
+  sha256: string
+}
+
+interface ManifestYear {
+  year: number
+  count: number
+  shard: ShardInfo
+  abstracts: ShardInfo
+}
+
+interface PublicationsManifest {
+  generated_at: string
+  total_publications: number
+  years: ManifestYear[]
+}
+
+const loadShard = async <T,>(shard: ShardInfo): Promise<T> => {
+  const response = await fetch(`/publications/${shard.file}`)
+  if (!response.ok) {
+    throw new Error(`Failed to load ${shard.file}`)
+  }
+  return response.json()
+}
+
 const PublicationsPage: React.FC = () => {
   const [data, setData] = useState<PublicationsData | null>(null)
+  const [manifest, setManifest] = useState<PublicationsManifest | null>(null)
+  const [abstracts, setAbstracts] = useState<{ [year: string]: string[] }>({})
   const [loading, setLoading] = useState(true)
   const [error, setError] = useState<string | null>(null)
   const [selectedYear, setSelectedYear] = useState<string | null>(null)
@@ -27,24 +58,79 @@ const PublicationsPage: React.FC = () => {
   const [searchTerm, setSearchTerm] = useState('')
 
   useEffect(() => {
-    // Загрузить данные публикаций
-    fetch('/publications.json')
-      .then(response => {
+    // Загрузить данные публикаций: manifest, затем шарды по годам (самый свежий год - первым)
+    const loadPublications = async () => {
+      try {
+        const response = await fetch('/publications/manifest.json')
         if (!response.ok) {
-          throw new Error('Failed to load publications')
+          // Fall back to the monolithic file
+          const fullResponse = await fetch('/publications.json')
+          if (!fullResponse.ok) {
+            throw new Error('Failed to load publications')
+          }
+          setData(await fullResponse.json())
+          return
+        }
+
+        const manifestData: PublicationsManifest = await response.json()
+        setManifest(manifestData)
+
+        const [first, ...rest] = manifestData.years
+        const initial: PublicationsData = {
+          generated_at: manifestData.generated_at,
+          total_publications: manifestData.total_publications,
+          years: manifestData.years.map(entry => entry.year),
+          publications_by_year: {}
+        }
+        if (first) {
+          initial.publications_by_year[String(first.year)] = await loadShard<Publication[]>(first.shard)
         }
-        return response.json()
-      })
-      .then((data: PublicationsData) => {
-        setData(data)
+        setData(initial)
         setLoading(false)
-      })
-      .catch(err => {
-        setError(err.message)
+
+        const shards = await Promise.all(rest.map(entry => loadShard<Publication[]>(entry.shard)))
+        setData(prev => prev && {
+          ...prev,
+          publications_by_year: {
+            ...prev.publications_by_year,
+            ...Object.fromEntries(rest.map((entry, i) => [String(entry.year), shards[i]]))
+          }
+        })
+      } catch (err) {
+        setError(err instanceof Error ? err.message : String(err))
+      } finally {
         setLoading(false)
-      })
+      }
+    }
+
+    loadPublications()
   }, [])
 
+  const loadAbstracts = async (year: string) => {
+    if (!manifest || abstracts[year]) return
+    const entry = manifest.years.find(item => String(item.year) === year)
+    if (!entry) return
+    try {
+      const yearAbstracts = await loadShard<string[]>(entry.abstracts)
+      setAbstracts(prev => ({ ...prev, [year]: yearAbstracts }))
+    } catch (err) {
+      console.error('Error loading abstracts:', err)
+    }
+  }
+
+  useEffect(() => {
+    // Abstracts are only needed for search once the user types
+    if (!searchTerm || !manifest) return
+    manifest.years.forEach(entry => loadAbstracts(String(entry.year)))
+    // eslint-disable-next-line react-hooks/exhaustive-deps
+  }, [searchTerm, manifest])
+
+  const getPublications = (year: string) =>
+    (data?.publications_by_year[year] || []).map((pub, i) => ({
+      ...pub,
+      abstract: abstracts[year]?.[i] ?? pub.abstract ?? ''
+    }))
+
   const toggleAbstract = (doi: string | null, index: number) => {
     const key = doi || `pub-${index}`
     const newExpanded = new Set(expandedAbstracts)
@@ -61,6 +147,15 @@ const PublicationsPage: React.FC = () => {
     return expandedAbstracts.has(key)
   }
 
+  const findByPmid = (pmid: string) => {
+    if (!data) return undefined
+    for (const year of data.years) {
+      const pub = data.publications_by_year[String(year)]?.find(p => p.pmid === pmid)
+      if (pub) return pub
+    }
+    return undefined
+  }
+
   const filterPublications = (publications: Publication[]) => {
     if (!searchTerm) return publications
     
@@ -69,7 +164,7 @@ const PublicationsPage: React.FC = () => {
       pub.title.toLowerCase().includes(term) ||
       pub.authors.some(author => author.toLowerCase().includes(term)) ||
       pub.journal.toLowerCase().includes(term) ||
-      pub.abstract.toLowerCase().includes(term)
+      (pub.abstract || '').toLowerCase().includes(term)
     )
   }
 
@@ -180,7 +275,11 @@ const PublicationsPage: React.FC = () => {
 
       {/* Publications by Year */}
       {yearsToDisplay.map(year => {
-        const publications = filterPublications(data.publications_by_year[year] || [])
+        const loaded = year in data.publications_by_year
+        const publications = filterPublications(getPublications(year))
+        const yearCount = loaded
+          ? publications.length
+          : manifest?.years.find(entry => String(entry.year) === year)?.count ?? 0
         
         if (publications.length === 0 && searchTerm) {
           return null
@@ -190,10 +289,12 @@ const PublicationsPage: React.FC = () => {
           <div key={year} id={`year-${year}`} className="bg-white rounded-lg shadow-md border border-gray-200 p-6">
             <h2 className="text-2xl font-bold text-gray-800 border-b-2 border-red-700 pb-2 mb-6">
               {year}
-              <span className="text-lg text-gray-600 ml-3">({publications.length})</span>
+              <span className="text-lg text-gray-600 ml-3">({yearCount})</span>
             </h2>
 
-            {publications.length === 0 ? (
+            {!loaded ? (
+              <p className="text-gray-500 italic">Loading publications...</p>
+            ) : publications.length === 0 ? (
               <p className="text-gray-500 italic">No publications found for this year matching your search.</p>
             ) : (
               <div className="space-y-6">
@@ -224,9 +325,12 @@ const PublicationsPage: React.FC = () => {
                     {/* Buttons */}
                     <div className="flex items-center space-x-4 mt-3">
                       {/* Abstract Toggle */}
-                      {pub.abstract && (
+                      {(pub.has_abstract || pub.abstract) && (
                         <button
-                          onClick={() => toggleAbstract(pub.doi, index)}
+                          onClick={() => {
+                            toggleAbstract(pub.doi, index)
+                            loadAbstracts(year)
+                          }}
                           className="text-blue-600 hover:text-blue-800 hover:underline font-medium text-sm"
                         >
                           {isAbstractExpanded(pub.doi, index) ? 'Hide Abstract' : 'Show Abstract'}
@@ -259,11 +363,35 @@ const PublicationsPage: React.FC = () => {
                     </div>
 
                     {/* Abstract (Collapsible) */}
-                    {pub.abstract && isAbstractExpanded(pub.doi, index) && (
+                    {(pub.has_abstract || pub.abstract) && isAbstractExpanded(pub.doi, index) && (
                       <div className="mt-4 p-4 bg-gray-50 rounded-lg border-l-4 border-blue-600">
                         <p className="text-gray-700 text-sm leading-relaxed">
-                          {pub.abstract}
+                          {pub.abstract || 'Loading abstract...'}
                         </p>
+                        {pub.related && pub.related.length > 0 && (
+                          <div className="mt-4">
+                            <p className="font-medium text-gray-800 text-sm mb-1">Related publications:</p>
+                            <ul className="list-disc list-inside space-y-1">
+                              {pub.related.map(pmid => {
+                                const related = findByPmid(pmid)
+                                if (!related) return null
+                                return (
+                                  <li key={pmid} className="text-sm">
+                                    <a
+                                      href={`https://pubmed.ncbi.nlm.nih.gov/${pmid}/`}
+                                      target="_blank"
+                                      rel="noopener noreferrer"
+                                      className="text-blue-600 hover:text-blue-800 hover:underline"
+                                    >
+                                      {related.title}
+                                    </a>
+                                    <span className="text-gray-500"> ({related.year})</span>
+                                  </li>
+                                )
+                              })}
+                            </ul>
+                          </div>
+                        )}
                       </div>
                     )}
                   </div>
@@ -276,7 +404,7 @@ const PublicationsPage: React.FC = () => {
 
       {/* No Results Message */}
       {searchTerm && yearsToDisplay.every(year => 
-        filterPublications(data.publications_by_year[year] || []).length === 0
+        filterPublications(getPublications(year)).length === 0
       ) && (
         <div className="bg-yellow-50 border border-yellow-200 rounded-lg p-6 text-center">
           <p className="text-yellow-800">
@@ -1,4 +1,5 @@
 import React, { useState, useEffect } from 'react'
+import ResponsiveImage from '../components/ResponsiveImage'
 
 interface TeamMember {
   name: string
@@ -6,77 +7,39 @@ interface TeamMember {
   interests: string
   scholar: string
   photo?: string
-  category: string
+  photo_width?: number
+  photo_height?: number
+  photo_srcset?: { [type: string]: string }
 }
 
-const CATEGORIES = [
-  { key: 'principal-investigator', title: 'Principal Investigator' },
-  { key: 'instructors', title: 'Instructors' },
-  { key: 'postdocs', title: 'Postdocs' },
-  { key: 'research-fellows', title: 'Research Fellows' },
-  { key: 'phd-students', title: 'PhD Students' },
-  { key: 'masters-students', title: 'Masters Students' },
-  { key: 'administrative-staff', title: 'Administrative Staff' },
-]
+interface TeamCategory {
+  key: string
+  title: string
+  members: TeamMember[]
+}
+
+interface TeamData {
+  generated_at: string
+  total_members: number
+  categories: TeamCategory[]
+}
 
 const TeamPage: React.FC = () => {
-  const [team, setTeam] = useState<{ [key: string]: TeamMember[] }>({})
+  const [categories, setCategories] = useState<TeamCategory[]>([])
   const [loading, setLoading] = useState(true)
 
   useEffect(() => {
-    const loadTeam = async () => {
-      try {
-        const allMembers: { [key: string]: TeamMember[] } = {}
-        
-        for (const category of CATEGORIES) {
-          const response = await fetch(`/data/team/${category.key}/index.json`)
-          const files: string[] = await response.json()
-          
-          const members = await Promise.all(
-            files.map(async (filename) => {
-              const baseName = filename.replace('.txt', '')
-              const txtResponse = await fetch(`/data/team/${category.key}/${filename}`)
-              const txtContent = await txtResponse.text()
-              
-              // .txt file parsing
-              const lines = txtContent.trim().split('\n\n')
-              const name = lines[0]
-              const title = lines[1]
-              const interests = lines[2]
-              const scholar = lines[3]
-              
-              // Check for photo existence
-              let photo: string | undefined
-              try {
-                const photoResponse = await fetch(`/data/team/${category.key}/${baseName}.jpg`)
-                if (photoResponse.ok) photo = `/data/team/${category.key}/${baseName}.jpg`
-              } catch {
-                // No photo available
-              }
-              
-              return {
-                name,
-                title,
-                interests,
-                scholar,
-                photo,
-                category: category.title
-              }
-            })
-          )
-          
-          allMembers[category.key] = members
+    // One request: team.json is bundled by update_team_backend.py
+    fetch('/team.json')
+      .then(response => {
+        if (!response.ok) {
+          throw new Error('Failed to load team')
         }
-        
-        setTeam(allMembers)
-      } catch (error) {
-        console.error('Error loading team:', error)
-      } finally {
-        setLoading(false)
-      }
-    }
-    
-    loadTeam()
+        return response.json()
+      })
+      .then((data: TeamData) => setCategories(data.categories))
+      .catch(error => console.error('Error loading team:', error))
+      .finally(() => setLoading(false))
   }, [])
 
   if (loading) {
@@ -89,8 +52,8 @@ const TeamPage: React.FC = () => {
         Team
       </h1>
       
-      {CATEGORIES.map((category) => {
-        const members = team[category.key] || []
+      {categories.map((category) => {
+        const members = category.members
         if (members.length === 0) return null
         
         return (
@@ -102,9 +65,13 @@ const TeamPage: React.FC = () => {
               {members.map((member, idx) => (
                 <div key={idx} className="bg-white rounded-lg shadow-md p-6 border border-gray-200">
                   {member.photo && (
-                    <img 
-                      src={member.photo} 
+                    <ResponsiveImage
+                      src={member.photo}
                       alt={member.name}
+                      width={member.photo_width}
+                      height={member.photo_height}
+                      srcset={member.photo_srcset}
+                      sizes="128px"
                       className="w-32 h-32 rounded-full mx-auto mb-4 object-cover"
                     />
                   )}
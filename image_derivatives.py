@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""
+Генерация адаптивных копий изображений (WebP/AVIF нескольких ширин) для новостей и команды
+Запуск: python image_derivatives.py
+update_news_backend.py и update_team_backend.py вызывают этот модуль сами и кладут srcset в news.json / team.json;
+отдельный запуск только догенерирует копии и удаляет копии удалённых оригиналов
+"""
+
+import os
+import json
+import hashlib
+import threading
+from PIL import Image, ImageOps, features
+import pipeline_metrics
+from backend_utils import process_pool, temp_path_for, write_json_atomic
+
+# CONFIGURATION
+PUBLIC_DIR = "frontend/public"  # Корень, от которого считаются URL изображений
+SOURCE_DIRS = ["frontend/public/data/news", "frontend/public/data/team"]  # Где искать оригиналы
+DERIVED_DIR = "frontend/public/data/derived"  # Копии именуются по хэшу содержимого оригинала
+IMAGE_MANIFEST = ".cache/image_manifest.json"  # stat -> хэш и размеры, чтобы не перечитывать оригиналы
+SOURCE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.gif', '.webp')
+IMAGE_WIDTHS = [320, 640, 1280]
+IMAGE_FORMATS = {  # format -> (MIME type, save options)
+    'avif': ('image/avif', {'quality': 55}),
+    'webp': ('image/webp', {'quality': 80, 'method': 4}),
+}
+IMAGE_WORKERS = os.cpu_count() or 1
+
+# news and team stages of pipeline.py call build_image_variants from parallel threads;
+# both read-modify-write IMAGE_MANIFEST, so the whole build is serialized
+_build_lock = threading.Lock()
+
+def available_formats():
+    """Форматы, которые поддерживает установленный Pillow (AVIF нужен libavif)"""
+    return [fmt for fmt in IMAGE_FORMATS if features.check(fmt)]
+
+def public_url(path):
+    """Путь в frontend/public -> URL на сайте"""
+    return '/' + os.path.relpath(path, PUBLIC_DIR).replace(os.sep, '/')
+
+def public_path(url):
+    """URL на сайте -> путь в frontend/public"""
+    return os.path.join(PUBLIC_DIR, *url.lstrip('/').split('/'))
+
+def derivative_widths(width):
+    """Ширины копий: не шире оригинала, узкие оригиналы получают одну копию своей ширины"""
+    return sorted({min(w, width) for w in IMAGE_WIDTHS})
+
+def derivative_name(sha256, width, fmt):
+    """Имя файла копии"""
+    return f"{sha256[:16]}-{width}.{fmt}"
+
+def load_image_manifest():
+    """Загрузить кэш stat -> (sha256, размеры)"""
+    try:
+        with open(IMAGE_MANIFEST, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def save_image_manifest(manifest):
+    """Сохранить кэш stat -> (sha256, размеры)"""
+    write_json_atomic(IMAGE_MANIFEST, manifest, indent=None)
+
+def inspect_image(path):
+    """Хэш содержимого и размеры оригинала с учётом EXIF-поворота"""
+    with open(path, 'rb') as f:
+        sha256 = hashlib.sha256(f.read()).hexdigest()
+    with Image.open(path) as img:
+        width, height = img.size
+        # Orientations 5-8 swap the axes once exif_transpose() is applied
+        if img.getexif().get(0x0112, 1) in (5, 6, 7, 8):
+            width, height = height, width
+    return {'sha256': sha256, 'width': width, 'height': height}
+
+def render_derivatives(path, sha256, jobs):
+    """Сохранить недостающие копии одного оригинала (выполняется в пуле процессов)"""
+    with Image.open(path) as img:
+        img = ImageOps.exif_transpose(img)
+        if img.mode not in ('RGB', 'RGBA'):
+            img = img.convert('RGBA' if 'transparency' in img.info or img.mode in ('LA', 'PA') else 'RGB')
+        for width, fmt in jobs:
+            height = max(1, round(img.height * width / img.width))
+            resized = img if width == img.width else img.resize((width, height), Image.LANCZOS)
+            out_path = os.path.join(DERIVED_DIR, derivative_name(sha256, width, fmt))
+            fd, tmp_path = temp_path_for(out_path)
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    resized.save(f, format=fmt.upper(), **IMAGE_FORMATS[fmt][1])
+                os.replace(tmp_path, out_path)
+            except BaseException:
+                os.remove(tmp_path)
+                raise
+    return len(jobs)
+
+def build_image_variants(urls, verbose: bool = True):
+    """Сгенерировать недостающие копии для URL оригиналов и вернуть {url: {width, height, srcset}}"""
+    with _build_lock:
+        return _build_image_variants(urls, verbose)
+
+def _build_image_variants(urls, verbose):
+    """build_image_variants без блокировки"""
+    formats = available_formats()
+    manifest = load_image_manifest()
+    os.makedirs(DERIVED_DIR, exist_ok=True)
+    with os.scandir(DERIVED_DIR) as entries:
+        existing = {entry.name for entry in entries}
+
+    variants = {}
+    pending = []
+    for url in dict.fromkeys(urls):
+        path = public_path(url)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue
+        cached = manifest.get(url)
+        if not cached or cached['mtime_ns'] != stat.st_mtime_ns or cached['size'] != stat.st_size:
+            try:
+                cached = dict(inspect_image(path), mtime_ns=stat.st_mtime_ns, size=stat.st_size)
+            except OSError as e:
+                print(f"Could not read image {path}: {e}")
+                continue
+            manifest[url] = cached
+
+        widths = derivative_widths(cached['width'])
+        jobs = [(w, fmt) for fmt in formats for w in widths
+                if derivative_name(cached['sha256'], w, fmt) not in existing]
+        if jobs:
+            pending.append((path, cached['sha256'], jobs))
+
+        variants[url] = {
+            'width': cached['width'],
+            'height': cached['height'],
+            'srcset': {
+                IMAGE_FORMATS[fmt][0]: ", ".join(
+                    f"{public_url(os.path.join(DERIVED_DIR, derivative_name(cached['sha256'], w, fmt)))} {w}w"
+                    for w in widths
+                )
+                for fmt in formats
+            },
+        }
+
+    pipeline_metrics.count(images=len(variants), derivatives_rendered=sum(len(jobs) for _, _, jobs in pending))
+    if pending:
+        if verbose:
+            print(f"Generating {sum(len(jobs) for _, _, jobs in pending)} image derivatives "
+                  f"for {len(pending)} images with {IMAGE_WORKERS} workers")
+        with process_pool(IMAGE_WORKERS) as executor:
+            futures = [executor.submit(render_derivatives, *job) for job in pending]
+            for (path, _, _), future in zip(pending, futures):
+                try:
+                    future.result()
+                except Exception as e:
+                    print(f"Could not resize {path}: {e}")
+                    variants.pop(public_url(path), None)
+
+    save_image_manifest(manifest)
+    return variants
+
+def find_source_images():
+    """Все оригиналы в SOURCE_DIRS"""
+    urls = []
+    for source_dir in SOURCE_DIRS:
+        for root, _, files in os.walk(source_dir):
+            urls.extend(public_url(os.path.join(root, name)) for name in sorted(files)
+                        if name.lower().endswith(SOURCE_EXTENSIONS))
+    return urls
+
+def remove_orphaned_derivatives(variants):
+    """Удалить копии оригиналов, которых больше нет"""
+    keep = {os.path.basename(src.split(' ')[0])
+            for variant in variants.values()
+            for srcset in variant['srcset'].values()
+            for src in srcset.split(', ')}
+    removed = 0
+    with os.scandir(DERIVED_DIR) as entries:
+        for entry in entries:
+            if entry.is_file() and entry.name not in keep:
+                os.remove(entry.path)
+                removed += 1
+    return removed
+
+def main():
+    """Главная функция"""
+    print("\n" + "="*70)
+    print(" IMAGE DERIVATIVES UPDATE SCRIPT ")
+    print("="*70)
+
+    urls = find_source_images()
+    print(f"Found {len(urls)} source images, formats: {', '.join(available_formats())}")
+    variants = build_image_variants(urls)
+    removed = remove_orphaned_derivatives(variants)
+
+    print("\n" + "="*70)
+    print(" UPDATE COMPLETE ")
+    print("="*70)
+    print(f"Removed {removed} orphaned derivatives")
+    print(f"\nGenerated files:")
+    print(f"  - {DERIVED_DIR}/")
+    print()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,374 @@
+#!/usr/bin/env python3
+"""
+Оркестратор сборки сайта: этапы публикаций, новостей и команды как DAG с отпечатками входов/выходов
+Запуск: python pipeline.py                 (все этапы, неизменившиеся пропускаются)
+        python pipeline.py umap news       (только указанные этапы)
+        python pipeline.py json --deps     (этап вместе со всеми предшествующими)
+"""
+
+import os
+import json
+import inspect
+import hashlib
+import sqlite3
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from contextlib import closing
+from datetime import date, datetime
+
+# Stages run in worker threads; numba's default TBB layer hangs on exit after parallel
+# code ran off the main thread. Only one numba stage (embeddings, then umap) runs at a time.
+os.environ.setdefault("NUMBA_THREADING_LAYER", "workqueue")
+
+import update_publications_backend as publications
+import update_news_backend as news
+import update_team_backend as team
+import pipeline_metrics
+
+# CONFIGURATION
+PIPELINE_STATE = ".cache/pipeline_state.json"  # Отпечатки входов/выходов последнего успешного запуска этапов
+PIPELINE_WORKERS = 3  # Independent stages (publications / news / team) run side by side
+
+# ==================== FINGERPRINTS ====================
+def sha256_file(path):
+    """SHA-256 содержимого файла"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def fingerprint_path(path):
+    """Отпечаток файла или каталога по содержимому (None, если пути нет)"""
+    if os.path.isfile(path):
+        return sha256_file(path)
+    if not os.path.isdir(path):
+        return None
+    digest = hashlib.sha256()
+    for root, dirs, files in os.walk(path):
+        dirs.sort()
+        for name in sorted(files):
+            # Temp files of atomic writes are not part of the output
+            if name.startswith('.'):
+                continue
+            file_path = os.path.join(root, name)
+            digest.update(os.path.relpath(file_path, path).encode('utf-8'))
+            digest.update(sha256_file(file_path).encode('ascii'))
+    return digest.hexdigest()
+
+def fingerprint_publications_db():
+    """Отпечаток содержимого SQLite-хранилища: (pmid, content_hash) всех статей"""
+    if not os.path.exists(publications.DATA_DB):
+        return None
+    digest = hashlib.sha256()
+    # Read-only connection: open_publications_db() would run the DDL and the CSV/Parquet migration
+    try:
+        with closing(sqlite3.connect(f"file:{publications.DATA_DB}?mode=ro", uri=True)) as conn:
+            for pmid, content_hash in conn.execute("SELECT pmid, content_hash FROM publications ORDER BY pmid"):
+                digest.update(f"{pmid}:{content_hash};".encode('ascii'))
+    except sqlite3.Error:
+        return None
+    return digest.hexdigest()
+
+def fingerprint_code(functions):
+    """Отпечаток исходного кода функций этапа: правка шаблона перезапускает только свой этап"""
+    digest = hashlib.sha256()
+    for function in functions:
+        digest.update(inspect.getsource(function).encode('utf-8'))
+    return digest.hexdigest()
+
+def fingerprint_value(value):
+    """Отпечаток JSON-сериализуемого значения"""
+    return hashlib.sha256(json.dumps(value, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+# ==================== STAGES ====================
+class Stage:
+    """Этап сборки: зависимости, входы (файлы, конфиг, код), выходы и функция запуска.
+    after - этапы, которые только должны отработать раньше; их выходы в отпечаток не входят
+    (нужный файл из них указывается в inputs)"""
+
+    def __init__(self, name, run, deps=(), inputs=(), outputs=(), config=None, code=(), output_fingerprint=None,
+                 after=()):
+        self.name = name
+        self.run = run
+        self.deps = list(deps)
+        self.after = list(after)
+        self.inputs = list(inputs)
+        self.outputs = outputs if callable(outputs) else list(outputs)
+        self.config = config or (lambda options: {})
+        self.code = list(code)
+        self.output_fingerprint = output_fingerprint
+
+    def upstream(self):
+        """Этапы, после которых запускается этот"""
+        return self.deps + self.after
+
+    def input_fingerprint(self, options, dep_outputs):
+        """Отпечаток всего, от чего зависит результат этапа"""
+        return fingerprint_value({
+            'config': self.config(options),
+            'code': fingerprint_code(self.code),
+            'inputs': {path: fingerprint_path(path) for path in self.inputs},
+            'deps': {dep: dep_outputs.get(dep) for dep in self.deps},
+        })
+
+    def outputs_fingerprint(self, options):
+        """Отпечаток выходов этапа (None, если какого-то выхода нет)"""
+        if self.output_fingerprint is not None:
+            return self.output_fingerprint()
+        outputs = self.outputs(options) if callable(self.outputs) else self.outputs
+        fingerprints = {path: fingerprint_path(path) for path in outputs}
+        if any(fp is None for fp in fingerprints.values()):
+            return None
+        return fingerprint_value(fingerprints)
+
+def run_fetch(options):
+    """Этап fetch: PubMed -> SQLite-хранилище"""
+    publications.configure_entrez_cache(enabled=not options.no_cache, replay_dir=options.replay)
+    publications.update_publications_csv(full=options.full, export_snapshot=False)
+
+def run_normalize(options):
+    """Этап normalize: SQLite -> типизированный Parquet-снимок и CSV-экспорт"""
+    with closing(publications.open_publications_db()) as conn:
+        publications.export_publications_snapshot(conn)
+
+def run_embeddings(options):
+    """Этап embeddings: эмбеддинги, похожие статьи и поисковый индекс"""
+    publications.generate_embedding_indexes(publications.load_publications(publications.UMAP_COLUMNS))
+
+def run_umap(options):
+    """Этап umap: 3D UMAP, кластеризация и данные для umap.html"""
+    publications.generate_umap_visualization(
+        publications.load_publications(publications.UMAP_COLUMNS), refit_umap=options.refit_umap,
+        write_html=options.umap_html
+    )
+
+def run_publications_json(options):
+    """Этап json: шарды publications для frontend"""
+    publications.generate_publications_json(
+        publications.load_publications(publications.JSON_COLUMNS), monolithic=options.monolithic
+    )
+
+def run_news(options):
+    """Этап news: news.json"""
+    news.generate_news_json()
+
+def run_team(options):
+    """Этап team: team.json"""
+    team.generate_team_json()
+
+STAGES = {stage.name: stage for stage in [
+    Stage(
+        'fetch', run_fetch,
+        inputs=[publications.IMPACT_CSV],
+        # PubMed itself is an input: refetch once a day, or on --full
+        config=lambda options: {
+            'day': date.today().isoformat(),
+            'full': options.full,
+            'authors': publications.AUTHOR_NAMES,
+            'first_year': publications.FIRST_YEAR,
+        },
+        output_fingerprint=fingerprint_publications_db,
+    ),
+    Stage(
+        'normalize', run_normalize, deps=['fetch'],
+        outputs=[publications.DATA_PARQUET, publications.DATA_CSV],
+        code=[publications.query_publications, publications.publications_to_table, publications.save_publications],
+    ),
+    Stage(
+        'embeddings', run_embeddings, deps=['normalize'],
+        outputs=[publications.RELATED_JSON, publications.SEARCH_INDEX_DIR],
+        config=lambda options: {'model': publications.MODEL_NAME, 'top_k': publications.RELATED_TOP_K},
+        code=[publications.advanced_text_cleaning, publications.embed_corpus,
+              publications.generate_embedding_indexes, publications.update_related_publications,
+              publications.write_search_index],
+    ),
+    Stage(
+        'umap', run_umap, deps=['embeddings'],
+        outputs=lambda options: [publications.UMAP_DATA_DIR]
+                                + ([publications.OUTPUT_UMAP] if options.umap_html else []),
+        config=lambda options: {
+            'umap': publications.UMAP_3D_KW,
+            'clustering': {
+                'k': publications.N_CLUSTERS or publications.CLUSTER_K_CANDIDATES,
+                'pca': publications.CLUSTER_PCA_COMPONENTS,
+                'silhouette_sample': publications.CLUSTER_SILHOUETTE_SAMPLE,
+                'kmeans': publications.KMEANS_KW,
+            },
+            'refit': options.refit_umap,
+            'html': options.umap_html,
+        },
+        code=[publications.generate_umap_visualization, publications.project_umap_3d,
+              publications.cluster_embeddings, publications.score_clustering,
+              publications.reduce_embeddings, publications.create_enhanced_stopwords,
+              publications.write_umap_payload, publications.write_umap_html],
+    ),
+    Stage(
+        # Of the embeddings outputs only the related lists end up in the shards
+        'json', run_publications_json, deps=['normalize'], after=['embeddings'],
+        inputs=[publications.RELATED_JSON],
+        outputs=lambda options: [os.path.join(publications.PUBLICATIONS_DIR, 'manifest.json')]
+                                + ([publications.OUTPUT_JSON] if options.monolithic else []),
+        config=lambda options: {'monolithic': options.monolithic},
+        code=[publications.build_publications_data, publications.write_publications_shards,
+              publications.generate_publications_json],
+    ),
+    Stage(
+        'news', run_news,
+        inputs=[news.NEWS_DIR],
+        outputs=[news.OUTPUT_JSON],
+        code=[news.generate_news_json, news.build_news_items, news.build_news_data, news.render_markdown],
+    ),
+    Stage(
+        'team', run_team,
+        inputs=[team.TEAM_DIR],
+        outputs=[team.OUTPUT_JSON],
+        config=lambda options: {'categories': team.CATEGORIES},
+        code=[team.generate_team_json, team.parse_member_file],
+    ),
+]}
+
+# ==================== SCHEDULER ====================
+def load_pipeline_state():
+    """Загрузить отпечатки последнего запуска"""
+    try:
+        with open(PIPELINE_STATE, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def save_pipeline_state(state):
+    """Атомарно сохранить отпечатки этапов"""
+    os.makedirs(os.path.dirname(PIPELINE_STATE), exist_ok=True)
+    tmp_path = f"{PIPELINE_STATE}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp_path, PIPELINE_STATE)
+
+def with_dependencies(names):
+    """Добавить к этапам все предшествующие им"""
+    selected = set()
+    pending = list(names)
+    while pending:
+        name = pending.pop()
+        if name not in selected:
+            selected.add(name)
+            pending.extend(STAGES[name].upstream())
+    return selected
+
+def run_pipeline(selected, options):
+    """Запустить выбранные этапы в порядке DAG; независимые этапы выполняются параллельно"""
+    state = load_pipeline_state()
+    state_lock = threading.Lock()
+    dep_outputs = {}
+    results = {}
+
+    def execute(name):
+        stage = STAGES[name]
+        if options.dry_run and any(results.get(dep) == 'would run' for dep in stage.upstream()):
+            return 'would run', None
+        input_fp = stage.input_fingerprint(options, dep_outputs)
+        previous = state.get(name, {})
+        if not options.force and previous.get('inputs') == input_fp:
+            output_fp = stage.outputs_fingerprint(options)
+            if output_fp is not None and output_fp == previous.get('outputs'):
+                return 'up to date', output_fp
+
+        if options.dry_run:
+            return 'would run', previous.get('outputs')
+
+        print(f"\n>>> [{name}] started at {datetime.now():%H:%M:%S}")
+        with pipeline_metrics.stage(name):
+            stage.run(options)
+        output_fp = stage.outputs_fingerprint(options)
+        with state_lock:
+            state[name] = {'inputs': input_fp, 'outputs': output_fp, 'finished_at': datetime.now().isoformat()}
+            save_pipeline_state(state)
+        return 'done', output_fp
+
+    # Stages outside the selection feed their last known outputs into fingerprints
+    for name in STAGES:
+        if name not in selected:
+            dep_outputs[name] = STAGES[name].outputs_fingerprint(options)
+
+    remaining = [name for name in STAGES if name in selected]
+    running = {}
+    with ThreadPoolExecutor(max_workers=PIPELINE_WORKERS) as executor:
+        while remaining or running:
+            for name in list(remaining):
+                deps = [dep for dep in STAGES[name].upstream() if dep in selected]
+                if any(results.get(dep, '').startswith(('failed', 'skipped')) for dep in deps):
+                    results[name] = 'skipped (upstream failed)'
+                    remaining.remove(name)
+                elif all(dep in results for dep in deps):
+                    running[executor.submit(execute, name)] = name
+                    remaining.remove(name)
+            if not running:
+                continue
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                try:
+                    results[name], dep_outputs[name] = future.result()
+                except Exception as e:
+                    results[name] = f"failed: {e}"
+                    print(f"\n>>> [{name}] failed: {e}")
+    return results
+
+def parse_args(argv=None):
+    """Разобрать аргументы командной строки"""
+    parser = argparse.ArgumentParser(description="Build site data, skipping stages whose inputs are unchanged")
+    parser.add_argument(
+        "stages",
+        nargs="*",
+        metavar="STAGE",
+        help=f"stages to run: {', '.join(STAGES)} (default: all)",
+    )
+    parser.add_argument("--deps", action="store_true", help="also run the stages the selected ones depend on")
+    parser.add_argument("--force", action="store_true", help="run the selected stages even if up to date")
+    parser.add_argument("--dry-run", action="store_true", help="only report which stages would run")
+    parser.add_argument("--full", action="store_true", help="fetch: rescan every year since FIRST_YEAR")
+    parser.add_argument("--no-cache", action="store_true", help="fetch: bypass the Entrez response cache")
+    parser.add_argument("--replay", metavar="DIR", default=None, help="fetch: serve Entrez calls from recorded XML")
+    parser.add_argument("--monolithic", action="store_true", help="json: also write publications.json")
+    parser.add_argument("--refit-umap", action="store_true", help="umap: refit instead of transform()")
+    parser.add_argument("--umap-html", action="store_true", help="umap: also write the Plotly umap_visualization.html")
+    args = parser.parse_args(argv)
+    unknown = [name for name in args.stages if name not in STAGES]
+    if unknown:
+        parser.error(f"unknown stage(s): {', '.join(unknown)} (choose from {', '.join(STAGES)})")
+    return args
+
+def main(argv=None):
+    """Главная функция"""
+    options = parse_args(argv)
+    selected = set(options.stages or STAGES)
+    if options.deps:
+        selected = with_dependencies(selected)
+
+    print("\n" + "="*70)
+    print(" SITE DATA PIPELINE ")
+    print("="*70)
+    print(f"Stages: {', '.join(name for name in STAGES if name in selected)}")
+
+    if options.dry_run:
+        # Nothing runs, so nothing goes into the metrics history
+        results = run_pipeline(selected, options)
+    else:
+        with pipeline_metrics.run('pipeline') as metrics:
+            results = run_pipeline(selected, options)
+            if any(result.startswith('failed') for result in results.values()):
+                metrics.mark_failed()
+
+    print("\n" + "="*70)
+    print(" PIPELINE SUMMARY ")
+    print("="*70)
+    for name in STAGES:
+        if name in results:
+            print(f"  {name:<12} {results[name]}")
+    print()
+    return 1 if any(result.startswith('failed') for result in results.values()) else 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,336 @@
+#!/usr/bin/env python3
+"""
+Метрики запусков backend-скриптов: время (wall/CPU), пиковый RSS и счётчики по этапам
+Каждый этап и каждый запуск пишутся строкой в METRICS_LOG (JSON lines), последний запуск задачи -
+в <job>.prom для textfile collector node_exporter.
+Просмотр истории: python pipeline_metrics.py [--job publications] [--runs 10]
+"""
+
+import os
+import sys
+import json
+import time
+import uuid
+import argparse
+import resource
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+
+# CONFIGURATION
+METRICS_DIR = ".cache/metrics"
+METRICS_LOG = os.path.join(METRICS_DIR, "metrics.jsonl")  # События этапов и итоги запусков, история трендов
+METRICS_LOG_MAX_MB = 20  # Above this size the older half of the log is dropped
+PROMETHEUS_TEXTFILE_DIR = os.environ.get("PROMETHEUS_TEXTFILE_DIR", METRICS_DIR)  # node_exporter --collector.textfile.directory
+PROMETHEUS_PREFIX = "gladyshevlab"
+RSS_SAMPLE_INTERVAL = 0.1  # seconds
+
+_run = None
+_run_lock = threading.Lock()
+_local = threading.local()
+_log_lock = threading.Lock()
+
+# ==================== MEASUREMENT ====================
+def cpu_seconds():
+    """CPU время процесса вместе с завершёнными дочерними процессами (пулы рендеринга)"""
+    own = resource.getrusage(resource.RUSAGE_SELF)
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return own.ru_utime + own.ru_stime + children.ru_utime + children.ru_stime
+
+def current_rss():
+    """Текущий RSS процесса в байтах (на системах без /proc - пиковый)"""
+    try:
+        with open('/proc/self/statm', 'r') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return maxrss if sys.platform == 'darwin' else maxrss * 1024
+
+class StageMetrics:
+    """Метрики одного этапа: время, пиковый RSS за время этапа и счётчики"""
+
+    def __init__(self, name, parent=None):
+        self.name = f"{parent.name}/{name}" if parent else name
+        self.counters = {}
+        self.lock = threading.Lock()
+        self.started_at = datetime.now()
+        self.wall_started = time.perf_counter()
+        self.cpu_started = cpu_seconds()
+        self.peak_rss = current_rss()
+        self.status = 'success'
+
+    def count(self, **counters):
+        """Прибавить значения счётчиков (этап могут считать несколько рабочих потоков)"""
+        with self.lock:
+            for name, value in counters.items():
+                self.counters[name] = self.counters.get(name, 0) + int(value)
+
+    def record(self):
+        """Закрыть этап и вернуть его запись для лога"""
+        self.peak_rss = max(self.peak_rss, current_rss())
+        return {
+            'stage': self.name,
+            'status': self.status,
+            'started_at': self.started_at.isoformat(timespec='seconds'),
+            'wall_seconds': round(time.perf_counter() - self.wall_started, 3),
+            'cpu_seconds': round(cpu_seconds() - self.cpu_started, 3),
+            'peak_rss_bytes': self.peak_rss,
+            'counters': self.counters,
+        }
+
+class RunMetrics:
+    """Один запуск задачи (cron-скрипта или оркестратора): этапы, которые в нём выполнились"""
+
+    def __init__(self, job):
+        self.job = job
+        self.run_id = f"{datetime.now():%Y%m%dT%H%M%S}-{uuid.uuid4().hex[:6]}"
+        self.root = StageMetrics(job)
+        self.stages = []
+        self.failed = False
+        self.active = set()
+        self.lock = threading.Lock()
+        self.stopped = threading.Event()
+        self.sampler = threading.Thread(target=self.sample_rss, name="metrics-rss", daemon=True)
+        self.sampler.start()
+
+    def sample_rss(self):
+        """Фоновый поток: обновлять пиковый RSS всех открытых этапов"""
+        while not self.stopped.wait(RSS_SAMPLE_INTERVAL):
+            rss = current_rss()
+            with self.lock:
+                for stage in list(self.active) + [self.root]:
+                    stage.peak_rss = max(stage.peak_rss, rss)
+
+    def open_stage(self, stage):
+        """Начать отслеживать пиковый RSS этапа"""
+        with self.lock:
+            self.active.add(stage)
+
+    def close_stage(self, stage):
+        """Записать завершённый этап в лог"""
+        with self.lock:
+            self.active.discard(stage)
+            record = dict(stage.record(), type='stage', job=self.job, run_id=self.run_id)
+            # The closing measurement may be the highest one seen by the stages still running
+            for other in list(self.active) + [self.root]:
+                other.peak_rss = max(other.peak_rss, stage.peak_rss)
+            self.stages.append(record)
+        append_log(record)
+
+    def mark_failed(self):
+        """Отметить запуск как неуспешный, хотя исключение обработано внутри (упавший этап оркестратора)"""
+        self.failed = True
+
+    def finish(self, status):
+        """Записать итог запуска в лог и обновить textfile для Prometheus"""
+        self.stopped.set()
+        self.sampler.join()
+        self.root.status = 'failed' if self.failed else status
+        record = dict(self.root.record(), type='run', job=self.job, run_id=self.run_id)
+        del record['stage']
+        append_log(record)
+        write_prometheus_textfile(record, self.stages)
+        print(f"Metrics: {record['wall_seconds']:.1f}s wall, {record['cpu_seconds']:.1f}s CPU, "
+              f"peak RSS {record['peak_rss_bytes'] / 1024 / 1024:.0f} MB -> {METRICS_LOG}")
+        return record
+
+@contextmanager
+def run(job):
+    """Запуск задачи job; вложенный вызов (скрипт внутри оркестратора) продолжает текущий запуск"""
+    global _run
+    with _run_lock:
+        if _run is not None:
+            owner = False
+        else:
+            _run = RunMetrics(job)
+            owner = True
+    if not owner:
+        yield _run
+        return
+
+    status = 'failed'
+    try:
+        yield _run
+        status = 'success'
+    finally:
+        with _run_lock:
+            current, _run = _run, None
+        current.finish(status)
+
+@contextmanager
+def stage(name):
+    """Этап внутри запуска; без активного запуска ничего не записывает"""
+    stack = getattr(_local, 'stack', None)
+    if stack is None:
+        stack = _local.stack = []
+    current = StageMetrics(name, parent=stack[-1] if stack else None)
+    metrics_run = _run
+    if metrics_run is not None:
+        metrics_run.open_stage(current)
+    stack.append(current)
+    try:
+        yield current
+    except BaseException:
+        current.status = 'failed'
+        raise
+    finally:
+        stack.pop()
+        if metrics_run is not None:
+            metrics_run.close_stage(current)
+
+def count(**counters):
+    """Прибавить счётчики к текущему этапу этого потока"""
+    stack = getattr(_local, 'stack', None)
+    if stack:
+        stack[-1].count(**counters)
+
+def current_stage():
+    """Текущий этап потока - передать в рабочие потоки через attach_stage()"""
+    stack = getattr(_local, 'stack', None)
+    return stack[-1] if stack else None
+
+@contextmanager
+def attach_stage(parent):
+    """Считать счётчики и вложенные этапы рабочего потока в этап parent из другого потока"""
+    stack = getattr(_local, 'stack', None)
+    if stack is None:
+        stack = _local.stack = []
+    if parent is not None:
+        stack.append(parent)
+    try:
+        yield
+    finally:
+        if parent is not None:
+            stack.pop()
+
+# ==================== OUTPUT ====================
+def append_log(record):
+    """Дописать запись в METRICS_LOG; слишком большой лог укоротить вдвое, начиная со старых записей"""
+    line = json.dumps(record, ensure_ascii=False) + "\n"
+    with _log_lock:
+        os.makedirs(os.path.dirname(METRICS_LOG), exist_ok=True)
+        with open(METRICS_LOG, 'a', encoding='utf-8') as f:
+            f.write(line)
+        if os.path.getsize(METRICS_LOG) > METRICS_LOG_MAX_MB * 1024 * 1024:
+            with open(METRICS_LOG, 'r', encoding='utf-8') as f:
+                lines = f.readlines()
+            tmp_path = f"{METRICS_LOG}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.writelines(lines[len(lines) // 2:])
+            os.replace(tmp_path, METRICS_LOG)
+
+def prometheus_labels(**labels):
+    """{key="value",...} с экранированием"""
+    escaped = (f'{key}="{str(value).replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34))}"'
+               for key, value in labels.items())
+    return "{" + ",".join(escaped) + "}"
+
+def write_prometheus_textfile(run_record, stage_records):
+    """Записать метрики последнего запуска в <job>.prom (атомарно, как требует textfile collector)"""
+    job = run_record['job']
+    metrics = {
+        'run_success': ("1 if the last run finished without an exception", []),
+        'run_last_timestamp_seconds': ("Unix time the last run finished", []),
+        'run_wall_seconds': ("Wall time of the last run", []),
+        'run_cpu_seconds': ("CPU time of the last run", []),
+        'run_peak_rss_bytes': ("Peak resident memory of the last run", []),
+        'stage_wall_seconds': ("Wall time of a stage in the last run", []),
+        'stage_cpu_seconds': ("Process CPU time during a stage in the last run", []),
+        'stage_peak_rss_bytes': ("Peak resident memory during a stage in the last run", []),
+        'stage_success': ("1 if the stage finished without an exception", []),
+        'stage_items': ("Items counted by a stage in the last run (fetched, new, encoded, cache hits, ...)", []),
+    }
+    labels = prometheus_labels(job=job)
+    metrics['run_success'][1].append((labels, int(run_record['status'] == 'success')))
+    metrics['run_last_timestamp_seconds'][1].append((labels, int(time.time())))
+    metrics['run_wall_seconds'][1].append((labels, run_record['wall_seconds']))
+    metrics['run_cpu_seconds'][1].append((labels, run_record['cpu_seconds']))
+    metrics['run_peak_rss_bytes'][1].append((labels, run_record['peak_rss_bytes']))
+    for record in stage_records:
+        labels = prometheus_labels(job=job, stage=record['stage'])
+        metrics['stage_wall_seconds'][1].append((labels, record['wall_seconds']))
+        metrics['stage_cpu_seconds'][1].append((labels, record['cpu_seconds']))
+        metrics['stage_peak_rss_bytes'][1].append((labels, record['peak_rss_bytes']))
+        metrics['stage_success'][1].append((labels, int(record['status'] == 'success')))
+        for counter, value in sorted(record['counters'].items()):
+            metrics['stage_items'][1].append(
+                (prometheus_labels(job=job, stage=record['stage'], counter=counter), value))
+
+    lines = []
+    for name, (help_text, samples) in metrics.items():
+        if not samples:
+            continue
+        lines.append(f"# HELP {PROMETHEUS_PREFIX}_{name} {help_text}")
+        lines.append(f"# TYPE {PROMETHEUS_PREFIX}_{name} gauge")
+        lines.extend(f"{PROMETHEUS_PREFIX}_{name}{labels} {value}" for labels, value in samples)
+
+    os.makedirs(PROMETHEUS_TEXTFILE_DIR, exist_ok=True)
+    path = os.path.join(PROMETHEUS_TEXTFILE_DIR, f"{PROMETHEUS_PREFIX}_{job}.prom")
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write("\n".join(lines) + "\n")
+    os.replace(tmp_path, path)
+
+# ==================== HISTORY ====================
+def load_history(job=None):
+    """Записи METRICS_LOG (только задачи job, если указана)"""
+    records = []
+    try:
+        with open(METRICS_LOG, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                if job is None or record.get('job') == job:
+                    records.append(record)
+    except OSError:
+        pass
+    return records
+
+def print_history(job, runs=10):
+    """Таблица последних запусков задачи: wall time каждого этапа по запускам"""
+    records = load_history(job)
+    run_records = [r for r in records if r['type'] == 'run'][-runs:]
+    if not run_records:
+        print(f"No {job} runs recorded in {METRICS_LOG}")
+        return
+    run_ids = [r['run_id'] for r in run_records]
+    wall = {}
+    for record in records:
+        if record['type'] == 'stage' and record['run_id'] in run_ids:
+            wall.setdefault(record['stage'], {})[record['run_id']] = record['wall_seconds']
+
+    header = "".join(f" | {r['started_at'][5:16].replace('T', ' '):>11}" for r in run_records)
+    print(f"\n{job}")
+    print(f"{'stage':<32}{header}")
+    print("-" * (32 + 14 * len(run_records)))
+    for name in sorted(wall):
+        cells = "".join(f" | {wall[name][run_id]:>11.2f}" if run_id in wall[name] else f" | {'':>11}"
+                        for run_id in run_ids)
+        print(f"{name[:32]:<32}{cells}")
+    totals = "".join(f" | {r['wall_seconds']:>11.2f}" for r in run_records)
+    print(f"{'total':<32}{totals}")
+    rss = "".join(f" | {r['peak_rss_bytes'] / 1024 / 1024:>9.0f}MB" for r in run_records)
+    print(f"{'peak RSS':<32}{rss}")
+    status = "".join(f" | {r['status']:>11}" for r in run_records)
+    print(f"{'status':<32}{status}")
+
+def parse_args(argv=None):
+    """Разобрать аргументы командной строки"""
+    parser = argparse.ArgumentParser(description=f"Show stage timings of recent runs from {METRICS_LOG}")
+    parser.add_argument('--job', help="only runs of this job (publications, news, team, pipeline)")
+    parser.add_argument('--runs', type=int, default=10, help="number of most recent runs to show")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    """Главная функция"""
+    args = parse_args(argv)
+    jobs = [args.job] if args.job else sorted({r['job'] for r in load_history() if r['type'] == 'run'})
+    if not jobs:
+        print(f"No runs recorded in {METRICS_LOG}")
+    for job in jobs:
+        print_history(job, runs=args.runs)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+"""
+Общие фикстуры тестов: рабочий каталог во временной папке и SyntheticEntrez вместо NCBI
+Запуск: python -m pytest -q tests
+"""
+
+import os
+import sys
+
+import pytest
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [ROOT_DIR, os.path.join(ROOT_DIR, "benchmarks")]
+
+import update_publications_backend as backend
+from synthetic import SyntheticEntrez
+
+SYNTHETIC_YEARS = [2023, 2024, 2025]
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    """Все относительные пути backend (хранилище, кэши, frontend/public) - во временной папке"""
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+@pytest.fixture
+def entrez(workdir, monkeypatch):
+    """SyntheticEntrez на месте Bio.Entrez: 60 статей за SYNTHETIC_YEARS, без ограничения частоты"""
+    stand_in = SyntheticEntrez(60, SYNTHETIC_YEARS)
+    module = backend.get_entrez()
+    monkeypatch.setattr(module, 'esearch', stand_in.esearch)
+    monkeypatch.setattr(module, 'efetch', stand_in.efetch)
+    monkeypatch.setattr(backend, '_entrez_bucket', backend.TokenBucket(rate=1e9, capacity=1e9))
+    monkeypatch.setattr(backend, '_journal_index', None)
+    monkeypatch.setattr(backend, 'FIRST_YEAR', SYNTHETIC_YEARS[0])
+    # configure_entrez_cache() rebinds these globals; monkeypatch restores them after the test
+    monkeypatch.setattr(backend, 'ENTREZ_CACHE_ENABLED', True)
+    monkeypatch.setattr(backend, 'ENTREZ_REPLAY_DIR', None)
+    return stand_in
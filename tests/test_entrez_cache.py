@@ -0,0 +1,80 @@
+"""
+Кэш ответов Entrez и режим replay
+"""
+
+import pytest
+
+import update_publications_backend as backend
+from synthetic import SyntheticEntrez, record_pubmed_replay
+
+
+def count_calls(entrez, monkeypatch):
+    """Считать обращения к esearch/efetch заменителя NCBI"""
+    calls = []
+    module = backend.get_entrez()
+    for name in ('esearch', 'efetch'):
+        func = getattr(entrez, name)
+        monkeypatch.setattr(module, name, lambda *args, _name=name, _func=func, **kwargs:
+                            calls.append(_name) or _func(*args, **kwargs))
+    return calls
+
+
+def test_cache_key_ignores_id_order_and_whitespace():
+    key = backend.entrez_cache_key('efetch', db="pubmed", id=["3", "1", "2"])
+    assert key == backend.entrez_cache_key('efetch', db="pubmed", id=["1", "2", "3"])
+    assert (backend.entrez_cache_key('esearch', db="pubmed", term="a  OR\nb")
+            == backend.entrez_cache_key('esearch', db="pubmed", term="a OR b"))
+
+
+def test_cache_key_depends_on_kind_and_params():
+    key = backend.entrez_cache_key('efetch', db="pubmed", id=["1", "2"])
+    assert key.startswith('efetch-')
+    assert key != backend.entrez_cache_key('esearch', db="pubmed", id=["1", "2"])
+    assert key != backend.entrez_cache_key('efetch', db="pubmed", id=["1", "3"])
+
+
+def test_second_fetch_is_served_from_cache(entrez, monkeypatch):
+    calls = count_calls(entrez, monkeypatch)
+    first = backend.fetch_pubmed_articles(2024)
+    assert calls == ['esearch', 'efetch']
+
+    calls.clear()
+    assert backend.fetch_pubmed_articles(2024) == first
+    assert calls == []
+
+
+def test_disabled_cache_always_hits_the_network(entrez, monkeypatch):
+    calls = count_calls(entrez, monkeypatch)
+    backend.configure_entrez_cache(enabled=False)
+    backend.fetch_pubmed_articles(2024)
+    backend.fetch_pubmed_articles(2024)
+    assert calls == ['esearch', 'efetch'] * 2
+
+
+def test_cached_search_is_rerun_before_paging_by_webenv(entrez, monkeypatch):
+    # A truncated IdList sends the page to the history server instead of the PMID-keyed cache
+    monkeypatch.setattr(backend, 'ESEARCH_MAX_IDS', 10)
+    first = backend.fetch_pubmed_articles(2024)
+    entrez.expire_sessions()
+
+    calls = count_calls(entrez, monkeypatch)
+    assert backend.fetch_pubmed_articles(2024) == first
+    assert calls == ['esearch', 'efetch']
+
+
+def test_replay_serves_recorded_responses_without_network(entrez, workdir, monkeypatch):
+    replay_dir = str(workdir / "replay")
+    record_pubmed_replay(backend, replay_dir, 30, [2024, 2025])
+    recorded = SyntheticEntrez(30, [2024, 2025]).pmids_by_year[2024]
+
+    def offline(*args, **kwargs):
+        raise AssertionError("replay mode must not call Entrez")
+
+    module = backend.get_entrez()
+    monkeypatch.setattr(module, 'esearch', offline)
+    monkeypatch.setattr(module, 'efetch', offline)
+    backend.configure_entrez_cache(enabled=False, replay_dir=replay_dir)
+
+    assert [record['pmid'] for record in backend.fetch_pubmed_articles(2024)] == recorded
+    with pytest.raises(LookupError):
+        backend.fetch_pubmed_articles(2023)
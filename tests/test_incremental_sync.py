@@ -0,0 +1,78 @@
+"""
+Инкрементальная синхронизация с PubMed: watermark и upsert в SQLite-хранилище
+"""
+
+from contextlib import closing
+from datetime import datetime, timedelta
+
+import update_publications_backend as backend
+
+
+def stored_publications(conn):
+    """pmid -> content_hash всех статей хранилища"""
+    return dict(conn.execute("SELECT pmid, content_hash FROM publications"))
+
+
+def test_first_sync_is_full_and_saves_watermark(entrez):
+    df = backend.update_publications_csv()
+
+    assert len(df) == 60
+    assert all('[PDAT]' in term for term in entrez.terms)
+    with closing(backend.open_publications_db()) as conn:
+        assert len(stored_publications(conn)) == 60
+        assert backend.load_sync_state(conn)['last_sync'] == datetime.now().strftime('%Y/%m/%d')
+
+
+def test_incremental_sync_queries_since_watermark_with_overlap(entrez):
+    backend.update_publications_csv()
+    with closing(backend.open_publications_db()) as conn, conn:
+        backend.set_meta(conn, last_sync='2025/03/10')
+    entrez.terms.clear()
+
+    backend.update_publications_csv()
+
+    since = (datetime(2025, 3, 10) - timedelta(days=backend.SYNC_OVERLAP_DAYS)).strftime('%Y/%m/%d')
+    assert len(entrez.terms) == 1
+    assert f'"{since}"[EDAT]' in entrez.terms[0] and f'"{since}"[LR]' in entrez.terms[0]
+    with closing(backend.open_publications_db()) as conn:
+        assert backend.load_sync_state(conn)['last_sync'] == datetime.now().strftime('%Y/%m/%d')
+
+
+def test_incremental_sync_upserts_new_and_revised_records(entrez):
+    backend.update_publications_csv()
+    with closing(backend.open_publications_db()) as conn:
+        before = stored_publications(conn)
+
+    new_pmids = entrez.add_articles(2, 2025)
+    revised = entrez.pmids_by_year[2024][0]
+    entrez.revise(revised)
+    df = backend.update_publications_csv()
+
+    assert len(df) == 62
+    with closing(backend.open_publications_db()) as conn:
+        after = stored_publications(conn)
+    assert set(after) - set(before) == {int(pmid) for pmid in new_pmids}
+    changed = {pmid for pmid in before if before[pmid] != after[pmid]}
+    assert changed == {int(revised)}
+
+
+def test_unchanged_records_are_not_rewritten(entrez):
+    backend.update_publications_csv()
+    fetched = backend.articles_to_dataframe(backend.fetch_pubmed_articles(2024))
+
+    with closing(backend.open_publications_db()) as conn, conn:
+        assert backend.upsert_publications(conn, fetched) == (0, 0)
+
+
+def test_full_rescan_removes_records_gone_from_pubmed(entrez):
+    backend.update_publications_csv()
+    removed = entrez.pmids_by_year[2023].pop()
+
+    # Yearly search results are cached for ENTREZ_CACHE_TTL; bypass the cache as --no-cache does
+    backend.configure_entrez_cache(enabled=False)
+    backend.update_publications_csv(full=True)
+
+    with closing(backend.open_publications_db()) as conn:
+        publications = stored_publications(conn)
+    assert len(publications) == 59
+    assert int(removed) not in publications
@@ -0,0 +1,160 @@
+"""
+Оркестратор pipeline.py: пропуск неизменившихся этапов, --dry-run и сбои этапов
+"""
+
+import os
+import sqlite3
+from contextlib import closing
+
+import pytest
+
+import pipeline
+import pipeline_metrics
+
+
+def read(path):
+    """Содержимое текстового файла"""
+    with open(path, 'r', encoding='utf-8') as f:
+        return f.read()
+
+
+def write(path, text):
+    """Записать текстовый файл"""
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(text)
+
+
+@pytest.fixture
+def stages(workdir, monkeypatch):
+    """Три этапа на файлах: a (src.txt) -> b, и независимый c (other.txt); возвращает журнал запусков"""
+    runs = []
+
+    def stage(name, source, target):
+        def run(options):
+            runs.append(name)
+            if read(source) == 'fail':
+                raise RuntimeError(f"{name} failed")
+            write(target, read(source).upper())
+        return run
+
+    write('src.txt', 'alpha')
+    write('other.txt', 'gamma')
+    monkeypatch.setattr(pipeline, 'STAGES', {s.name: s for s in [
+        pipeline.Stage('a', stage('a', 'src.txt', 'a.out'), inputs=['src.txt'], outputs=['a.out']),
+        pipeline.Stage('b', stage('b', 'a.out', 'b.out'), deps=['a'], outputs=['b.out']),
+        pipeline.Stage('c', stage('c', 'other.txt', 'c.out'), inputs=['other.txt'], outputs=['c.out']),
+    ]})
+    monkeypatch.setattr(pipeline_metrics, 'PROMETHEUS_TEXTFILE_DIR', pipeline_metrics.METRICS_DIR)
+    return runs
+
+
+def run_stages(*argv):
+    """Прогнать выбранные этапы и вернуть {этап: результат}"""
+    options = pipeline.parse_args(list(argv))
+    return pipeline.run_pipeline(set(options.stages or pipeline.STAGES), options)
+
+
+def test_second_run_skips_everything(stages):
+    assert run_stages() == {'a': 'done', 'b': 'done', 'c': 'done'}
+    assert run_stages() == {'a': 'up to date', 'b': 'up to date', 'c': 'up to date'}
+    assert sorted(stages) == ['a', 'b', 'c']
+
+
+def test_changed_input_reruns_stage_and_dependents(stages):
+    run_stages()
+    stages.clear()
+    write('src.txt', 'beta')
+
+    assert run_stages() == {'a': 'done', 'b': 'done', 'c': 'up to date'}
+    assert read('b.out') == 'BETA'
+
+
+def test_unchanged_output_does_not_rerun_dependents(stages):
+    run_stages()
+    stages.clear()
+    # A new input that produces the same output: b sees the same a.out fingerprint
+    write('src.txt', 'ALPHA')
+
+    assert run_stages() == {'a': 'done', 'b': 'up to date', 'c': 'up to date'}
+
+
+def test_missing_output_reruns_only_its_stage(stages):
+    run_stages()
+    stages.clear()
+    os.remove('b.out')
+
+    assert run_stages() == {'a': 'up to date', 'b': 'done', 'c': 'up to date'}
+    assert stages == ['b']
+
+
+def test_force_reruns_selected_stages(stages):
+    run_stages()
+    stages.clear()
+
+    assert run_stages('c', '--force') == {'c': 'done'}
+    assert stages == ['c']
+
+
+def test_dry_run_reports_without_side_effects(stages):
+    run_stages()
+    stages.clear()
+    write('src.txt', 'beta')
+    state = read(pipeline.PIPELINE_STATE)
+
+    assert pipeline.main(['--dry-run']) == 0
+    assert run_stages('--dry-run') == {'a': 'would run', 'b': 'would run', 'c': 'up to date'}
+    assert stages == []
+    assert read(pipeline.PIPELINE_STATE) == state
+    assert not os.path.exists(pipeline_metrics.METRICS_LOG)
+
+
+def test_failed_stage_skips_dependents_and_is_retried(stages):
+    write('src.txt', 'fail')
+
+    assert run_stages() == {'a': 'failed: a failed', 'b': 'skipped (upstream failed)', 'c': 'done'}
+    assert pipeline.main([]) == 1
+    assert os.path.exists(pipeline_metrics.METRICS_LOG)
+
+    write('src.txt', 'alpha')
+    assert run_stages() == {'a': 'done', 'b': 'done', 'c': 'up to date'}
+
+
+def test_store_fingerprint_does_not_create_or_migrate_the_store(workdir):
+    write(pipeline.publications.DATA_CSV, "title,pmid\nPaper,1\n")
+    assert pipeline.fingerprint_publications_db() is None
+    assert not os.path.exists(pipeline.publications.DATA_DB)
+
+    # An existing but never migrated store stays untouched as well
+    sqlite3.connect(pipeline.publications.DATA_DB).close()
+    assert pipeline.fingerprint_publications_db() is None
+    with closing(sqlite3.connect(pipeline.publications.DATA_DB)) as conn:
+        assert conn.execute("SELECT name FROM sqlite_master").fetchall() == []
+
+
+def test_after_stage_ignores_unlisted_outputs_of_its_predecessor(workdir, monkeypatch):
+    runs = []
+
+    def produce(options):
+        runs.append('a')
+        write('a.out', read('src.txt').upper())
+        # A timestamped side output, like a generated_at field
+        write('a.log', str(len(runs)))
+
+    def consume(options):
+        runs.append('d')
+        write('d.out', read('a.out'))
+
+    write('src.txt', 'alpha')
+    monkeypatch.setattr(pipeline, 'STAGES', {s.name: s for s in [
+        pipeline.Stage('a', produce, inputs=['src.txt'], outputs=['a.out', 'a.log']),
+        pipeline.Stage('d', consume, after=['a'], inputs=['a.out'], outputs=['d.out']),
+    ]})
+
+    assert run_stages() == {'a': 'done', 'd': 'done'}
+    assert run_stages('a', '--force') == {'a': 'done'}
+    assert run_stages() == {'a': 'up to date', 'd': 'up to date'}
+
+    write('src.txt', 'beta')
+    assert run_stages() == {'a': 'done', 'd': 'done'}
+    assert read('d.out') == 'BETA'
+    assert pipeline.with_dependencies({'d'}) == {'a', 'd'}
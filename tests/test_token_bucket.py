@@ -0,0 +1,56 @@
+"""
+Общий limiter запросов к NCBI
+"""
+
+import time
+import threading
+
+import update_publications_backend as backend
+
+
+def test_burst_is_limited_to_capacity():
+    bucket = backend.TokenBucket(rate=50)
+    started = time.monotonic()
+    for _ in range(6):
+        bucket.acquire()
+    # The first token is available at once, the other five arrive at 50 per second
+    assert 0.09 <= time.monotonic() - started < 1.0
+
+
+def test_capacity_allows_an_immediate_burst():
+    bucket = backend.TokenBucket(rate=1, capacity=5)
+    started = time.monotonic()
+    for _ in range(5):
+        bucket.acquire()
+    assert time.monotonic() - started < 0.05
+
+
+def test_rate_is_shared_between_threads():
+    bucket = backend.TokenBucket(rate=100)
+    acquired = []
+
+    def worker():
+        for _ in range(5):
+            bucket.acquire()
+            acquired.append(time.monotonic())
+
+    started = time.monotonic()
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(acquired) == 20
+    # 20 tokens at 100 per second, whatever the number of threads asking for them
+    assert max(acquired) - started >= 0.18
+
+
+def test_limiter_rate_follows_api_key(monkeypatch):
+    monkeypatch.setattr(backend, '_entrez_bucket', None)
+    monkeypatch.setattr(backend, 'NCBI_API_KEY', None)
+    assert backend.get_entrez_bucket().rate == backend.ENTREZ_RATE_WITHOUT_KEY
+
+    monkeypatch.setattr(backend, '_entrez_bucket', None)
+    monkeypatch.setattr(backend, 'NCBI_API_KEY', "key")
+    assert backend.get_entrez_bucket().rate == backend.ENTREZ_RATE_WITH_KEY
@@ -0,0 +1,106 @@
+"""
+Бинарные данные UMAP для umap.html: раскладка массивов, manifest.json и смена поколений файлов
+"""
+
+import os
+import json
+
+import numpy as np
+import pandas as pd
+
+import update_publications_backend as backend
+
+DTYPES = {'f4': '<f4', 'u4': '<u4', 'u2': '<u2', 'u1': 'u1'}
+
+
+def payload(n=50, seed=0, k=3):
+    """Аргументы write_umap_payload для n статей в k кластерах"""
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({'pmid': [str(30000000 + i) for i in range(n)]})
+    coords = rng.standard_normal((n, 3))
+    labels = np.arange(n) % k
+    years = rng.integers(1994, 2026, n)
+    cluster_labels = {c: f"Topic {c}" for c in range(k)}
+    cluster_keywords = {c: [f"word{c}", "aging"] for c in range(k)}
+    quality = {'k': k, 'silhouette': 0.123456, 'silhouette_sample': n}
+    return df, coords, labels, years, cluster_labels, cluster_keywords, quality
+
+
+def read_payload():
+    """manifest.json и массивы, прочитанные так же, как их читает umap.html"""
+    with open(os.path.join(backend.UMAP_DATA_DIR, 'manifest.json'), 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+    with open(os.path.join(backend.UMAP_DATA_DIR, manifest['file']), 'rb') as f:
+        data = f.read()
+    arrays = {
+        name: np.frombuffer(data, dtype=DTYPES[spec['dtype']], count=spec['length'], offset=spec['offset'])
+        for name, spec in manifest['arrays'].items()
+    }
+    return manifest, data, arrays
+
+
+def test_arrays_round_trip(workdir):
+    df, coords, labels, years, *rest = payload()
+    backend.write_umap_payload(df, coords, labels, years, *rest)
+    manifest, data, arrays = read_payload()
+
+    assert manifest['count'] == 50 and manifest['size'] == len(data) == 50 * 19
+    np.testing.assert_array_equal(arrays['coords'].reshape(-1, 3), coords.astype(np.float32))
+    np.testing.assert_array_equal(arrays['pmids'], df['pmid'].astype(int))
+    np.testing.assert_array_equal(arrays['years'], years)
+    np.testing.assert_array_equal(arrays['clusters'], labels)
+    assert (manifest['year_min'], manifest['year_max']) == (years.min(), years.max())
+
+
+def test_offsets_are_aligned_for_typed_arrays(workdir):
+    # An odd count would misalign every array placed after a narrower one
+    backend.write_umap_payload(*payload(n=37))
+    manifest, _, _ = read_payload()
+
+    end = 0
+    for name in ('coords', 'pmids', 'years', 'clusters'):
+        spec = manifest['arrays'][name]
+        itemsize = np.dtype(DTYPES[spec['dtype']]).itemsize
+        assert spec['offset'] == end
+        assert spec['offset'] % itemsize == 0
+        end += spec['length'] * itemsize
+    assert end == manifest['size']
+
+
+def test_manifest_describes_clusters(workdir):
+    df, coords, labels, years, cluster_labels, cluster_keywords, quality = payload()
+    cluster_labels[3] = "Empty"
+    cluster_keywords[3] = []
+    backend.write_umap_payload(df, coords, labels, years, cluster_labels, cluster_keywords, quality)
+    manifest, _, _ = read_payload()
+
+    assert [cluster['id'] for cluster in manifest['clusters']] == [0, 1, 2]
+    first = manifest['clusters'][0]
+    assert first['label'] == "Topic 0" and first['count'] == int((labels == 0).sum())
+    np.testing.assert_allclose(first['center'], coords[labels == 0].mean(axis=0), atol=1e-4)
+    assert manifest['quality']['silhouette'] == 0.1235
+
+
+def test_missing_pmid_is_stored_as_zero(workdir):
+    df, *rest = payload(n=12)
+    df.loc[4, 'pmid'] = None
+    backend.write_umap_payload(df, *rest)
+    _, _, arrays = read_payload()
+
+    assert arrays['pmids'][4] == 0
+    assert arrays['pmids'][5] == 30000005
+
+
+def test_previous_points_file_is_kept_for_one_generation(workdir):
+    names = []
+    for seed in range(3):
+        backend.write_umap_payload(*payload(seed=seed))
+        names.append(read_payload()[0]['file'])
+    assert len(set(names)) == 3
+
+    files = sorted(name for name in os.listdir(backend.UMAP_DATA_DIR) if name.endswith('.bin'))
+    assert files == sorted(names[1:])
+
+    # Unchanged data keeps its file name, so browsers can cache it
+    backend.write_umap_payload(*payload(seed=2))
+    assert read_payload()[0]['file'] == names[2]
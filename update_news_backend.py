@@ -2,18 +2,32 @@
 """
 Backend скрипт для генерации news.json из markdown файлов
 Запуск: python update_news_backend.py
+Режим наблюдения: python update_news_backend.py --watch
 """
 
 import os
 import json
 import re
+import time
+import hashlib
+import argparse
+import threading
 from datetime import datetime
 from pathlib import Path
 import markdown
+import pipeline_metrics
+from backend_utils import process_pool, write_json_atomic
 
 # CONFIGURATION
 NEWS_DIR = "frontend/public/data/news"  # Директория с markdown файлами новостей
 OUTPUT_JSON = "frontend/public/news.json"  # Выходной JSON файл
+NEWS_MANIFEST = ".cache/news_manifest.json"  # Хэш/mtime и отрендеренный HTML каждой новости
+IMAGE_EXTENSIONS = ['.jpg', '.jpeg', '.png', '.gif', '.webp']  # In lookup priority order
+MARKDOWN_EXTENSIONS = ['extra', 'nl2br']
+RENDER_WORKERS = os.cpu_count() or 1
+RENDER_POOL_MIN_FILES = 16  # Below this many uncached posts a process pool costs more than it saves
+WATCH_DEBOUNCE_SECONDS = 0.25  # --watch: wait for this much quiet before rebuilding
+WATCH_POLL_INTERVAL = 1.0  # --watch without watchdog: seconds between directory scans
 
 def parse_news_filename(filename):
     """
@@ -64,167 +78,384 @@ def extract_title_from_markdown(content):
             return title.strip()
     return None
 
-def read_markdown_file(filepath):
-    """Прочитать и конвертировать markdown в HTML"""
+def render_markdown(md_content):
+    """Конвертировать markdown в HTML и извлечь заголовок"""
+    # Extract title before converting
+    title = extract_title_from_markdown(md_content)
+    
+    # Convert to HTML
+    html_content = markdown.markdown(md_content, extensions=MARKDOWN_EXTENSIONS)
+    
+    # Remove title from html_content
+    html_content = html_content.replace(f'<h1>{title}</h1>', '')
+    
+    return html_content, title
+
+def render_news_file(filepath):
+    """Прочитать, захэшировать и отрендерить одну новость (выполняется в пуле процессов)"""
     try:
-        with open(filepath, 'r', encoding='utf-8') as f:
-            md_content = f.read()
-        
-        # Extract title before converting
-        title = extract_title_from_markdown(md_content)
-        
-        # Convert to HTML
-        html_content = markdown.markdown(md_content, extensions=['extra', 'nl2br'])
-        
-        # Remove title from html_content
-        html_content = html_content.replace(f'<h1>{title}</h1>', '')
-        
-        return html_content, title
+        with open(filepath, 'rb') as f:
+            raw = f.read()
+        html_content, title = render_markdown(raw.decode('utf-8'))
+        return {'sha256': hashlib.sha256(raw).hexdigest(), 'content': html_content, 'title': title}
     except Exception as e:
         print(f"Error reading {filepath}: {e}")
-        return None, None
+        return None
 
-def find_image(news_dir, basename):
-    """Найти изображение для новости"""
-    extensions = ['.jpg', '.jpeg', '.png', '.gif', '.webp']
-    
-    for ext in extensions:
-        img_path = os.path.join(news_dir, basename + ext)
-        if os.path.exists(img_path):
-            return f"/data/news/{basename}{ext}"
-    
-    return None
+def file_sha256(filepath):
+    """SHA-256 содержимого файла"""
+    with open(filepath, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
 
-def generate_news_json():
-    """Генерировать news.json из markdown файлов"""
-    print(f"\n{'='*60}")
-    print(f"Generating news.json from markdown files")
-    print(f"{'='*60}\n")
+def scan_news_dir(news_dir):
+    """Один проход os.scandir: markdown файлы с их stat и индекс изображений по имени новости"""
+    md_files = {}
+    images = {}
+    with os.scandir(news_dir) as entries:
+        for entry in entries:
+            if not entry.is_file():
+                continue
+            basename, ext = os.path.splitext(entry.name)
+            if entry.name.endswith('.md'):
+                stat = entry.stat()
+                md_files[entry.name] = (stat.st_mtime_ns, stat.st_size)
+            elif ext in IMAGE_EXTENSIONS:
+                images.setdefault(basename, []).append(ext)
     
-    if not os.path.exists(NEWS_DIR):
-        print(f"News directory not found: {NEWS_DIR}")
-        print("Creating empty news.json...")
-        
-        empty_data = {
-            'generated_at': datetime.now().isoformat(),
-            'total_news': 0,
-            'years': [],
-            'news_by_year': {}
-        }
-        
-        os.makedirs(os.path.dirname(OUTPUT_JSON), exist_ok=True)
-        with open(OUTPUT_JSON, 'w', encoding='utf-8') as f:
-            json.dump(empty_data, f, ensure_ascii=False, indent=2)
-        
-        print(f"Empty news.json created: {OUTPUT_JSON}")
-        return
-    
-    # Find all markdown files
-    md_files = [f for f in os.listdir(NEWS_DIR) if f.endswith('.md')]
-    print(f"Found {len(md_files)} markdown files")
+    # Same choice as probing the extensions one by one
+    images = {basename: min(exts, key=IMAGE_EXTENSIONS.index) for basename, exts in images.items()}
+    return md_files, images
+
+def find_image(images, basename):
+    """Найти изображение для новости в индексе scan_news_dir()"""
+    ext = images.get(basename)
+    return f"/data/news/{basename}{ext}" if ext else None
+
+def manifest_signature():
+    """Версия рендера: при её изменении весь кэш новостей пересобирается"""
+    return f"markdown-{markdown.__version__}-{'+'.join(MARKDOWN_EXTENSIONS)}"
+
+def load_news_manifest():
+    """Загрузить манифест отрендеренных новостей"""
+    try:
+        with open(NEWS_MANIFEST, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if manifest.get('signature') != manifest_signature():
+        return {}
+    return manifest.get('posts', {})
+
+def save_news_manifest(posts):
+    """Сохранить манифест отрендеренных новостей"""
+    write_json_atomic(NEWS_MANIFEST, {'signature': manifest_signature(), 'posts': posts}, indent=None)
+
+def render_news_posts(md_files, cached_posts):
+    """Вернуть отрендеренные новости, перерисовывая только изменившиеся файлы"""
+    posts = {}
+    to_render = []
+    for filename, (mtime_ns, size) in md_files.items():
+        cached = cached_posts.get(filename)
+        if cached and cached['mtime_ns'] == mtime_ns and cached['size'] == size:
+            posts[filename] = cached
+            continue
+        filepath = os.path.join(NEWS_DIR, filename)
+        # Touched but unchanged files only cost a hash, not a render
+        if cached and cached['size'] == size and file_sha256(filepath) == cached['sha256']:
+            posts[filename] = dict(cached, mtime_ns=mtime_ns)
+            continue
+        to_render.append(filename)
     
-    if len(md_files) == 0:
-        print("No markdown files found. Creating empty news.json...")
-        
-        empty_data = {
-            'generated_at': datetime.now().isoformat(),
-            'total_news': 0,
-            'years': [],
-            'news_by_year': {}
-        }
-        
-        os.makedirs(os.path.dirname(OUTPUT_JSON), exist_ok=True)
-        with open(OUTPUT_JSON, 'w', encoding='utf-8') as f:
-            json.dump(empty_data, f, ensure_ascii=False, indent=2)
-        
-        print(f"Empty news.json created: {OUTPUT_JSON}")
-        return
+    print(f"Reusing {len(posts)} cached posts, rendering {len(to_render)}")
+    pipeline_metrics.count(cache_hits=len(posts), rendered=len(to_render))
+    paths = [os.path.join(NEWS_DIR, filename) for filename in to_render]
+    if len(to_render) >= RENDER_POOL_MIN_FILES and RENDER_WORKERS > 1:
+        with process_pool(RENDER_WORKERS) as executor:
+            rendered = list(executor.map(render_news_file, paths, chunksize=8))
+    else:
+        rendered = [render_news_file(path) for path in paths]
     
-    # Process each file
+    for filename, result in zip(to_render, rendered):
+        print(f"Processing: {filename}")
+        if result is None:
+            continue
+        mtime_ns, size = md_files[filename]
+        posts[filename] = dict(result, mtime_ns=mtime_ns, size=size)
+    return posts
+
+def build_news_items(filenames, posts, images):
+    """Собрать элементы news.json для данных файлов (новые сверху)"""
     news_items = []
     
-    for filename in md_files:
-        print(f"Processing: {filename}")
-        
+    for filename in filenames:
         date_obj, year = parse_news_filename(filename)
         if not date_obj:
             print(f"  Warning: Could not parse date from {filename}, skipping")
             continue
         
-        filepath = os.path.join(NEWS_DIR, filename)
-        html_content, title = read_markdown_file(filepath)
-        
-        if html_content is None:
+        post = posts.get(filename)
+        if post is None:
             print(f"  Warning: Could not read {filename}, skipping")
             continue
         
         basename = filename.replace('.md', '')
-        image = find_image(NEWS_DIR, basename)
+        image = find_image(images, basename)
         
         news_item = {
             'date': date_obj.strftime('%Y-%m-%d'),
             'formatted_date': date_obj.strftime('%B %d, %Y'),
             'year': year,
-            'content': html_content,
-            'title': title
+            'content': post['content'],
+            'title': post['title']
         }
         
         if image:
             news_item['image'] = image
-            print(f"  Found image: {image}")
         
         news_items.append(news_item)
-        print(f"  Added: {news_item['formatted_date']}")
+    
+    with pipeline_metrics.stage('images'):
+        attach_image_variants(news_items)
     
     # Sort by date (newest first)
     news_items.sort(key=lambda x: x['date'], reverse=True)
+    return news_items
+
+def attach_image_variants(news_items):
+    """Добавить размеры и srcset адаптивных копий изображений (нужен Pillow)"""
+    try:
+        from image_derivatives import build_image_variants
+    except ImportError:
+        print("Pillow is not installed, news images are served without resized copies")
+        return
     
-    # Group by year
-    news_by_year = {}
-    years_set = set()
-    
+    variants = build_image_variants([item['image'] for item in news_items if 'image' in item])
     for item in news_items:
-        year = str(item['year'])
-        years_set.add(item['year'])
-        
-        if year not in news_by_year:
-            news_by_year[year] = []
-        
-        news_by_year[year].append(item)
+        variant = variants.get(item.get('image'))
+        if variant:
+            item['image_width'] = variant['width']
+            item['image_height'] = variant['height']
+            item['image_srcset'] = variant['srcset']
+
+def build_news_data(news_by_year):
+    """Собрать news.json из новостей, сгруппированных по году"""
+    news_by_year = {year: items for year, items in news_by_year.items() if items}
     
     # Sort years (newest first)
-    years = sorted(list(years_set), reverse=True)
+    years = sorted((int(year) for year in news_by_year), reverse=True)
     
-    # Create output data
-    output_data = {
+    return {
         'generated_at': datetime.now().isoformat(),
-        'total_news': len(news_items),
+        'total_news': sum(len(items) for items in news_by_year.values()),
         'years': years,
-        'news_by_year': news_by_year
+        'news_by_year': {str(year): news_by_year[str(year)] for year in years}
     }
+
+def generate_news_json():
+    """Генерировать news.json из markdown файлов"""
+    print(f"\n{'='*60}")
+    print(f"Generating news.json from markdown files")
+    print(f"{'='*60}\n")
     
-    # Create output directory if needed
-    os.makedirs(os.path.dirname(OUTPUT_JSON), exist_ok=True)
+    md_files, images = scan_news_dir(NEWS_DIR) if os.path.exists(NEWS_DIR) else ({}, {})
+    if not os.path.exists(NEWS_DIR):
+        print(f"News directory not found: {NEWS_DIR}")
+    else:
+        print(f"Found {len(md_files)} markdown files")
+    
+    if len(md_files) == 0:
+        print("No markdown files found. Creating empty news.json...")
+        write_json_atomic(OUTPUT_JSON, build_news_data({}))
+        print(f"Empty news.json created: {OUTPUT_JSON}")
+        return
+    
+    with pipeline_metrics.stage('render'):
+        posts = render_news_posts(md_files, load_news_manifest())
+    save_news_manifest(posts)
+    
+    # Group by year
+    news_by_year = {}
+    for item in build_news_items(md_files, posts, images):
+        news_by_year.setdefault(str(item['year']), []).append(item)
+    
+    output_data = build_news_data(news_by_year)
     
     # Save JSON
-    with open(OUTPUT_JSON, 'w', encoding='utf-8') as f:
-        json.dump(output_data, f, ensure_ascii=False, indent=2)
+    write_json_atomic(OUTPUT_JSON, output_data)
     
     print(f"\n{'='*60}")
     print(f"News JSON generated successfully!")
     print(f"{'='*60}")
-    print(f"Total news items: {len(news_items)}")
-    print(f"Years covered: {', '.join(map(str, years))}")
+    print(f"Total news items: {output_data['total_news']}")
+    print(f"Years covered: {', '.join(map(str, output_data['years']))}")
     print(f"Output file: {OUTPUT_JSON}")
     print()
 
-def main():
+# ==================== WATCH MODE ====================
+def news_year_for_path(path):
+    """Год новости, к которой относится файл (markdown или изображение), либо None"""
+    basename = os.path.splitext(os.path.basename(path))[0]
+    _, year = parse_news_filename(basename + '.md')
+    return year
+
+def patch_news_json(years):
+    """Пересобрать в news.json только указанные годы"""
+    try:
+        with open(OUTPUT_JSON, 'r', encoding='utf-8') as f:
+            news_by_year = json.load(f).get('news_by_year', {})
+    except (OSError, ValueError):
+        # No usable news.json yet: build everything
+        generate_news_json()
+        return
+    
+    md_files, images = scan_news_dir(NEWS_DIR)
+    affected = {filename: stat for filename, stat in md_files.items()
+                if news_year_for_path(filename) in years}
+    
+    cached_posts = load_news_manifest()
+    posts = render_news_posts(affected, cached_posts)
+    save_news_manifest({**{f: p for f, p in cached_posts.items() if f in md_files}, **posts})
+    
+    for year in years:
+        news_by_year[str(year)] = []
+    for item in build_news_items(affected, posts, images):
+        news_by_year[str(item['year'])].append(item)
+    
+    output_data = build_news_data(news_by_year)
+    write_json_atomic(OUTPUT_JSON, output_data)
+    print(f"[{datetime.now():%H:%M:%S}] Updated {', '.join(map(str, sorted(years)))} "
+          f"({output_data['total_news']} news items)")
+
+class NewsChanges:
+    """Накопитель изменённых путей, общий для наблюдателя и цикла пересборки"""
+    
+    def __init__(self):
+        self.paths = set()
+        self.last_event = 0.0
+        self.condition = threading.Condition()
+    
+    def add(self, path):
+        with self.condition:
+            self.paths.add(path)
+            self.last_event = time.monotonic()
+            self.condition.notify()
+    
+    def wait_quiet(self, debounce):
+        """Дождаться изменений и паузы в debounce секунд, затем забрать накопленные пути"""
+        with self.condition:
+            while not self.paths:
+                self.condition.wait()
+            while True:
+                remaining = self.last_event + debounce - time.monotonic()
+                if remaining <= 0:
+                    break
+                self.condition.wait(remaining)
+            paths, self.paths = self.paths, set()
+            return paths
+
+def snapshot_news_dir():
+    """stat всех файлов NEWS_DIR для polling-режима"""
+    snapshot = {}
+    with os.scandir(NEWS_DIR) as entries:
+        for entry in entries:
+            if entry.is_file():
+                stat = entry.stat()
+                snapshot[entry.name] = (stat.st_mtime_ns, stat.st_size)
+    return snapshot
+
+def poll_news_dir(changes, interval):
+    """Запасной наблюдатель без watchdog: сравнивать снимки каталога раз в interval секунд"""
+    previous = snapshot_news_dir()
+    while True:
+        time.sleep(interval)
+        current = snapshot_news_dir()
+        for name in previous.keys() | current.keys():
+            if previous.get(name) != current.get(name):
+                changes.add(os.path.join(NEWS_DIR, name))
+        previous = current
+
+def start_news_observer(changes, poll_interval):
+    """Подписаться на события NEWS_DIR через watchdog (inotify/FSEvents) или запустить polling"""
+    try:
+        from watchdog.observers import Observer
+        from watchdog.events import FileSystemEventHandler
+    except ImportError:
+        print(f"watchdog is not installed, polling {NEWS_DIR} every {poll_interval}s")
+        threading.Thread(target=poll_news_dir, args=(changes, poll_interval), daemon=True).start()
+        return None
+    
+    class Handler(FileSystemEventHandler):
+        def on_any_event(self, event):
+            if event.is_directory:
+                return
+            for path in (event.src_path, getattr(event, 'dest_path', None)):
+                # Skip editor swap files and our own temp files
+                if path and not os.path.basename(path).startswith('.'):
+                    changes.add(path)
+    
+    observer = Observer()
+    observer.schedule(Handler(), NEWS_DIR, recursive=False)
+    observer.start()
+    print(f"Watching {NEWS_DIR} for changes")
+    return observer
+
+def watch_news(debounce, poll_interval):
+    """Следить за NEWS_DIR и пересобирать только затронутые годы news.json"""
+    generate_news_json()
+    
+    changes = NewsChanges()
+    observer = start_news_observer(changes, poll_interval)
+    try:
+        while True:
+            paths = changes.wait_quiet(debounce)
+            years = {news_year_for_path(path) for path in paths} - {None}
+            if years:
+                try:
+                    patch_news_json(years)
+                except Exception as e:
+                    print(f"Error updating news.json for {sorted(years)}: {e}")
+    except KeyboardInterrupt:
+        print("\nStopping watch mode")
+    finally:
+        if observer is not None:
+            observer.stop()
+            observer.join()
+
+def parse_args(argv=None):
+    """Разобрать аргументы командной строки"""
+    parser = argparse.ArgumentParser(description="Generate news.json from markdown files")
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="keep running and patch news.json whenever files in NEWS_DIR change",
+    )
+    parser.add_argument(
+        "--debounce",
+        type=float,
+        default=WATCH_DEBOUNCE_SECONDS,
+        help=f"seconds of quiet to wait after a burst of changes (default: {WATCH_DEBOUNCE_SECONDS})",
+    )
+    parser.add_argument(
+        "--poll-interval",
+        type=float,
+        default=WATCH_POLL_INTERVAL,
+        help=f"polling period when watchdog is not installed (default: {WATCH_POLL_INTERVAL})",
+    )
+    return parser.parse_args(argv)
+
+def main(argv=None):
     """Главная функция"""
+    args = parse_args(argv)
     print("\n" + "="*70)
     print(" NEWS BACKEND UPDATE SCRIPT ")
     print("="*70)
     
-    generate_news_json()
+    if args.watch:
+        watch_news(args.debounce, args.poll_interval)
+        return
+    
+    with pipeline_metrics.run('news'), pipeline_metrics.stage('json'):
+        generate_news_json()
     
     print("\n" + "="*70)
     print(" UPDATE COMPLETE ")
@@ -235,4 +466,4 @@ def main():
     print()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -2,45 +2,107 @@
 """
 Backend скрипт для автоматического обновления публикаций
 Запускать через cron: 0 2 * * * /usr/bin/python3 /path/to/update_publications_backend.py
+Полный пересбор с 1993 года: python update_publications_backend.py --full
+Отдельные этапы: python update_publications_backend.py fetch | json | umap
+Тяжёлые зависимости (Bio, sentence_transformers, umap, sklearn, plotly, nltk) импортируются внутри этапов,
+которым они нужны: этап json их не загружает
 """
 
 import os
+import ast
 import json
+import time
+import hashlib
+import shutil
+import tempfile
+import random
+import pickle
+import unicodedata
+import sqlite3
+import base64
+import argparse
+import itertools
+import threading
+import http.client
+import urllib.request
+from urllib.error import HTTPError, URLError
+from contextlib import closing
+from concurrent.futures import ThreadPoolExecutor
 import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
 import numpy as np
-from Bio import Entrez
 import warnings
 import re
-from datetime import datetime
-import plotly.graph_objects as go
-from sentence_transformers import SentenceTransformer
-import umap
-from sklearn.cluster import KMeans
-from sklearn.metrics import silhouette_score
-from sklearn.feature_extraction.text import TfidfVectorizer
-from nltk.corpus import stopwords
-import nltk
+import xml.etree.ElementTree as ET
+from datetime import datetime, timedelta
+import pipeline_metrics
+from backend_utils import write_bytes_atomic
 
 warnings.simplefilter(action='ignore', category=pd.errors.SettingWithCopyWarning)
 
 # ==================== CONFIGURATION ====================
-Entrez.email = "your.email@example.com"
+ENTREZ_EMAIL = "your.email@example.com"
+NCBI_API_KEY = os.environ.get("NCBI_API_KEY")  # Raises the NCBI limit from 3 to 10 requests/s
 AUTHOR_NAMES = ['"Gladyshev V"', '"Gladyshev Vadim"', '"Gladyshev VN"', '"Gladyshev VN[Author]"', '"Gladyshev V[Author]"']
 AUTHOR_NAMES_STRIPPED = ['Gladyshev V', 'Gladyshev Vadim', 'Gladyshev VN']
 IMPACT_CSV = "journal_impact_factors_2023.csv"
+JOURNAL_INDEX_PATH = ".cache/journal_index.pkl"  # Индекс журнал -> Rank, пересобирается при изменении IMPACT_CSV
+JOURNAL_INDEX_COLUMNS = {  # Optional IMPACT_CSV columns used as extra lookup keys
+    'nlm': ['NlmId', 'NLM ID', 'NlmUniqueID'],
+    'issn': ['Issn', 'ISSN', 'eISSN'],
+    'iso': ['ISOAbbreviation', 'ISO Abbreviation', 'JCR Abbreviation', 'Abbreviation'],
+}
+FIRST_YEAR = 1993
+EFETCH_BATCH_SIZE = 200  # Records per efetch page from the Entrez history server
+SYNC_OVERLAP_DAYS = 3  # Re-query a few days before the watermark to catch late-indexed records
+
+# NCBI request limits
+FETCH_WORKERS = 4  # Years/pages fetched concurrently; throughput is capped by the token bucket
+ENTREZ_RATE_WITHOUT_KEY = 3  # requests per second
+ENTREZ_RATE_WITH_KEY = 10  # requests per second
+ENTREZ_MAX_RETRIES = 5
+ENTREZ_BACKOFF_SECONDS = 1.0
+ESEARCH_MAX_IDS = 10000  # Largest IdList esearch returns; ids key the efetch cache
+
+# Entrez response cache
+ENTREZ_CACHE_DIR = ".cache/entrez"
+ENTREZ_CACHE_ENABLED = True
+ENTREZ_CACHE_TTL = 24 * 3600  # seconds; applies to esearch results only
+ENTREZ_CACHE_MAX_MB = 200
+ENTREZ_REPLAY_DIR = None  # Serve every Entrez call from this directory of recorded XML, no network
 
 # Paths (adjust for your server)
-DATA_CSV = "all_publications.csv"
-OUTPUT_JSON = "frontend/public/publications.json"  # JSON для frontend
-OUTPUT_UMAP = "frontend/public/umap_visualization.html"  # UMAP визуализация
+DATA_DB = "all_publications.sqlite"  # Основное хранилище публикаций (PMID -> статья, watermark синхронизации)
+DATA_PARQUET = "all_publications.parquet"  # Типизированный снимок хранилища для этапов JSON/UMAP
+DATA_CSV = "all_publications.csv"  # CSV-экспорт для людей
+SYNC_STATE_JSON = "all_publications.sync.json"  # Watermark старых версий, переносится в DATA_DB
+
+# Columns of the publications store and the subsets each stage reads
+STORE_COLUMNS = ['title', 'journal', 'date', 'authors', 'abstract', 'doi', 'pmid', 'Rank']
+JSON_COLUMNS = ['title', 'authors', 'journal', 'date', 'abstract', 'doi', 'pmid']
+UMAP_COLUMNS = ['title', 'abstract', 'date', 'doi', 'pmid']
+OUTPUT_JSON = "frontend/public/publications.json"  # Монолитный JSON для frontend (--monolithic)
+PUBLICATIONS_DIR = "frontend/public/publications"  # manifest.json + компактные шарды по годам
+OUTPUT_UMAP = "frontend/public/umap_visualization.html"  # Plotly HTML визуализация UMAP (--umap-html)
+UMAP_DATA_DIR = "frontend/public/umap"  # manifest.json + бинарные точки для umap.html
+RELATED_JSON = "related_publications.json"  # PMID -> похожие PMID, подмешиваются в publications.json
+SEARCH_INDEX_DIR = "search_index"  # int8 эмбеддинги для /search в embedding_server.py (не публикуется)
 
 # UMAP settings
 RNG_SEED = 42
 MODEL_NAME = "intfloat/multilingual-e5-large"
-N_CLUSTERS = 6
+PASSAGE_PREFIX = "passage: "  # e5 models expect documents and queries to be marked
+QUERY_PREFIX = "query: "
+N_CLUSTERS = None  # Fixed number of clusters; None picks k from CLUSTER_K_CANDIDATES
 MAX_VOCAB = 10000
 TOP_WORDS_FOR_LABEL = 3
 TOP_WORDS_FOR_REPORT = 10
+EMBEDDING_CACHE_DIR = ".cache/embeddings"  # Embeddings keyed by (model, hash of cleaned text)
+EMBEDDING_BATCH_SIZE = 32
+EMBEDDING_COMPACT_STALE_FRACTION = 0.2  # Drop rows of edited/removed papers once they exceed this share of the store
+EMBEDDING_SERVER_URL = os.environ.get("EMBEDDING_SERVER_URL", "http://127.0.0.1:8765")  # embedding_server.py; "" disables
+EMBEDDING_SERVER_TIMEOUT = 900  # seconds; encoding a full corpus on CPU takes minutes
 
 UMAP_3D_KW = dict(
     n_neighbors=15,
@@ -50,171 +112,964 @@ UMAP_3D_KW = dict(
     random_state=RNG_SEED
 )
 
+UMAP_MODEL_PATH = ".cache/umap_3d.pkl"  # Fitted reducer, reused to place new papers with transform()
+NUMBA_CACHE_DIR = ".cache/numba"  # JIT-compiled umap/pynndescent functions, reused across runs
+UMAP_REFIT_NEW_FRACTION = 0.2  # Refit once new papers exceed this share of the fitted corpus
+UMAP_REFIT_DRIFT = 0.02  # Refit once the embedding centroid drifts by more than this (1 - cosine)
+
+# Related publications
+RELATED_TOP_K = 5
+RELATED_INDEX_PATH = ".cache/related_index.pkl"  # NN-descent index over the embedding matrix
+RELATED_EXACT_MAX = 2000  # Up to this many papers an exact blockwise search is cheaper than the index
+RELATED_BLOCK_SIZE = 1024
+RELATED_REBUILD_STALE_FRACTION = 0.1  # Rebuild the NN-descent index once removed/edited papers exceed this share of it
+
+# Clustering: PCA pre-reduction, mini-batch K-means, k chosen by silhouette on a fixed sample
+CLUSTER_K_CANDIDATES = list(range(4, 13))
+CLUSTER_PCA_COMPONENTS = 64  # 0 clusters the raw embeddings
+CLUSTER_SILHOUETTE_SAMPLE = 4000  # Silhouette is O(sample^2), so the sample size caps its cost
+CLUSTER_WORKERS = os.cpu_count() or 1  # Candidate k values scored in parallel
 KMEANS_KW = dict(
-    n_clusters=N_CLUSTERS,
-    n_init="auto",
+    batch_size=2048,
+    n_init=3,
+    max_no_improvement=20,
     random_state=RNG_SEED
 )
 
-# Download stopwords if needed
-try:
-    stopwords.words("english")
-except:
-    nltk.download('stopwords')
+# numba reads its cache location once, when umap/pynndescent first import it
+os.environ.setdefault("NUMBA_CACHE_DIR", os.path.abspath(NUMBA_CACHE_DIR))
 
 # ==================== PUBMED FUNCTIONS ====================
+def build_author_query():
+    """Собрать запрос по авторам"""
+    return " OR ".join(AUTHOR_NAMES)
+
+class TokenBucket:
+    """Token bucket, общий для всех потоков, обращающихся к NCBI"""
+    
+    def __init__(self, rate: float, capacity: float = 1.0):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+    
+    def acquire(self):
+        """Дождаться свободного токена"""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+_entrez_bucket = None
+_entrez_bucket_lock = threading.Lock()
+
+def get_entrez():
+    """Модуль Bio.Entrez с настройками NCBI (импортируется только этапом fetch)"""
+    from Bio import Entrez
+    if Entrez.email != ENTREZ_EMAIL:
+        Entrez.email = ENTREZ_EMAIL
+        Entrez.api_key = NCBI_API_KEY
+        Entrez.max_tries = 1  # Retries are handled by entrez_request() with backoff
+    return Entrez
+
+def get_entrez_bucket():
+    """Получить общий limiter: 10 запросов/с с API key, 3 запроса/с без него"""
+    global _entrez_bucket
+    with _entrez_bucket_lock:
+        if _entrez_bucket is None:
+            rate = ENTREZ_RATE_WITH_KEY if NCBI_API_KEY else ENTREZ_RATE_WITHOUT_KEY
+            _entrez_bucket = TokenBucket(rate)
+        return _entrez_bucket
+
+def entrez_cache_key(kind: str, **params):
+    """Ключ кэша по нормализованным параметрам запроса"""
+    normalized = {}
+    for name, value in params.items():
+        if isinstance(value, (list, tuple)):
+            value = ",".join(sorted(str(v) for v in value))
+        elif isinstance(value, str):
+            value = " ".join(value.split())
+        normalized[name] = value
+    digest = hashlib.sha256(json.dumps(normalized, sort_keys=True).encode('utf-8')).hexdigest()
+    return f"{kind}-{digest[:32]}"
+
+def configure_entrez_cache(enabled: bool = True, replay_dir=None):
+    """Настроить кэш ответов Entrez и режим воспроизведения"""
+    global ENTREZ_CACHE_ENABLED, ENTREZ_REPLAY_DIR
+    ENTREZ_CACHE_ENABLED = enabled
+    ENTREZ_REPLAY_DIR = replay_dir
+
+def cached_response_path(cache_dir, key: str, ttl=None):
+    """Путь к ответу в кэше, если он есть и не устарел"""
+    path = os.path.join(cache_dir, f"{key}.xml")
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        return None
+    if ttl is not None and time.time() - mtime > ttl:
+        return None
+    # Bump access time so size-based eviction drops least recently used entries first
+    try:
+        os.utime(path, (time.time(), mtime))
+    except OSError:
+        pass
+    return path
+
+def store_response(handle, key):
+    """Потоково сохранить ответ Entrez в кэш (или во временный файл) и открыть его на чтение"""
+    if not (key and ENTREZ_CACHE_ENABLED):
+        stream = tempfile.TemporaryFile()
+        shutil.copyfileobj(handle, stream)
+        stream.seek(0)
+        return stream
+    
+    os.makedirs(ENTREZ_CACHE_DIR, exist_ok=True)
+    path = os.path.join(ENTREZ_CACHE_DIR, f"{key}.xml")
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(tmp_path, 'wb') as f:
+            shutil.copyfileobj(handle, f)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return open(path, 'rb')
+
+def evict_entrez_cache():
+    """Удалить устаревшие результаты поиска и ограничить размер кэша"""
+    if not os.path.isdir(ENTREZ_CACHE_DIR):
+        return
+    
+    now = time.time()
+    entries = []
+    removed = 0
+    for entry in os.scandir(ENTREZ_CACHE_DIR):
+        if not entry.is_file():
+            continue
+        stat = entry.stat()
+        # Search results expire, PMID-keyed efetch batches are immutable
+        if entry.name.startswith('esearch-') and now - stat.st_mtime > ENTREZ_CACHE_TTL:
+            os.remove(entry.path)
+            removed += 1
+            continue
+        entries.append((stat.st_atime, stat.st_size, entry.path))
+    
+    total_size = sum(size for _, size, _ in entries)
+    max_size = ENTREZ_CACHE_MAX_MB * 1024 * 1024
+    for _, size, path in sorted(entries):
+        if total_size <= max_size:
+            break
+        os.remove(path)
+        total_size -= size
+        removed += 1
+    
+    if removed:
+        print(f"Evicted {removed} entries from {ENTREZ_CACHE_DIR}")
+
+def entrez_request(func, cache_key=None, ttl=None, refresh: bool = False, **params):
+    """Выполнить запрос Entrez с кэшем, ограничением частоты и повторами при 429/5xx.
+    Возвращает открытый бинарный поток с XML ответом."""
+    if ENTREZ_REPLAY_DIR is not None:
+        # Replay mode never touches the network
+        path = cached_response_path(ENTREZ_REPLAY_DIR, cache_key) if cache_key else None
+        if path is None:
+            raise LookupError(f"No recorded Entrez {func.__name__} response in {ENTREZ_REPLAY_DIR} for {cache_key}")
+        pipeline_metrics.count(entrez_cache_hits=1)
+        return open(path, 'rb')
+    
+    if cache_key and ENTREZ_CACHE_ENABLED and not refresh:
+        path = cached_response_path(ENTREZ_CACHE_DIR, cache_key, ttl=ttl)
+        if path is not None:
+            pipeline_metrics.count(entrez_cache_hits=1)
+            return open(path, 'rb')
+    
+    for attempt in range(ENTREZ_MAX_RETRIES + 1):
+        get_entrez_bucket().acquire()
+        pipeline_metrics.count(entrez_requests=1)
+        try:
+            handle = func(**params)
+            try:
+                return store_response(handle, cache_key)
+            finally:
+                handle.close()
+        except HTTPError as e:
+            if (e.code != 429 and e.code < 500) or attempt == ENTREZ_MAX_RETRIES:
+                raise
+            retry_after = e.headers.get('Retry-After', '') if e.headers else ''
+            delay = float(retry_after) if retry_after.isdigit() else ENTREZ_BACKOFF_SECONDS * 2 ** attempt
+            error = f"HTTP {e.code}"
+        except (URLError, http.client.HTTPException, ConnectionError) as e:
+            if attempt == ENTREZ_MAX_RETRIES:
+                raise
+            delay = ENTREZ_BACKOFF_SECONDS * 2 ** attempt
+            error = str(e)
+        
+        delay += random.uniform(0, ENTREZ_BACKOFF_SECONDS)
+        pipeline_metrics.count(entrez_retries=1)
+        print(f"  Entrez {func.__name__} failed ({error}), retrying in {delay:.1f}s")
+        time.sleep(delay)
+
+def search_pubmed_history(query: str, refresh: bool = False):
+    """Выполнить esearch и сохранить результат на history server NCBI"""
+    cache_key = entrez_cache_key('esearch', db="pubmed", term=query)
+    from_cache = (
+        ENTREZ_REPLAY_DIR is not None
+        or (ENTREZ_CACHE_ENABLED and not refresh
+            and cached_response_path(ENTREZ_CACHE_DIR, cache_key, ttl=ENTREZ_CACHE_TTL) is not None)
+    )
+    Entrez = get_entrez()
+    with entrez_request(
+        Entrez.esearch,
+        cache_key=cache_key,
+        ttl=ENTREZ_CACHE_TTL,
+        refresh=refresh,
+        db="pubmed",
+        term=query,
+        usehistory="y",
+        retmax=ESEARCH_MAX_IDS,
+    ) as stream:
+        record = Entrez.read(stream)
+    return {
+        'count': int(record["Count"]),
+        'webenv': record.get("WebEnv"),
+        'query_key': record.get("QueryKey"),
+        'ids': [str(pmid) for pmid in record["IdList"]],
+        # A cached WebEnv has most likely expired on the NCBI side
+        'from_cache': from_cache,
+    }
+
+def fetch_pubmed_page(search, retstart: int, batch_size: int, refresh: bool = False):
+    """Скачать и распарсить одну страницу результатов из history server"""
+    page_ids = search['ids'][retstart:retstart + batch_size]
+    page_complete = len(page_ids) == min(batch_size, search['count'] - retstart)
+    
+    # Pages are keyed by their PMID batch so they can be reused across queries and runs
+    cache_key = entrez_cache_key('efetch', db="pubmed", id=page_ids) if page_complete else None
+    if search['from_cache'] and page_complete:
+        params = dict(id=page_ids)
+    else:
+        params = dict(retstart=retstart, retmax=batch_size,
+                      webenv=search['webenv'], query_key=search['query_key'])
+    
+    with entrez_request(
+        get_entrez().efetch,
+        cache_key=cache_key,
+        refresh=refresh,
+        db="pubmed",
+        rettype="xml",
+        retmode="xml",
+        **params,
+    ) as stream:
+        return list(iter_pubmed_records(stream))
+
+def iter_pubmed_pages(query: str, batch_size: int = EFETCH_BATCH_SIZE, refresh: bool = False):
+    """Скачивать результаты запроса страницами по batch_size статей (параллельно, в исходном порядке)"""
+    search = search_pubmed_history(query, refresh=refresh)
+    if search['from_cache'] and len(search['ids']) < search['count'] and ENTREZ_REPLAY_DIR is None:
+        # Pages past the cached IdList are fetched by WebEnv, and NCBI expires history sessions
+        # within hours: replace the cached search with a fresh one before paging
+        search = search_pubmed_history(query, refresh=True)
+    retstarts = list(range(0, search['count'], batch_size))
+    
+    if len(retstarts) <= 1:
+        for retstart in retstarts:
+            yield fetch_pubmed_page(search, retstart, batch_size, refresh=refresh)
+        return
+    
+    stage = pipeline_metrics.current_stage()
+    
+    def fetch_page(start):
+        with pipeline_metrics.attach_stage(stage):
+            return fetch_pubmed_page(search, start, batch_size, refresh=refresh)
+    
+    with ThreadPoolExecutor(max_workers=min(FETCH_WORKERS, len(retstarts))) as executor:
+        yield from executor.map(fetch_page, retstarts)
+
+def search_pubmed(query: str, batch_size: int = EFETCH_BATCH_SIZE, refresh: bool = False):
+    """Найти, скачать и распарсить статьи PubMed по запросу"""
+    records = []
+    for page in iter_pubmed_pages(query, batch_size=batch_size, refresh=refresh):
+        records.extend(page)
+    
+    if not records:
+        return None
+    
+    return records
+
 def fetch_pubmed_articles(year: int):
     """Получить статьи из PubMed за год"""
-    author_query = " OR ".join(AUTHOR_NAMES)
     date_range = f'"{year}/01/01"[PDAT] : "{year}/12/31"[PDAT]'
-    query = f"({author_query}) AND {date_range}"
-    
-    handle = Entrez.esearch(db="pubmed", term=query, retmax=100)
-    record = Entrez.read(handle)
-    id_list = record["IdList"]
+    query = f"({build_author_query()}) AND {date_range}"
+    return search_pubmed(query)
+
+def fetch_pubmed_updates(since: str):
+    """Получить статьи, добавленные или изменённые в PubMed начиная с даты since (YYYY/MM/DD)"""
+    # EDAT catches newly indexed records, LR catches revisions of records we already have
+    date_range = f'("{since}"[EDAT] : "3000"[EDAT]) OR ("{since}"[LR] : "3000"[LR])'
+    query = f"({build_author_query()}) AND ({date_range})"
+    # Revised records must not be served from the PMID-keyed cache
+    return search_pubmed(query, refresh=True)
+
+def element_text(elem):
+    """Текст элемента вместе с вложенной разметкой (<i>, <sup>, ...)"""
+    return "".join(elem.itertext()).strip()
+
+def parse_article_element(elem):
+    """Распарсить один элемент <PubmedArticle> в словарь статьи"""
+    article = elem.find('MedlineCitation/Article')
+    if article is None:
+        return None
     
-    if not id_list:
+    journal = article.findtext('Journal/Title')
+    iso_abbreviation = article.findtext('Journal/ISOAbbreviation')
+    nlm_id = elem.findtext('MedlineCitation/MedlineJournalInfo/NlmUniqueID')
+    issns = [issn.text.strip() for issn in article.findall('Journal/ISSN') if issn.text]
+    issn_linking = elem.findtext('MedlineCitation/MedlineJournalInfo/ISSNLinking')
+    if issn_linking:
+        issns.append(issn_linking.strip())
+    pub_date = article.find('Journal/JournalIssue/PubDate')
+    title = article.find('ArticleTitle')
+    author_list = article.find('AuthorList')
+    id_list = elem.find('PubmedData/ArticleIdList')
+    if journal is None or pub_date is None or title is None or author_list is None or id_list is None:
         return None
     
-    handle = Entrez.efetch(db="pubmed", id=id_list, rettype="xml", retmode="xml")
-    return Entrez.read(handle)
+    medline_date = pub_date.findtext('MedlineDate')
+    if medline_date is not None:
+        date = medline_date
+    else:
+        date = f"{pub_date.findtext('Year', '')}-{pub_date.findtext('Month', '')}"
+    
+    doi = None
+    pmid = None
+    for article_id in id_list.findall('ArticleId'):
+        if article_id.get('IdType') == 'doi':
+            doi = (article_id.text or '').strip()
+        elif article_id.get('IdType') == 'pubmed':
+            pmid = (article_id.text or '').strip()
+    
+    authors = []
+    for author in author_list.findall('Author'):
+        last_name = author.findtext('LastName')
+        initials = author.findtext('Initials')
+        # Collective or incomplete authors drop the record, as the Entrez.read parser did
+        if last_name is None or initials is None:
+            return None
+        authors.append(f"{last_name} {initials}")
+    
+    # Structured abstracts have one AbstractText per section
+    sections = []
+    for section in article.findall('Abstract/AbstractText'):
+        text = element_text(section)
+        label = section.get('Label')
+        if text:
+            sections.append(f"{label}: {text}" if label else text)
+    
+    return {
+        'title': element_text(title),
+        'journal': journal,
+        'iso_abbreviation': iso_abbreviation,
+        'nlm_id': nlm_id,
+        'issns': issns,
+        'date': date,
+        'authors': authors,
+        'abstract': " ".join(sections),
+        'doi': doi,
+        'pmid': pmid,
+    }
 
-def parse_article(article):
-    """Распарсить статью из XML"""
-    try:
-        journal = article['MedlineCitation']['Article']['Journal']['Title']
-        # if 'bioRxiv' in journal or 'biorxiv' in journal or 'medRxiv' in journal or 'medrxiv' in journal:
-        #     return None
-            
-        pub_date = article['MedlineCitation']['Article']['Journal']['JournalIssue']['PubDate']
-        date = pub_date.get('MedlineDate', f"{pub_date.get('Year', '')}-{pub_date.get('Month', '')}")
+def iter_pubmed_records(stream):
+    """Потоково распарсить ответ efetch, освобождая каждую статью после обработки"""
+    context = ET.iterparse(stream, events=('start', 'end'))
+    _, root = next(context)
+    for event, elem in context:
+        if event == 'end' and elem.tag == 'PubmedArticle':
+            record = parse_article_element(elem)
+            # Drop the processed article from the tree so memory stays flat
+            root.clear()
+            if record is not None:
+                yield record
+
+# ==================== JOURNAL IMPACT INDEX ====================
+def normalize_journal_title(title):
+    """Нормализовать название журнала: регистр, диакритика, пунктуация, '&', ведущий 'The'"""
+    if not isinstance(title, str):
+        return ''
+    title = unicodedata.normalize('NFKD', title).encode('ascii', 'ignore').decode('ascii').lower()
+    title = title.replace('&', ' and ')
+    title = re.sub(r'[^a-z0-9]+', ' ', title).strip()
+    return re.sub(r'^the ', '', title)
+
+def journal_title_keys(title):
+    """Ключи названия: полное и без уточнения в скобках, например 'Aging (Albany NY)' -> 'aging'"""
+    keys = [normalize_journal_title(title)]
+    if isinstance(title, str) and '(' in title:
+        keys.append(normalize_journal_title(re.sub(r'\([^)]*\)', ' ', title)))
+    return [key for key in dict.fromkeys(keys) if key]
+
+def normalize_issn(issn):
+    """ISSN без дефиса в верхнем регистре: '0028-0836' -> '00280836'"""
+    return re.sub(r'[^0-9Xx]', '', str(issn)).upper()
+
+def build_journal_index():
+    """Построить индекс журнал -> Rank по IMPACT_CSV (NLM id, ISSN, название, ISO-сокращение)"""
+    header = pd.read_csv(IMPACT_CSV, sep=';', nrows=0).columns
+    wanted = {'Rank', 'Title'} | {c for columns in JOURNAL_INDEX_COLUMNS.values() for c in columns}
+    impact_df = pd.read_csv(IMPACT_CSV, sep=';', usecols=[c for c in header if c in wanted], dtype=str)
+    impact_df['Rank'] = pd.to_numeric(impact_df['Rank'], errors='coerce')
+    impact_df = impact_df[impact_df['Rank'].notna()]
+    
+    index = {kind: {} for kind in ('nlm', 'issn', 'title', 'iso')}
+    
+    def add(kind, key, rank):
+        # The same journal can be listed twice (e.g. under two categories): keep the best rank
+        if key and rank < index[kind].get(key, float('inf')):
+            index[kind][key] = rank
+    
+    columns = {kind: [c for c in names if c in impact_df.columns] for kind, names in JOURNAL_INDEX_COLUMNS.items()}
+    for row in impact_df.to_dict('records'):
+        rank = float(row['Rank'])
+        for key in journal_title_keys(row['Title']):
+            add('title', key, rank)
+        for column in columns['nlm']:
+            add('nlm', str(row[column]).strip() if pd.notna(row[column]) else '', rank)
+        for column in columns['issn']:
+            # SCImago lists several ISSNs in one cell: "15292908, 00280836"
+            for issn in str(row[column]).split(',') if pd.notna(row[column]) else []:
+                add('issn', normalize_issn(issn), rank)
+        for column in columns['iso']:
+            add('iso', normalize_journal_title(row[column]), rank)
+    return index
+
+_journal_index = None
+_journal_index_lock = threading.Lock()
+
+def get_journal_index():
+    """Получить индекс журналов: один раз за процесс, с кэшем на диске до изменения IMPACT_CSV"""
+    global _journal_index
+    with _journal_index_lock:
+        if _journal_index is not None:
+            return _journal_index
         
-        doi = None
-        pmid = None
-        for article_id in article['PubmedData']['ArticleIdList']:
-            if article_id.attributes.get('IdType') == 'doi':
-                doi = str(article_id)
-            elif article_id.attributes.get('IdType') == 'pubmed':
-                pmid = str(article_id)
+        if not os.path.exists(IMPACT_CSV):
+            print(f"{IMPACT_CSV} not found, journal ranks are unavailable")
+            _journal_index = {}
+            return _journal_index
         
-        return {
-            'title': article['MedlineCitation']['Article']['ArticleTitle'],
-            'journal': journal,
-            'journal_lower': journal.lower(),
-            'date': date,
-            'authors': [f"{a['LastName']} {a['Initials']}" 
-                       for a in article['MedlineCitation']['Article']['AuthorList']],
-            'abstract': article['MedlineCitation']['Article'].get('Abstract', {}).get('AbstractText', [''])[0],
-            'doi': doi,
-            'pmid': pmid,
-        }
-    except KeyError:
-        return None
+        stat = os.stat(IMPACT_CSV)
+        source = (os.path.abspath(IMPACT_CSV), stat.st_mtime_ns, stat.st_size)
+        try:
+            with open(JOURNAL_INDEX_PATH, 'rb') as f:
+                cached = pickle.load(f)
+            if cached.get('source') == source:
+                _journal_index = cached['index']
+                return _journal_index
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError, KeyError):
+            pass
+        
+        try:
+            _journal_index = build_journal_index()
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Could not read {IMPACT_CSV}: {e}")
+            _journal_index = {}
+            return _journal_index
+        
+        # The pickle is only a cache: a read-only or full .cache must not fail the fetch
+        try:
+            write_bytes_atomic(JOURNAL_INDEX_PATH, pickle.dumps(
+                {'source': source, 'index': _journal_index}, protocol=pickle.HIGHEST_PROTOCOL))
+        except OSError as e:
+            print(f"Could not cache the journal index in {JOURNAL_INDEX_PATH}: {e}")
+        print(f"Journal index: {sum(len(v) for v in _journal_index.values())} keys from {IMPACT_CSV}")
+        return _journal_index
+
+def lookup_journal_rank(index, record):
+    """Rank журнала статьи: NLM id, затем ISSN, название и ISO-сокращение (NaN, если не найден)"""
+    nlm_id = record.get('nlm_id')
+    if nlm_id and nlm_id in index['nlm']:
+        return index['nlm'][nlm_id]
+    for issn in record.get('issns') or []:
+        rank = index['issn'].get(normalize_issn(issn))
+        if rank is not None:
+            return rank
+    for key in journal_title_keys(record.get('journal')):
+        if key in index['title']:
+            return index['title'][key]
+    iso = normalize_journal_title(record.get('iso_abbreviation'))
+    if iso:
+        # Short titles such as "Cell" or "Aging Cell" are their own abbreviation
+        rank = index['iso'].get(iso, index['title'].get(iso))
+        if rank is not None:
+            return rank
+    return np.nan
+
+# ==================== DATASET ====================
+def is_lab_last_author(authors):
+    """Проверить, что последний автор - из лаборатории"""
+    return len(authors) > 0 and authors[-1] in AUTHOR_NAMES_STRIPPED
+
+def sort_by_author_position(df):
+    """Отсортировать статьи: сначала с последним автором из лаборатории, затем остальные"""
+    sort_by = ['Rank'] if 'Rank' in df.columns else ['date']
+    df_good = df[df['authors'].apply(is_lab_last_author)]
+    df_good = df_good.sort_values(by=sort_by, ascending=True)
+    df_bad = df[~df['authors'].apply(is_lab_last_author)]
+    df_bad = df_bad.sort_values(by=sort_by, ascending=True)
+    return pd.concat([df_good, df_bad]).reset_index(drop=True)
+
+def articles_to_dataframe(records, verbose: bool = False):
+    """Преобразовать распарсенные статьи в DataFrame с рангом журнала"""
+    if verbose:
+        print(f"Parsed {len(records)} articles")
+  
+    df = pd.DataFrame(records)
+    if df.empty:
+        return df
+
+    # Resolve journal ranks from the shared index
+    index = get_journal_index()
+    if index:
+        df['Rank'] = [lookup_journal_rank(index, record) for record in records]
+        if verbose:
+            print(f"Journal rank not found for {df['Rank'].isna().sum()} of {len(df)} articles")
+
+    # Clean titles
+    df['title'] = df['title'].apply(lambda x: x[:-1] if x and x[-1] == '.' else x)
+    return df
 
 def get_articles_by_year(year: int, verbose: bool = False):
     """Получить и обработать статьи за год"""
     try:
-        articles_data = fetch_pubmed_articles(year)
-        if not articles_data:
+        records = fetch_pubmed_articles(year)
+        if not records:
             if verbose:
                 print(f"No articles found for year {year}")
             return pd.DataFrame()
             
         if verbose:
-            print(f"Found {len(articles_data['PubmedArticle'])} articles for year {year}")
+            print(f"Found {len(records)} articles for year {year}")
     except Exception as e:
         print(f"Error fetching articles for year {year}: {e}")
         return pd.DataFrame()
     
-    parsed_articles = [parse_article(a) for a in articles_data['PubmedArticle']]
-    if verbose:
-        print(f"Parsed {len([a for a in parsed_articles if a is not None])} articles")
-  
-    df = pd.DataFrame([a for a in parsed_articles if a is not None])
+    df = articles_to_dataframe(records, verbose=verbose)
     if df.empty:
         return df
 
-    # Load impact factors
-    if os.path.exists(IMPACT_CSV):
-        try:
-            impact_df = pd.read_csv(IMPACT_CSV, sep=';', usecols=['Rank', 'Title'])
-            impact_df['journal_lower'] = impact_df['Title'].str.lower()
-            df = df.merge(impact_df, how='left', on='journal_lower')
-        except:
-            pass
-    
     # Sort by author position
-    df_good = df[df['authors'].apply(lambda x: x[-1] in AUTHOR_NAMES_STRIPPED)]
-    df_good = df_good.sort_values(by=['Rank'] if 'Rank' in df_good.columns else ['date'], ascending=True)
-    df_bad = df[df['authors'].apply(lambda x: x[-1] not in AUTHOR_NAMES_STRIPPED)]
-    df_bad = df_bad.sort_values(by=['Rank'] if 'Rank' in df_bad.columns else ['date'], ascending=True)
-    df = pd.concat([df_good, df_bad]).reset_index(drop=True)
-
-    # Clean titles
-    df['title'] = df['title'].apply(lambda x: x[:-1] if x and x[-1] == '.' else x)
+    df = sort_by_author_position(df)
     df = df[df['date'].str.contains(str(year))]
     
     return df
 
-def update_publications_csv():
-    """Обновить CSV с публикациями"""
-    print(f"\n{'='*60}")
-    print(f"Starting publications update: {datetime.now()}")
-    print(f"{'='*60}\n")
+PUBLICATIONS_SCHEMA = pa.schema([
+    ('title', pa.string()),
+    ('journal', pa.string()),
+    ('date', pa.string()),
+    ('authors', pa.list_(pa.string())),
+    ('abstract', pa.string()),
+    ('doi', pa.string()),
+    ('pmid', pa.int64()),
+    ('Rank', pa.int32()),
+])
+
+def load_publications_csv():
+    """Загрузить CSV с публикациями (используется для миграции в SQLite)"""
+    df = pd.read_csv(DATA_CSV, dtype={'pmid': str})
     
-    # Load existing data or create empty
-    if os.path.exists(DATA_CSV):
-        print(f"Loading existing data from {DATA_CSV}")
-        existing_df = pd.read_csv(DATA_CSV)
-        existing_dois = set(existing_df['doi'].dropna())
-        print(f"Found {len(existing_df)} existing publications")
-    else:
-        print("No existing data found, creating new dataset")
-        existing_df = pd.DataFrame()
-        existing_dois = set()
+    def parse_authors(value):
+        if not isinstance(value, str):
+            return []
+        # Older exports stored stringified Python lists
+        if value.startswith('['):
+            return ast.literal_eval(value)
+        return value.split('; ')
+    
+    df['authors'] = df['authors'].apply(parse_authors)
+    return df
+
+def publications_to_table(df):
+    """DataFrame -> Arrow таблица с типизированной схемой хранилища"""
+    df = df.reindex(columns=STORE_COLUMNS)
+    columns = {
+        'title': df['title'].astype(object).where(df['title'].notna(), None),
+        'journal': df['journal'].astype(object).where(df['journal'].notna(), None),
+        'date': df['date'].astype(object).where(df['date'].notna(), None),
+        'authors': df['authors'].apply(lambda x: list(x) if isinstance(x, (list, tuple, np.ndarray)) else []),
+        'abstract': df['abstract'].astype(object).where(df['abstract'].notna(), None),
+        'doi': df['doi'].astype(object).where(df['doi'].notna(), None),
+        'pmid': pd.to_numeric(df['pmid'], errors='coerce').astype('Int64'),
+        'Rank': pd.to_numeric(df['Rank'], errors='coerce').round().astype('Int32'),
+    }
+    return pa.Table.from_pandas(pd.DataFrame(columns), schema=PUBLICATIONS_SCHEMA, preserve_index=False)
+
+def table_to_publications(table):
+    """Arrow таблица -> DataFrame в формате, который ожидают этапы пайплайна"""
+    df = table.to_pandas()
+    if 'pmid' in df.columns:
+        df['pmid'] = df['pmid'].astype('Int64').astype(str).where(df['pmid'].notna(), None)
+    if 'authors' in df.columns:
+        df['authors'] = df['authors'].apply(lambda x: list(x) if x is not None else [])
+    if 'Rank' in df.columns:
+        df['Rank'] = df['Rank'].astype(float)
+    return df
+
+def publications_exist():
+    """Есть ли сохранённый датасет публикаций"""
+    return any(os.path.exists(path) for path in (DATA_DB, DATA_PARQUET, DATA_CSV))
+
+def load_publications(columns=None):
+    """Загрузить снимок публикаций из Parquet, читая только нужные колонки"""
+    if not os.path.exists(DATA_PARQUET):
+        print(f"No {DATA_PARQUET} yet, exporting it from {DATA_DB}")
+        with closing(open_publications_db()) as conn:
+            export_publications_snapshot(conn)
+    
+    table = pq.read_table(DATA_PARQUET, columns=columns, memory_map=True)
+    return table_to_publications(table)
+
+def save_publications(df, export_csv: bool = True):
+    """Атомарно сохранить снимок публикаций в Parquet и экспортировать CSV для людей"""
+    table = publications_to_table(df)
+    tmp_path = f"{DATA_PARQUET}.tmp"
+    pq.write_table(table, tmp_path, compression='zstd')
+    os.replace(tmp_path, DATA_PARQUET)
+    
+    if export_csv:
+        export_df = table_to_publications(table)
+        export_df['authors'] = export_df['authors'].apply('; '.join)
+        export_df['Rank'] = export_df['Rank'].astype('Int32')
+        tmp_path = f"{DATA_CSV}.tmp"
+        export_df.to_csv(tmp_path, index=False)
+        os.replace(tmp_path, DATA_CSV)
+
+# ==================== PUBLICATIONS STORE ====================
+PUBLICATIONS_DDL = """
+CREATE TABLE IF NOT EXISTS publications (
+    pmid INTEGER PRIMARY KEY,
+    doi TEXT,
+    title TEXT,
+    journal TEXT,
+    date TEXT,
+    year INTEGER,
+    authors TEXT NOT NULL,
+    abstract TEXT,
+    rank INTEGER,
+    lab_author_position INTEGER,
+    lab_last_author INTEGER NOT NULL,
+    content_hash TEXT NOT NULL
+);
+CREATE UNIQUE INDEX IF NOT EXISTS publications_doi ON publications(doi) WHERE doi IS NOT NULL;
+CREATE INDEX IF NOT EXISTS publications_year ON publications(year, lab_last_author, rank);
+CREATE INDEX IF NOT EXISTS publications_journal ON publications(journal COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS publications_lab_position ON publications(lab_author_position);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+# Same order the per-year pass produced: by year, lab-last-author papers first, then by journal rank;
+# ties newest PMID first, as PubMed returned them
+PUBLICATIONS_ORDER = "year, lab_last_author DESC, rank IS NULL, rank, pmid DESC"
+
+def open_publications_db():
+    """Открыть SQLite-хранилище публикаций; при первом запуске перенести в него Parquet/CSV"""
+    conn = sqlite3.connect(DATA_DB)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.executescript(PUBLICATIONS_DDL)
+    
+    if conn.execute("SELECT COUNT(*) FROM publications").fetchone()[0] == 0:
+        if os.path.exists(DATA_PARQUET):
+            print(f"Migrating {DATA_PARQUET} into {DATA_DB}")
+            seed_df = table_to_publications(pq.read_table(DATA_PARQUET))
+        elif os.path.exists(DATA_CSV):
+            print(f"Migrating {DATA_CSV} into {DATA_DB}")
+            seed_df = load_publications_csv()
+        else:
+            seed_df = pd.DataFrame()
+        
+        with conn:
+            if not seed_df.empty:
+                upsert_publications(conn, seed_df)
+            # Watermark written by earlier versions next to the CSV
+            if os.path.exists(SYNC_STATE_JSON) and load_sync_state(conn) is None:
+                try:
+                    with open(SYNC_STATE_JSON, 'r', encoding='utf-8') as f:
+                        legacy = json.load(f)
+                    set_meta(conn, last_sync=legacy['last_sync'], synced_at=legacy['synced_at'])
+                except (OSError, ValueError, KeyError) as e:
+                    print(f"Could not migrate sync state {SYNC_STATE_JSON}: {e}")
+    return conn
+
+def lab_author_position(authors):
+    """Индекс последнего автора из лаборатории в списке авторов (None, если его нет)"""
+    for i in range(len(authors) - 1, -1, -1):
+        if authors[i] in AUTHOR_NAMES_STRIPPED:
+            return i
+    return None
+
+def publication_row(record):
+    """Запись DataFrame -> строка таблицы publications (None, если нет PMID)"""
+    pmid = pd.to_numeric(record.get('pmid'), errors='coerce')
+    if pd.isna(pmid):
+        return None
+    
+    def text(value):
+        return None if value is None or (isinstance(value, float) and pd.isna(value)) else str(value)
+    
+    authors = list(record.get('authors') if isinstance(record.get('authors'), (list, tuple, np.ndarray)) else [])
+    rank = pd.to_numeric(record.get('Rank'), errors='coerce')
+    fields = {
+        'doi': text(record.get('doi')) or None,
+        'title': text(record.get('title')),
+        'journal': text(record.get('journal')),
+        'date': text(record.get('date')),
+        'authors': authors,
+        'abstract': text(record.get('abstract')),
+        'rank': None if pd.isna(rank) else int(round(rank)),
+    }
+    content_hash = hashlib.sha256(json.dumps(fields, ensure_ascii=False, sort_keys=True).encode('utf-8')).hexdigest()[:16]
+    position = lab_author_position(authors)
+    return (
+        int(pmid), fields['doi'], fields['title'], fields['journal'], fields['date'],
+        extract_year(fields['date']), json.dumps(authors, ensure_ascii=False), fields['abstract'],
+        fields['rank'], position, int(position is not None and position == len(authors) - 1),
+        content_hash,
+    )
+
+def upsert_publications(conn, df):
+    """Вставить новые и обновить изменившиеся статьи; вызывать внутри транзакции. Возвращает (new, updated)"""
+    hash_by_pmid = dict(conn.execute("SELECT pmid, content_hash FROM publications"))
+    pmid_by_doi = dict(conn.execute("SELECT doi, pmid FROM publications WHERE doi IS NOT NULL"))
+    doi_by_pmid = {pmid: doi for doi, pmid in pmid_by_doi.items()}
+    
+    rows = []
+    new_count = 0
+    duplicate_dois = 0
+    for record in df.to_dict('records'):
+        row = publication_row(record)
+        if row is None:
+            continue
+        pmid, doi, content_hash = row[0], row[1], row[-1]
+        if hash_by_pmid.get(pmid) == content_hash:
+            continue
+        # The same DOI under another PMID (e.g. a duplicate citation): keep the first one
+        if doi is not None and pmid_by_doi.get(doi, pmid) != pmid:
+            duplicate_dois += 1
+            continue
+        
+        if pmid not in hash_by_pmid:
+            new_count += 1
+        hash_by_pmid[pmid] = content_hash
+        pmid_by_doi.pop(doi_by_pmid.pop(pmid, None), None)
+        if doi is not None:
+            pmid_by_doi[doi] = pmid
+            doi_by_pmid[pmid] = doi
+        rows.append(row)
+    
+    conn.executemany("""
+        INSERT INTO publications (pmid, doi, title, journal, date, year, authors, abstract,
+                                  rank, lab_author_position, lab_last_author, content_hash)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT(pmid) DO UPDATE SET
+            doi = excluded.doi, title = excluded.title, journal = excluded.journal,
+            date = excluded.date, year = excluded.year, authors = excluded.authors,
+            abstract = excluded.abstract, rank = excluded.rank,
+            lab_author_position = excluded.lab_author_position,
+            lab_last_author = excluded.lab_last_author, content_hash = excluded.content_hash
+    """, rows)
+    if duplicate_dois:
+        print(f"  -> Skipped {duplicate_dois} records whose DOI is already stored under another PMID")
+    return new_count, len(rows) - new_count
+
+def delete_stale_publications(conn, years, seen_pmids):
+    """Удалить статьи за полностью просканированные годы, которых больше нет в PubMed"""
+    conn.execute("CREATE TEMP TABLE IF NOT EXISTS seen_pmids (pmid INTEGER PRIMARY KEY)")
+    conn.execute("DELETE FROM seen_pmids")
+    conn.executemany("INSERT OR IGNORE INTO seen_pmids VALUES (?)", ((int(p),) for p in seen_pmids))
+    placeholders = ",".join("?" * len(years))
+    cursor = conn.execute(
+        f"DELETE FROM publications WHERE year IN ({placeholders}) "
+        f"AND pmid NOT IN (SELECT pmid FROM seen_pmids)",
+        list(years),
+    )
+    return cursor.rowcount
+
+def query_publications(conn, year=None, journal=None, lab_last_author=None, lab_author_position=None):
+    """Индексированная выборка статей по году, журналу и позиции автора из лаборатории"""
+    clauses, params = [], []
+    if year is not None:
+        clauses.append("year = ?")
+        params.append(int(year))
+    if journal is not None:
+        clauses.append("journal = ? COLLATE NOCASE")
+        params.append(journal)
+    if lab_last_author is not None:
+        clauses.append("lab_last_author = ?")
+        params.append(int(lab_last_author))
+    if lab_author_position is not None:
+        clauses.append("lab_author_position = ?")
+        params.append(int(lab_author_position))
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
     
+    df = pd.read_sql_query(
+        f"SELECT title, journal, date, authors, abstract, doi, pmid, rank AS Rank "
+        f"FROM publications {where} ORDER BY {PUBLICATIONS_ORDER}",
+        conn, params=params,
+    )
+    df['authors'] = df['authors'].apply(json.loads)
+    df['pmid'] = df['pmid'].astype(str)
+    df['Rank'] = df['Rank'].astype(float)
+    return df
+
+def export_publications_snapshot(conn):
+    """Выгрузить хранилище в Parquet-снимок и CSV, которые читают остальные этапы"""
+    df = query_publications(conn)
+    save_publications(df)
+    return df
+
+def get_meta(conn, key):
+    """Прочитать значение из таблицы meta"""
+    row = conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+    return row[0] if row else None
+
+def set_meta(conn, **values):
+    """Записать значения в таблицу meta"""
+    conn.executemany(
+        "INSERT INTO meta (key, value) VALUES (?, ?) ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+        values.items(),
+    )
+
+def load_sync_state(conn):
+    """Загрузить watermark последней синхронизации"""
+    last_sync = get_meta(conn, 'last_sync')
+    if last_sync is None:
+        return None
+    return {'last_sync': last_sync, 'synced_at': get_meta(conn, 'synced_at')}
+
+def save_sync_state(conn, started_at):
+    """Сохранить watermark синхронизации в той же транзакции, что и данные"""
+    last_sync = started_at.strftime('%Y/%m/%d')
+    set_meta(conn, last_sync=last_sync, synced_at=started_at.isoformat())
+    print(f"Sync watermark saved to: {DATA_DB} (last_sync={last_sync})")
+
+def update_publications_full():
+    """Полное обновление: пройти по всем годам с FIRST_YEAR"""
     # Get current year
     current_year = datetime.now().year
     
-    # Collect all publications
-    all_publications = []
-    new_count = 0
+    years = list(range(FIRST_YEAR, current_year + 1))
+    print(f"Fetching {len(years)} years with {FETCH_WORKERS} workers...")
+    stage = pipeline_metrics.current_stage()
     
-    for year in range(1993, current_year + 1):
-        print(f"\nProcessing year {year}...")
-        year_df = get_articles_by_year(year, verbose=True)
-        
+    def fetch_year(year):
+        with pipeline_metrics.attach_stage(stage):
+            return get_articles_by_year(year)
+    
+    with ThreadPoolExecutor(max_workers=FETCH_WORKERS) as executor:
+        year_dfs = list(executor.map(fetch_year, years))
+    
+    all_publications = []
+    scanned_years = []
+    for year, year_df in zip(years, year_dfs):
+        print(f"Year {year}: {len(year_df)} articles")
         if not year_df.empty:
-            # Filter only new articles
-            if existing_dois:
-                year_df['is_new'] = ~year_df['doi'].isin(existing_dois)
-                new_in_year = year_df['is_new'].sum()
-                if new_in_year > 0:
-                    print(f"  -> Found {new_in_year} new articles")
-                    new_count += new_in_year
-                year_df = year_df.drop('is_new', axis=1)
-            
             all_publications.append(year_df)
+            scanned_years.append(year)
+    
+    if not all_publications:
+        return None, []
+    return pd.concat(all_publications, ignore_index=True), scanned_years
+
+def update_publications_incremental(sync_state):
+    """Инкрементальное обновление: только статьи, добавленные или изменённые после watermark"""
+    last_sync = datetime.strptime(sync_state['last_sync'], '%Y/%m/%d')
+    since = (last_sync - timedelta(days=SYNC_OVERLAP_DAYS)).strftime('%Y/%m/%d')
+    print(f"Querying PubMed for records added or revised since {since}...")
     
-    # Combine all
-    if all_publications:
-        all_df = pd.concat(all_publications, ignore_index=True)
+    try:
+        records = fetch_pubmed_updates(since)
+    except Exception as e:
+        print(f"Error fetching updates since {since}: {e}")
+        return None
+    
+    if not records:
+        print("No new or revised articles")
+        return pd.DataFrame()
+    
+    print(f"Found {len(records)} new or revised articles")
+    return articles_to_dataframe(records, verbose=True)
+
+def update_publications_csv(full: bool = False, export_snapshot: bool = True):
+    """Обновить хранилище публикаций (SQLite) и его снимки (Parquet + CSV-экспорт); без снимков вернуть None"""
+    print(f"\n{'='*60}")
+    print(f"Starting publications update: {datetime.now()}")
+    print(f"{'='*60}\n")
+    started_at = datetime.now()
+    
+    with closing(open_publications_db()) as conn:
+        existing_count = conn.execute("SELECT COUNT(*) FROM publications").fetchone()[0]
+        print(f"Found {existing_count} existing publications in {DATA_DB}")
+        
+        sync_state = None if full else load_sync_state(conn)
+        if full:
+            print("Full rescan requested")
+        elif existing_count == 0 or sync_state is None:
+            print("No sync watermark found, falling back to full rescan")
+        
+        scanned_years = []
+        with pipeline_metrics.stage('pubmed'):
+            if existing_count == 0 or sync_state is None:
+                fetched_df, scanned_years = update_publications_full()
+            else:
+                fetched_df = update_publications_incremental(sync_state)
+            pipeline_metrics.count(fetched=0 if fetched_df is None else len(fetched_df))
         
-        # Remove duplicates by DOI
-        all_df = all_df.drop_duplicates(subset=['doi'], keep='first')
+        if ENTREZ_REPLAY_DIR is None and ENTREZ_CACHE_ENABLED:
+            evict_entrez_cache()
         
-        # Save CSV
-        all_df.to_csv(DATA_CSV, index=False)
+        if fetched_df is None:
+            print("No publications found")
+            if not export_snapshot:
+                return None
+            return load_publications() if existing_count else pd.DataFrame()
+        
+        # One transaction: a crash leaves either the previous dataset or the new one
+        with pipeline_metrics.stage('store'), conn:
+            new_count, updated_count = upsert_publications(conn, fetched_df)
+            deleted_count = 0
+            if scanned_years:
+                deleted_count = delete_stale_publications(conn, scanned_years, fetched_df['pmid'].dropna())
+            save_sync_state(conn, started_at)
+        
+        pipeline_metrics.count(new=new_count, updated=updated_count, deleted=deleted_count)
+        changed = new_count or updated_count or deleted_count
+        total = conn.execute("SELECT COUNT(*) FROM publications").fetchone()[0]
         print(f"\n{'='*60}")
-        print(f"Total publications: {len(all_df)}")
+        print(f"Total publications: {total}")
         print(f"New publications added: {new_count}")
-        print(f"Saved to: {DATA_CSV}")
+        print(f"Updated: {updated_count}, removed: {deleted_count}")
+        if not export_snapshot:
+            all_df = None
+            print(f"Saved to: {DATA_DB}")
+        elif changed or not os.path.exists(DATA_PARQUET):
+            with pipeline_metrics.stage('snapshot'):
+                all_df = export_publications_snapshot(conn)
+            print(f"Saved to: {DATA_DB} (snapshot: {DATA_PARQUET}, CSV export: {DATA_CSV})")
+        else:
+            all_df = load_publications()
+            print(f"No changes, {DATA_PARQUET} is up to date")
         print(f"{'='*60}\n")
         
         return all_df
-    else:
-        print("No publications found")
-        return existing_df
 
 # ==================== JSON GENERATION ====================
 def extract_year(date_str):
@@ -224,52 +1079,134 @@ def extract_year(date_str):
     match = re.search(r'(\d{4})', str(date_str))
     return int(match.group(1)) if match else None
 
-def generate_publications_json(df):
-    """Генерировать JSON для frontend"""
-    print("\nGenerating JSON for frontend...")
+def load_related_publications():
+    """Загрузить похожие статьи, посчитанные на этапе UMAP"""
+    if not os.path.exists(RELATED_JSON):
+        return {}
+    with open(RELATED_JSON, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def build_publications_data(df, related=None):
+    """Собрать данные publications.json колоночно: один проход сортировки и группировки по году"""
+    related = related or {}
     
     # Extract years
-    df['year'] = df['date'].apply(extract_year)
-    df = df[df['year'].notna()].copy()
+    years = pd.to_numeric(df['date'].astype(str).str.extract(r'(\d{4})', expand=False), errors='coerce')
+    df = df.assign(year=years)
+    df = df[df['year'].notna()]
+    df = df.assign(year=df['year'].astype(int)).sort_values('year', ascending=False, kind='stable')
     
-    # Group by year
-    publications_by_year = {}
+    columns = pd.DataFrame({
+        'title': df['title'],
+        'authors': df['authors'],
+        'journal': df['journal'],
+        'date': df['date'],
+        'year': df['year'],
+        'abstract': df['abstract'].fillna(''),
+        'doi': df['doi'],
+        'pmid': df['pmid'],
+    })
+    # NaN -> null for the whole frame at once
+    columns = columns.astype(object).where(columns.notna(), None)
+    records = columns.to_dict('records')
     
-    for year in sorted(df['year'].unique(), reverse=True):
-        year_df = df[df['year'] == year].copy()
-        
-        publications = []
-        for _, row in year_df.iterrows():
-            pub = {
-                'title': row['title'],
-                'authors': row['authors'],
-                'journal': row['journal'],
-                'date': row['date'],
-                'year': int(row['year']),
-                'abstract': row['abstract'] if pd.notna(row['abstract']) else '',
-                'doi': row['doi'] if pd.notna(row['doi']) else None,
-                'pmid': row['pmid'] if pd.notna(row['pmid']) else None,
-            }
-            publications.append(pub)
-        
-        publications_by_year[str(int(year))] = publications
+    if related:
+        for record in records:
+            neighbors = related.get(str(record['pmid'])) if record['pmid'] is not None else None
+            if neighbors is not None:
+                record['related'] = neighbors
     
-    # Add metadata
-    output_data = {
+    # Records are sorted by year, so each year is one contiguous run
+    publications_by_year = {
+        str(year): list(group)
+        for year, group in itertools.groupby(records, key=lambda record: record['year'])
+    }
+    
+    return {
         'generated_at': datetime.now().isoformat(),
-        'total_publications': len(df),
-        'years': sorted([int(y) for y in df['year'].unique()], reverse=True),
+        'total_publications': len(records),
+        'years': [int(year) for year in publications_by_year],
         'publications_by_year': publications_by_year
     }
+
+def write_shard(rel_path_stem, payload):
+    """Записать компактный шард с хэшем содержимого в имени; неизменённые шарды не перезаписываются"""
+    data = json.dumps(payload, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    digest = hashlib.sha256(data).hexdigest()[:12]
+    rel_path = f"{rel_path_stem}.{digest}.json"
+    path = os.path.join(PUBLICATIONS_DIR, rel_path)
+    if not os.path.exists(path):
+        write_bytes_atomic(path, data)
+    return {'file': rel_path, 'size': len(data), 'sha256': digest}
+
+def write_publications_shards(output_data):
+    """Записать manifest.json и шарды по годам: записи без аннотаций и аннотации отдельно"""
+    os.makedirs(os.path.join(PUBLICATIONS_DIR, 'abstracts'), exist_ok=True)
+    manifest_path = os.path.join(PUBLICATIONS_DIR, 'manifest.json')
     
-    # Create directory if doesn't exist
-    os.makedirs(os.path.dirname(OUTPUT_JSON), exist_ok=True)
+    # Shards of the previous manifest are kept one more generation for clients that already loaded it
+    keep = set()
+    if os.path.exists(manifest_path):
+        try:
+            with open(manifest_path, 'r', encoding='utf-8') as f:
+                previous = json.load(f)
+            for entry in previous.get('years', []):
+                keep.update({entry['shard']['file'], entry['abstracts']['file']})
+        except (OSError, ValueError, KeyError):
+            pass
     
-    # Save JSON
-    with open(OUTPUT_JSON, 'w', encoding='utf-8') as f:
-        json.dump(output_data, f, ensure_ascii=False, indent=2)
+    years = []
+    for year in output_data['years']:
+        records = output_data['publications_by_year'][str(year)]
+        shard = []
+        for record in records:
+            item = {k: v for k, v in record.items() if k != 'abstract'}
+            item['has_abstract'] = bool(record['abstract'])
+            shard.append(item)
+        # Abstracts are aligned with the year shard by position
+        abstracts = [record['abstract'] for record in records]
+        
+        entry = {
+            'year': year,
+            'count': len(records),
+            'shard': write_shard(str(year), shard),
+            'abstracts': write_shard(f"abstracts/{year}", abstracts),
+        }
+        keep.update({entry['shard']['file'], entry['abstracts']['file']})
+        years.append(entry)
+    
+    manifest = {
+        'generated_at': output_data['generated_at'],
+        'total_publications': output_data['total_publications'],
+        'years': years,
+    }
+    write_bytes_atomic(manifest_path, json.dumps(manifest, ensure_ascii=False, separators=(',', ':')).encode('utf-8'))
     
-    print(f"JSON saved to: {OUTPUT_JSON}")
+    for subdir in ('', 'abstracts'):
+        for entry in os.scandir(os.path.join(PUBLICATIONS_DIR, subdir)):
+            rel_path = f"{subdir}/{entry.name}" if subdir else entry.name
+            if entry.is_file() and entry.name.endswith('.json') and entry.name != 'manifest.json' and rel_path not in keep:
+                os.remove(entry.path)
+    
+    total_size = sum(entry['shard']['size'] for entry in years)
+    print(f"Manifest and {len(years)} year shards ({total_size / 1024:.0f} KB without abstracts) saved to: {PUBLICATIONS_DIR}")
+
+def generate_publications_json(df, monolithic: bool = False):
+    """Генерировать JSON для frontend"""
+    print("\nGenerating JSON for frontend...")
+    
+    output_data = build_publications_data(df, related=load_related_publications())
+    write_publications_shards(output_data)
+    
+    if monolithic:
+        # Create directory if doesn't exist
+        os.makedirs(os.path.dirname(OUTPUT_JSON), exist_ok=True)
+        
+        # Save JSON
+        with open(OUTPUT_JSON, 'w', encoding='utf-8') as f:
+            json.dump(output_data, f, ensure_ascii=False, indent=2)
+        
+        print(f"JSON saved to: {OUTPUT_JSON}")
     return output_data
 
 # ==================== UMAP GENERATION ====================
@@ -290,10 +1227,20 @@ def advanced_text_cleaning(text):
     
     return text.strip()
 
+def load_stopwords(language):
+    """Стоп-слова nltk; корпус скачивается при первом использовании"""
+    from nltk.corpus import stopwords
+    try:
+        return set(stopwords.words(language))
+    except LookupError:
+        import nltk
+        nltk.download('stopwords', quiet=True)
+        return set(stopwords.words(language))
+
 def create_enhanced_stopwords():
     """Создать список стоп-слов"""
-    en_stop = set(stopwords.words("english"))
-    ru_stop = set(stopwords.words("russian"))
+    en_stop = load_stopwords("english")
+    ru_stop = load_stopwords("russian")
     
     academic_stop = {
         'abstract', 'introduction', 'conclusion', 'results', 'discussion',
@@ -307,12 +1254,272 @@ def create_enhanced_stopwords():
     
     return list(en_stop | ru_stop | academic_stop)
 
-def generate_umap_visualization(df):
-    """Генерировать UMAP визуализацию"""
-    print(f"\n{'='*60}")
-    print("Generating UMAP visualization...")
-    print(f"{'='*60}\n")
+def text_hash(text):
+    """Хэш очищенного текста - ключ кэша эмбеддингов"""
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+def embedding_store_paths(model_name):
+    """Пути к матрице эмбеддингов и её индексу для модели"""
+    slug = re.sub(r'[^A-Za-z0-9]+', '-', model_name).strip('-')
+    return (os.path.join(EMBEDDING_CACHE_DIR, f"{slug}.npy"),
+            os.path.join(EMBEDDING_CACHE_DIR, f"{slug}.index.json"))
+
+def load_embedding_store(model_name):
+    """Загрузить кэш эмбеддингов: memory-mapped float16 матрица и список хэшей по строкам"""
+    matrix_path, index_path = embedding_store_paths(model_name)
+    if not (os.path.exists(matrix_path) and os.path.exists(index_path)):
+        return None, []
+    
+    try:
+        with open(index_path, 'r', encoding='utf-8') as f:
+            index = json.load(f)
+        matrix = np.load(matrix_path, mmap_mode='r')
+    except (OSError, ValueError) as e:
+        print(f"Could not read embedding cache for {model_name}: {e}")
+        return None, []
+    
+    # A crash between the two writes leaves them out of sync - start over
+    if index.get('model') != model_name or matrix.shape[0] != len(index.get('hashes', [])):
+        print(f"Embedding cache for {model_name} is inconsistent, rebuilding")
+        return None, []
+    return matrix, index['hashes']
+
+def save_embedding_store(model_name, matrix, hashes):
+    """Атомарно сохранить кэш эмбеддингов"""
+    matrix_path, index_path = embedding_store_paths(model_name)
+    os.makedirs(EMBEDDING_CACHE_DIR, exist_ok=True)
+    
+    tmp_matrix_path = f"{matrix_path}.tmp.npy"
+    np.save(tmp_matrix_path, matrix)
+    os.replace(tmp_matrix_path, matrix_path)
+    
+    tmp_index_path = f"{index_path}.tmp"
+    with open(tmp_index_path, 'w', encoding='utf-8') as f:
+        json.dump({'model': model_name, 'dim': int(matrix.shape[1]), 'hashes': hashes}, f)
+    os.replace(tmp_index_path, index_path)
+
+def encode_texts_remote(texts):
+    """Закодировать тексты через embedding_server.py; None, если сервис недоступен"""
+    if not EMBEDDING_SERVER_URL:
+        return None
+    
+    payload = json.dumps({'model': MODEL_NAME, 'texts': texts}).encode('utf-8')
+    request = urllib.request.Request(
+        f"{EMBEDDING_SERVER_URL.rstrip('/')}/encode",
+        data=payload,
+        headers={'Content-Type': 'application/json'},
+    )
+    try:
+        with urllib.request.urlopen(request, timeout=EMBEDDING_SERVER_TIMEOUT) as response:
+            result = json.load(response)
+    except (URLError, OSError, ValueError) as e:
+        print(f"Embedding server not available ({e}), encoding in-process")
+        return None
+    
+    vectors = np.frombuffer(base64.b64decode(result['embeddings']), dtype=np.float32)
+    print(f"Encoded {len(texts)} texts via embedding server {EMBEDDING_SERVER_URL}")
+    return vectors.reshape(len(texts), result['dim'])
+
+def encode_texts(texts):
+    """Закодировать тексты моделью MODEL_NAME (через сервис, если он запущен)"""
+    with pipeline_metrics.stage('encode_remote'):
+        vectors = encode_texts_remote(texts)
+    if vectors is not None:
+        return vectors
+    
+    with pipeline_metrics.stage('model_load'):
+        from sentence_transformers import SentenceTransformer
+        model = SentenceTransformer(MODEL_NAME)
+    with pipeline_metrics.stage('encode'):
+        return model.encode(
+            texts,
+            show_progress_bar=True,
+            convert_to_numpy=True,
+            normalize_embeddings=True,
+            batch_size=EMBEDDING_BATCH_SIZE
+        )
+
+def get_embeddings(texts):
+    """Получить эмбеддинги документов, кодируя только тексты, которых ещё нет в кэше"""
+    texts = [PASSAGE_PREFIX + t for t in texts]
+    matrix, hashes = load_embedding_store(MODEL_NAME)
+    row_by_hash = {h: i for i, h in enumerate(hashes)}
+    text_hashes = [text_hash(t) for t in texts]
     
+    missing = {}
+    for h, text in zip(text_hashes, texts):
+        if h not in row_by_hash and h not in missing:
+            missing[h] = text
+    cached = sum(h in row_by_hash for h in text_hashes)
+    print(f"Embeddings: {cached} cached, {len(missing)} to encode")
+    pipeline_metrics.count(embedding_cache_hits=cached, encoded=len(missing))
+    
+    if missing:
+        new_vectors = np.asarray(encode_texts(list(missing.values())), dtype=np.float16)
+        if matrix is None or matrix.shape[1] != new_vectors.shape[1]:
+            matrix, hashes = np.empty((0, new_vectors.shape[1]), dtype=np.float16), []
+        matrix = np.concatenate([np.asarray(matrix), new_vectors])
+        hashes = hashes + list(missing.keys())
+        save_embedding_store(MODEL_NAME, matrix, hashes)
+        row_by_hash = {h: i for i, h in enumerate(hashes)}
+    
+    # Edited titles/abstracts leave rows nobody asks for; rewrite the store without them
+    current = set(text_hashes)
+    n_stale = len(hashes) - len(current)
+    if n_stale > EMBEDDING_COMPACT_STALE_FRACTION * len(hashes):
+        keep = [i for i, h in enumerate(hashes) if h in current]
+        print(f"Compacting embedding cache: dropping {n_stale} stale rows")
+        matrix, hashes = np.asarray(matrix[keep]), [hashes[i] for i in keep]
+        save_embedding_store(MODEL_NAME, matrix, hashes)
+        row_by_hash = {h: i for i, h in enumerate(hashes)}
+        pipeline_metrics.count(embedding_rows_compacted=n_stale)
+    
+    embeddings = np.asarray(matrix[[row_by_hash[h] for h in text_hashes]], dtype=np.float32)
+    # Restore unit norm lost to float16 storage
+    embeddings /= np.maximum(np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12)
+    return embeddings
+
+def load_umap_state():
+    """Загрузить сохранённый UMAP reducer и координаты уже размещённых статей"""
+    if not os.path.exists(UMAP_MODEL_PATH):
+        return None
+    try:
+        with open(UMAP_MODEL_PATH, 'rb') as f:
+            state = pickle.load(f)
+    except Exception as e:
+        print(f"Could not load UMAP model {UMAP_MODEL_PATH}: {e}")
+        return None
+    
+    if state.get('model_name') != MODEL_NAME or state.get('umap_params') != UMAP_3D_KW:
+        print("UMAP settings or embedding model changed since last fit")
+        return None
+    return state
+
+def save_umap_state(state):
+    """Атомарно сохранить UMAP reducer"""
+    os.makedirs(os.path.dirname(UMAP_MODEL_PATH), exist_ok=True)
+    tmp_path = f"{UMAP_MODEL_PATH}.tmp"
+    with open(tmp_path, 'wb') as f:
+        pickle.dump(state, f)
+    os.replace(tmp_path, UMAP_MODEL_PATH)
+
+def centroid_drift(embeddings, centroid):
+    """Сдвиг центра облака эмбеддингов: 1 - косинус между центроидами"""
+    current = embeddings.mean(axis=0)
+    denom = np.linalg.norm(current) * np.linalg.norm(centroid)
+    return float(1 - current @ centroid / denom) if denom > 0 else 1.0
+
+def fit_umap_3d(embeddings, hashes):
+    """Полностью обучить UMAP и сохранить reducer"""
+    import umap
+    reducer = umap.UMAP(**UMAP_3D_KW)
+    coords = reducer.fit_transform(embeddings).astype(np.float32)
+    pipeline_metrics.count(umap_fitted=len(hashes))
+    save_umap_state({
+        'model_name': MODEL_NAME,
+        'umap_params': dict(UMAP_3D_KW),
+        'reducer': reducer,
+        'centroid': embeddings.mean(axis=0),
+        'n_fitted': len(hashes),
+        'hashes': list(hashes),
+        'coords': coords,
+    })
+    return coords
+
+def project_umap_3d(embeddings, hashes, refit: bool = False):
+    """3D координаты: сохранённые для известных статей, transform() для новых, refit по порогам"""
+    state = None if refit else load_umap_state()
+    if state is None:
+        print("Fitting UMAP from scratch...")
+        return fit_umap_3d(embeddings, hashes)
+    
+    fitted = set(state['hashes'][:state['n_fitted']])
+    n_unfitted = sum(h not in fitted for h in hashes)
+    new_fraction = n_unfitted / max(state['n_fitted'], 1)
+    drift = centroid_drift(embeddings, state['centroid'])
+    print(f"UMAP: {n_unfitted} papers outside the fitted set ({new_fraction:.1%}), centroid drift {drift:.4f}")
+    
+    if new_fraction > UMAP_REFIT_NEW_FRACTION or drift > UMAP_REFIT_DRIFT:
+        print("Refit threshold crossed, fitting UMAP from scratch...")
+        return fit_umap_3d(embeddings, hashes)
+    
+    row_by_hash = {h: i for i, h in enumerate(state['hashes'])}
+    new_idx = [i for i, h in enumerate(hashes) if h not in row_by_hash]
+    coords = np.empty((len(hashes), state['coords'].shape[1]), dtype=np.float32)
+    for i, h in enumerate(hashes):
+        if h in row_by_hash:
+            coords[i] = state['coords'][row_by_hash[h]]
+    
+    pipeline_metrics.count(umap_reused=len(hashes) - len(new_idx), umap_transformed=len(new_idx))
+    if new_idx:
+        print(f"Placing {len(new_idx)} new papers with the saved UMAP model...")
+        coords[new_idx] = state['reducer'].transform(embeddings[new_idx])
+        state['hashes'] = state['hashes'] + [hashes[i] for i in new_idx]
+        state['coords'] = np.concatenate([state['coords'], coords[new_idx]])
+        save_umap_state(state)
+    return coords
+
+def reduce_embeddings(embeddings):
+    """Понизить размерность эмбеддингов PCA перед кластеризацией; вернуть матрицу и объяснённую дисперсию"""
+    n_components = min(CLUSTER_PCA_COMPONENTS, embeddings.shape[0] - 1, embeddings.shape[1])
+    if n_components <= 0 or n_components >= embeddings.shape[1]:
+        return embeddings, 1.0
+    from sklearn.decomposition import PCA
+    pca = PCA(n_components=n_components, svd_solver='randomized', random_state=RNG_SEED)
+    reduced = pca.fit_transform(embeddings).astype(np.float32)
+    return reduced, float(pca.explained_variance_ratio_.sum())
+
+def score_clustering(features, k, sample_idx):
+    """Обучить mini-batch K-means с k кластерами и посчитать silhouette на выборке"""
+    from sklearn.cluster import MiniBatchKMeans
+    from sklearn.metrics import silhouette_score
+    kmeans = MiniBatchKMeans(n_clusters=k, **KMEANS_KW)
+    labels = kmeans.fit_predict(features)
+    sample_labels = labels[sample_idx]
+    if len(np.unique(sample_labels)) < 2:
+        return k, -1.0, labels
+    return k, float(silhouette_score(features[sample_idx], sample_labels, metric="euclidean")), labels
+
+def cluster_embeddings(embeddings):
+    """Кластеризация, стоимость которой растёт линейно по числу статей.
+    Возвращает метки кластеров и метрики качества выбранного разбиения."""
+    from threadpoolctl import threadpool_limits
+    from sklearn.metrics import calinski_harabasz_score, davies_bouldin_score
+    
+    n = len(embeddings)
+    with pipeline_metrics.stage('pca'):
+        features, explained = reduce_embeddings(embeddings)
+    
+    rng = np.random.default_rng(RNG_SEED)
+    sample_idx = np.sort(rng.choice(n, size=min(n, CLUSTER_SILHOUETTE_SAMPLE), replace=False))
+    candidates = [N_CLUSTERS] if N_CLUSTERS else [k for k in CLUSTER_K_CANDIDATES if k < n]
+    
+    print(f"Scoring k = {', '.join(map(str, candidates))} on {features.shape[1]}-d features "
+          f"(PCA explains {explained:.1%}), silhouette on {len(sample_idx)} papers")
+    with pipeline_metrics.stage('kmeans'):
+        # One BLAS/OpenMP thread per candidate: the candidates themselves use the cores
+        with threadpool_limits(limits=1), ThreadPoolExecutor(max_workers=min(CLUSTER_WORKERS, len(candidates))) as executor:
+            results = list(executor.map(lambda k: score_clustering(features, k, sample_idx), candidates))
+        pipeline_metrics.count(candidates=len(candidates), papers=n)
+    
+    for k, score, _ in results:
+        print(f"  k={k:<3} silhouette {score:.3f}")
+    k, silhouette, labels = max(results, key=lambda result: result[1])
+    
+    quality = {
+        'k': k,
+        'silhouette': silhouette,
+        'silhouette_sample': len(sample_idx),
+        'calinski_harabasz': float(calinski_harabasz_score(features, labels)),
+        'davies_bouldin': float(davies_bouldin_score(features, labels)),
+        'pca_explained_variance': explained,
+    }
+    print(f"Chosen k={k}: silhouette {silhouette:.3f}, Calinski-Harabasz {quality['calinski_harabasz']:.1f}, "
+          f"Davies-Bouldin {quality['davies_bouldin']:.3f}")
+    return labels, quality
+
+def embed_corpus(df):
+    """Отфильтровать статьи с достаточным текстом и посчитать их эмбеддинги"""
     # Clean and prepare data
     df = df.copy()
     df["title_clean"] = df["title"].apply(advanced_text_cleaning)
@@ -323,7 +1530,7 @@ def generate_umap_visualization(df):
     
     if len(df_filtered) < 10:
         print("Not enough data for UMAP visualization")
-        return
+        return None
     
     # Build texts
     texts = (df_filtered["title_clean"] + " " + df_filtered["abstract_clean"]).str.strip().tolist()
@@ -336,27 +1543,53 @@ def generate_umap_visualization(df):
     
     # Generate embeddings
     print("Generating embeddings...")
-    model = SentenceTransformer(MODEL_NAME)
-    embeddings = model.encode(
-        texts,
-        show_progress_bar=True,
-        convert_to_numpy=True,
-        normalize_embeddings=True,
-        batch_size=32
-    )
+    embeddings = get_embeddings(texts)
+    
+    hashes = [text_hash(PASSAGE_PREFIX + t) for t in texts]
+    return df_filtered, texts, embeddings, hashes
+
+def generate_embedding_indexes(df):
+    """Посчитать эмбеддинги и обновить похожие статьи и поисковый индекс"""
+    print(f"\n{'='*60}")
+    print("Updating embeddings, related publications and search index...")
+    print(f"{'='*60}\n")
+    
+    corpus = embed_corpus(df)
+    if corpus is None:
+        return None
+    df_filtered, _, embeddings, hashes = corpus
+    
+    # Related publications and semantic search index
+    with pipeline_metrics.stage('related'):
+        update_related_publications(embeddings, hashes, df_filtered['pmid'].tolist())
+    with pipeline_metrics.stage('search_index'):
+        write_search_index(embeddings, df_filtered['pmid'].tolist())
+    return corpus
+
+def generate_umap_visualization(df, refit_umap: bool = False, corpus=None, write_html: bool = False):
+    """Генерировать данные UMAP визуализации (и Plotly HTML, если write_html)"""
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    
+    print(f"\n{'='*60}")
+    print("Generating UMAP visualization...")
+    print(f"{'='*60}\n")
+    
+    if corpus is None:
+        corpus = embed_corpus(df)
+    if corpus is None:
+        return
+    df_filtered, texts, embeddings, hashes = corpus
     
     # UMAP
     print("Performing UMAP...")
-    reducer_3d = umap.UMAP(**UMAP_3D_KW)
-    embedding_3d = reducer_3d.fit_transform(embeddings)
+    with pipeline_metrics.stage('projection'):
+        embedding_3d = project_umap_3d(embeddings, hashes, refit=refit_umap)
     
     # Clustering
     print("Clustering...")
-    kmeans = KMeans(**KMEANS_KW)
-    labels = kmeans.fit_predict(embeddings)
-    
-    sil = silhouette_score(embeddings, labels, metric="euclidean")
-    print(f"Silhouette score: {sil:.3f}")
+    with pipeline_metrics.stage('clustering'):
+        labels, quality = cluster_embeddings(embeddings)
+    n_clusters, sil = quality['k'], quality['silhouette']
     
     # Generate cluster labels
     stop_words = create_enhanced_stopwords()
@@ -367,14 +1600,15 @@ def generate_umap_visualization(df):
         min_df=2,
         max_df=0.8
     )
-    X = tfidf.fit_transform(texts)
+    with pipeline_metrics.stage('keywords'):
+        X = tfidf.fit_transform(texts)
     vocab = np.array(tfidf.get_feature_names_out())
     
     cluster_keywords = {}
     cluster_labels_for_plot = {}
     cluster_counts = pd.Series(labels).value_counts().sort_index()
     
-    for c in range(N_CLUSTERS):
+    for c in range(n_clusters):
         mask = (labels == c)
         if mask.sum() == 0:
             continue
@@ -397,6 +1631,92 @@ def generate_umap_visualization(df):
     embedding_3d = embedding_3d[keep_idx]
     labels = labels[keep_idx]
     
+    years = df_filtered['year'].to_numpy().astype(int)
+    
+    with pipeline_metrics.stage('payload'):
+        write_umap_payload(df_filtered, embedding_3d, labels, years, cluster_labels_for_plot, cluster_keywords, quality)
+    if write_html:
+        with pipeline_metrics.stage('html'):
+            write_umap_html(df_filtered, embedding_3d, labels, years, n_clusters, cluster_labels_for_plot, sil)
+    
+    # Print cluster report
+    print("\n" + "="*60)
+    print("CLUSTER ANALYSIS REPORT")
+    print("="*60)
+    for c, words in cluster_keywords.items():
+        count = cluster_counts.get(c, 0)
+        pct = count/len(labels)*100 if len(labels) > 0 else 0
+        print(f"\nCluster {c}: {cluster_labels_for_plot[c]}")
+        print(f"Documents: {count} ({pct:.1f}%)")
+        print(f"Keywords: {', '.join(words[:TOP_WORDS_FOR_REPORT])}")
+
+def write_umap_payload(df_filtered, coords, labels, years, cluster_labels, cluster_keywords, quality):
+    """Сохранить точки UMAP для umap.html: один бинарный файл с хэшем в имени и manifest.json.
+    Подписи точек не дублируются - viewer берёт их из шардов publications по PMID."""
+    os.makedirs(UMAP_DATA_DIR, exist_ok=True)
+    manifest_path = os.path.join(UMAP_DATA_DIR, 'manifest.json')
+    pmids = pd.to_numeric(df_filtered['pmid'], errors='coerce').fillna(0).to_numpy()
+    
+    # Widest type first so every array starts at an offset aligned to its element size
+    arrays = [
+        ('coords', np.ascontiguousarray(coords, dtype='<f4')),
+        ('pmids', pmids.astype('<u4')),
+        ('years', years.astype('<u2')),
+        ('clusters', labels.astype('u1')),
+    ]
+    layout = {}
+    offset = 0
+    for name, array in arrays:
+        layout[name] = {'dtype': array.dtype.str.lstrip('<>|'), 'offset': offset, 'length': int(array.size)}
+        offset += array.nbytes
+    data = b"".join(array.tobytes() for _, array in arrays)
+    digest = hashlib.sha256(data).hexdigest()[:12]
+    filename = f"points.{digest}.bin"
+    if not os.path.exists(os.path.join(UMAP_DATA_DIR, filename)):
+        write_bytes_atomic(os.path.join(UMAP_DATA_DIR, filename), data)
+    
+    # The previous points file is kept one more generation for viewers that already loaded its manifest
+    keep = {filename}
+    try:
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            keep.add(json.load(f)['file'])
+    except (OSError, ValueError, KeyError):
+        pass
+    
+    clusters = []
+    for c in sorted(cluster_labels):
+        mask = labels == c
+        if not mask.any():
+            continue
+        clusters.append({
+            'id': int(c),
+            'label': cluster_labels[c],
+            'keywords': cluster_keywords[c],
+            'count': int(mask.sum()),
+            'center': [round(float(v), 4) for v in coords[mask].mean(axis=0)],
+        })
+    manifest = {
+        'generated_at': datetime.now().isoformat(),
+        'count': len(pmids),
+        'file': filename,
+        'size': len(data),
+        'arrays': layout,
+        'year_min': int(years.min()),
+        'year_max': int(years.max()),
+        'quality': {key: round(value, 4) if isinstance(value, float) else value for key, value in quality.items()},
+        'clusters': clusters,
+    }
+    write_bytes_atomic(manifest_path, json.dumps(manifest, ensure_ascii=False, separators=(',', ':')).encode('utf-8'))
+    
+    for entry in os.scandir(UMAP_DATA_DIR):
+        if entry.is_file() and entry.name.startswith('points.') and entry.name.endswith('.bin') and entry.name not in keep:
+            os.remove(entry.path)
+    print(f"UMAP data for {len(pmids)} papers ({len(data) / 1024:.0f} KB) saved to: {UMAP_DATA_DIR}")
+
+def write_umap_html(df_filtered, embedding_3d, labels, years, n_clusters, cluster_labels_for_plot, sil):
+    """Сохранить UMAP визуализацию монолитным Plotly HTML (все точки и подписи внутри файла)"""
+    import plotly.graph_objects as go
+    
     # Prepare hover texts
     hover_texts = []
     for i, row in df_filtered.iterrows():
@@ -412,13 +1732,12 @@ def generate_umap_visualization(df):
         hover_text = f"<b>Title:</b> {title}<br><b>Abstract:</b> {abstract}{year_str}{url_info}"
         hover_texts.append(hover_text)
     
-    years = df_filtered['year'].to_numpy().astype(int)
     year_min, year_max = int(years.min()), int(years.max())
     
     # Create 3D plot
     fig = go.Figure()
     
-    for c in range(N_CLUSTERS):
+    for c in range(n_clusters):
         mask = (labels == c)
         if mask.sum() == 0:
             continue
@@ -457,7 +1776,7 @@ def generate_umap_visualization(df):
         ))
     
     # Add cluster centers
-    for c in range(N_CLUSTERS):
+    for c in range(n_clusters):
         mask = (labels == c)
         if mask.sum() == 0:
             continue
@@ -492,7 +1811,7 @@ def generate_umap_visualization(df):
     fig.update_layout(
         title={
             'text': (f"<b>3D UMAP Research Clustering</b><br>"
-                     f"<sub>{N_CLUSTERS} Clusters | {len(df_filtered)} Publications | "
+                     f"<sub>{n_clusters} Clusters | {len(df_filtered)} Publications | "
                      f"Years: {year_min}–{year_max} | Silhouette: {sil:.3f}</sub>"),
             'x': 0.5,
             'xanchor': 'center',
@@ -577,47 +1896,264 @@ def generate_umap_visualization(df):
         include_plotlyjs='cdn'
     )
     print(f"UMAP visualization saved to: {OUTPUT_UMAP}")
+
+# ==================== RELATED PUBLICATIONS ====================
+def exact_neighbors(embeddings, k: int):
+    """Точные k ближайших соседей по косинусу, блоками по RELATED_BLOCK_SIZE строк"""
+    n = len(embeddings)
+    neighbors = np.empty((n, k), dtype=np.int64)
+    for start in range(0, n, RELATED_BLOCK_SIZE):
+        block = embeddings[start:start + RELATED_BLOCK_SIZE] @ embeddings.T
+        rows = np.arange(len(block))
+        block[rows, start + rows] = -np.inf
+        top = np.argpartition(-block, k - 1, axis=1)[:, :k]
+        order = np.argsort(-block[rows[:, None], top], axis=1)
+        neighbors[start:start + len(block)] = top[rows[:, None], order]
+    return neighbors
+
+def load_related_index():
+    """Загрузить сохранённый NN-descent индекс"""
+    if not os.path.exists(RELATED_INDEX_PATH):
+        return None
+    try:
+        with open(RELATED_INDEX_PATH, 'rb') as f:
+            state = pickle.load(f)
+    except Exception as e:
+        print(f"Could not load related index {RELATED_INDEX_PATH}: {e}")
+        return None
+    if state.get('model_name') != MODEL_NAME or state.get('n_neighbors') != RELATED_TOP_K * 2 + 1:
+        return None
+    return state
+
+def save_related_index(state):
+    """Атомарно сохранить NN-descent индекс"""
+    os.makedirs(os.path.dirname(RELATED_INDEX_PATH), exist_ok=True)
+    tmp_path = f"{RELATED_INDEX_PATH}.tmp"
+    with open(tmp_path, 'wb') as f:
+        pickle.dump(state, f)
+    os.replace(tmp_path, RELATED_INDEX_PATH)
+
+def approximate_neighbors(embeddings, hashes):
+    """Соседи из NN-descent индекса, дополняемого новыми статьями без полной перестройки.
+    Возвращает для каждой строки список хэшей соседей (включая устаревшие строки индекса)."""
+    state = load_related_index()
+    if state is not None:
+        # Rows of edited/removed papers stay in the graph and crowd out real neighbors
+        current = set(hashes)
+        n_stale = sum(h not in current for h in state['hashes'])
+        if n_stale > RELATED_REBUILD_STALE_FRACTION * len(state['hashes']):
+            print(f"{n_stale} stale papers in the NN-descent index, rebuilding it")
+            state = None
+    if state is None:
+        from pynndescent import NNDescent
+        print(f"Building NN-descent index over {len(hashes)} papers...")
+        index = NNDescent(embeddings, metric="cosine", n_neighbors=RELATED_TOP_K * 2 + 1,
+                          random_state=RNG_SEED)
+        state = {'model_name': MODEL_NAME, 'n_neighbors': RELATED_TOP_K * 2 + 1,
+                 'index': index, 'hashes': list(hashes)}
+    else:
+        known = set(state['hashes'])
+        fresh = [i for i, h in enumerate(hashes) if h not in known]
+        if fresh:
+            print(f"Adding {len(fresh)} papers to the NN-descent index...")
+            state['index'].update(xs_fresh=embeddings[fresh])
+            state['hashes'] = state['hashes'] + [hashes[i] for i in fresh]
+    save_related_index(state)
     
-    # Print cluster report
-    print("\n" + "="*60)
-    print("CLUSTER ANALYSIS REPORT")
-    print("="*60)
-    for c, words in cluster_keywords.items():
-        count = cluster_counts.get(c, 0)
-        pct = count/len(labels)*100 if len(labels) > 0 else 0
-        print(f"\nCluster {c}: {cluster_labels_for_plot[c]}")
-        print(f"Documents: {count} ({pct:.1f}%)")
-        print(f"Keywords: {', '.join(words[:TOP_WORDS_FOR_REPORT])}")
+    row_by_hash = {h: i for i, h in enumerate(state['hashes'])}
+    graph, _ = state['index'].neighbor_graph
+    return [[state['hashes'][j] for j in graph[row_by_hash[h]] if j >= 0] for h in hashes]
+
+def update_related_publications(embeddings, hashes, pmids):
+    """Посчитать top-k похожих статей для каждой публикации и сохранить в RELATED_JSON"""
+    print("Finding related publications...")
+    pmid_by_hash = {h: str(p) for h, p in zip(hashes, pmids) if pd.notna(p)}
+    
+    if len(hashes) <= RELATED_EXACT_MAX:
+        k = min(RELATED_TOP_K * 2, len(hashes) - 1)
+        neighbor_hashes = [[hashes[j] for j in row] for row in exact_neighbors(embeddings, k)]
+    else:
+        neighbor_hashes = approximate_neighbors(embeddings, hashes)
+    
+    related = {}
+    for h, candidates in zip(hashes, neighbor_hashes):
+        pmid = pmid_by_hash.get(h)
+        if pmid is None:
+            continue
+        # Drop the paper itself, duplicates and rows no longer in the corpus
+        seen = {pmid}
+        neighbors = []
+        for candidate in candidates:
+            other = pmid_by_hash.get(candidate)
+            if other is not None and other not in seen:
+                seen.add(other)
+                neighbors.append(other)
+        related[pmid] = neighbors[:RELATED_TOP_K]
+    
+    tmp_path = f"{RELATED_JSON}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(related, f, separators=(',', ':'))
+    os.replace(tmp_path, RELATED_JSON)
+    print(f"Related publications for {len(related)} papers saved to: {RELATED_JSON}")
+    return related
+
+# ==================== SEMANTIC SEARCH ====================
+def quantize_int8(embeddings):
+    """Симметричная int8 квантизация по строкам: v ~ q * scale"""
+    scales = np.abs(embeddings).max(axis=1) / 127.0
+    scales[scales == 0] = 1.0
+    quantized = np.round(embeddings / scales[:, None]).astype(np.int8)
+    return quantized, scales.astype(np.float32)
+
+def write_search_index(embeddings, pmids):
+    """Сохранить индекс семантического поиска: int8 матрица, масштабы строк и список PMID"""
+    keep = [i for i, pmid in enumerate(pmids) if pd.notna(pmid)]
+    quantized, scales = quantize_int8(embeddings[keep])
+    os.makedirs(SEARCH_INDEX_DIR, exist_ok=True)
+    
+    files = {'embeddings.i8': quantized.tobytes(), 'scales.f32': scales.tobytes()}
+    for name, data in files.items():
+        tmp_path = os.path.join(SEARCH_INDEX_DIR, f"{name}.tmp")
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, os.path.join(SEARCH_INDEX_DIR, name))
+    
+    # index.json is written last and names the files, so readers never see a mismatched pair.
+    # No timestamp: pipeline.py fingerprints this directory, and an unchanged index must not rerun umap
+    meta = {
+        'model': MODEL_NAME,
+        'query_prefix': QUERY_PREFIX,
+        'count': len(keep),
+        'dim': int(quantized.shape[1]),
+        'embeddings': 'embeddings.i8',
+        'scales': 'scales.f32',
+        'pmids': [str(pmids[i]) for i in keep],
+    }
+    tmp_path = os.path.join(SEARCH_INDEX_DIR, "index.json.tmp")
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(meta, f, separators=(',', ':'))
+    os.replace(tmp_path, os.path.join(SEARCH_INDEX_DIR, "index.json"))
+    print(f"Search index for {len(keep)} papers saved to: {SEARCH_INDEX_DIR}")
+
+def load_search_index(index_dir=SEARCH_INDEX_DIR):
+    """Загрузить индекс поиска: метаданные и деквантизованная float32 матрица"""
+    with open(os.path.join(index_dir, "index.json"), 'r', encoding='utf-8') as f:
+        meta = json.load(f)
+    quantized = np.fromfile(os.path.join(index_dir, meta['embeddings']), dtype=np.int8)
+    scales = np.fromfile(os.path.join(index_dir, meta['scales']), dtype=np.float32)
+    matrix = quantized.reshape(meta['count'], meta['dim']).astype(np.float32) * scales[:, None]
+    return meta, matrix
 
 # ==================== MAIN ====================
-def main():
+def add_fetch_arguments(parser):
+    """Параметры этапа fetch"""
+    parser.add_argument('--full', action='store_true',
+                        help=f"rescan PubMed year by year from {FIRST_YEAR} instead of an incremental sync")
+    parser.add_argument('--no-cache', action='store_true',
+                        help=f"do not read or write the Entrez response cache in {ENTREZ_CACHE_DIR}")
+    parser.add_argument('--replay', nargs='?', const=ENTREZ_CACHE_DIR, metavar='DIR',
+                        help="serve all Entrez calls from recorded XML (default: the response cache), without network")
+
+def add_json_arguments(parser):
+    """Параметры этапа json"""
+    parser.add_argument('--monolithic', action='store_true',
+                        help=f"also write the single-file {OUTPUT_JSON} next to the sharded output")
+
+def add_umap_arguments(parser):
+    """Параметры этапа umap"""
+    parser.add_argument('--refit-umap', action='store_true',
+                        help="refit the 3D UMAP projection instead of placing new papers with the saved model")
+    parser.add_argument('--umap-html', action='store_true',
+                        help=f"also write the self-contained Plotly page {OUTPUT_UMAP} next to {UMAP_DATA_DIR}")
+
+def parse_args(argv=None):
+    """Разобрать аргументы командной строки"""
+    parser = argparse.ArgumentParser(description="Update publications data, JSON and UMAP")
+    add_fetch_arguments(parser)
+    add_json_arguments(parser)
+    add_umap_arguments(parser)
+    
+    subparsers = parser.add_subparsers(dest='command', metavar='{fetch,json,umap}',
+                                       help="run a single stage (default: fetch, then umap, then json)")
+    commands = [
+        ('fetch', f"update {DATA_DB} from PubMed and export {DATA_PARQUET} / {DATA_CSV}", add_fetch_arguments),
+        ('json', f"regenerate {PUBLICATIONS_DIR} from {DATA_PARQUET} (no PubMed, no models)", add_json_arguments),
+        ('umap', f"update embeddings, related publications, search index and {UMAP_DATA_DIR}", add_umap_arguments),
+    ]
+    for name, help_text, add_arguments in commands:
+        # SUPPRESS keeps the top-level defaults when an option is only given before the command
+        add_arguments(subparsers.add_parser(name, help=help_text, argument_default=argparse.SUPPRESS))
+    return parser.parse_args(argv)
+
+def run_fetch_stage(args):
+    """Этап fetch: PubMed -> хранилище и его снимки"""
+    configure_entrez_cache(enabled=not args.no_cache, replay_dir=args.replay)
+    with pipeline_metrics.stage('fetch'):
+        return update_publications_csv(full=args.full)
+
+def run_umap_stage(args):
+    """Этап umap: эмбеддинги, похожие статьи, поисковый индекс и UMAP визуализация"""
+    umap_df = load_publications(UMAP_COLUMNS)
+    with pipeline_metrics.stage('embeddings'):
+        corpus = generate_embedding_indexes(umap_df)
+    with pipeline_metrics.stage('umap'):
+        generate_umap_visualization(umap_df, refit_umap=args.refit_umap, corpus=corpus, write_html=args.umap_html)
+
+def run_json_stage(args):
+    """Этап json: шарды publications.json из снимка хранилища"""
+    with pipeline_metrics.stage('json'):
+        output_data = generate_publications_json(load_publications(JSON_COLUMNS), monolithic=args.monolithic)
+        pipeline_metrics.count(publications=output_data['total_publications'])
+
+def main(argv=None):
     """Главная функция"""
+    args = parse_args(argv)
     print("\n" + "="*70)
     print(" PUBLICATIONS BACKEND UPDATE SCRIPT ")
     print("="*70)
     
-    # 1. Update publications CSV
-    df = update_publications_csv()
-    
-    if df.empty:
-        print("No publications to process")
-        return
-    
-    # 2. Generate JSON for frontend
-    generate_publications_json(df)
+    # load_publications() builds the Parquet snapshot from the store or the committed CSV offline
+    if args.command in ('json', 'umap') and not publications_exist():
+        print(f"No publications data ({DATA_DB}, {DATA_PARQUET} or {DATA_CSV}), run the fetch stage first")
+        return 1
     
-    # 3. Generate UMAP
-    generate_umap_visualization(df)
+    with pipeline_metrics.run('publications'):
+        if args.command is None:
+            # 1. Update publications CSV
+            df = run_fetch_stage(args)
+            if df.empty:
+                print("No publications to process")
+                return 0
+            del df
+            
+            # 2. Embeddings, related publications (used by the JSON) and UMAP
+            run_umap_stage(args)
+            
+            # 3. Generate JSON for frontend
+            run_json_stage(args)
+        elif args.command == 'fetch':
+            run_fetch_stage(args)
+        elif args.command == 'umap':
+            run_umap_stage(args)
+        else:
+            run_json_stage(args)
     
+    generated = {
+        'fetch': [DATA_DB, DATA_PARQUET, DATA_CSV],
+        'umap': [f"{UMAP_DATA_DIR}/", RELATED_JSON, f"{SEARCH_INDEX_DIR}/"] + ([OUTPUT_UMAP] if args.umap_html else []),
+        'json': [f"{PUBLICATIONS_DIR}/manifest.json"] + ([OUTPUT_JSON] if args.monolithic else []),
+    }
     print("\n" + "="*70)
     print(" UPDATE COMPLETE ")
     print("="*70)
     print(f"\nGenerated files:")
-    print(f"  - {DATA_CSV}")
-    print(f"  - {OUTPUT_JSON}")
-    print(f"  - {OUTPUT_UMAP}")
-    print(f"\nFrontend will automatically load data from {OUTPUT_JSON}")
+    for command in ('fetch', 'json', 'umap'):
+        if args.command in (None, command):
+            for path in generated[command]:
+                print(f"  - {path}")
+    print(f"\nFrontend will automatically load data from {PUBLICATIONS_DIR}/manifest.json")
     print()
+    return 0
 
 if __name__ == "__main__":
-    main()
+    raise SystemExit(main())
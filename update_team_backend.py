@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+Backend скрипт для генерации team.json из каталогов frontend/public/data/team
+Запуск: python update_team_backend.py
+"""
+
+import os
+import json
+import hashlib
+from datetime import datetime
+import pipeline_metrics
+from backend_utils import write_json_atomic
+
+# CONFIGURATION
+TEAM_DIR = "frontend/public/data/team"  # <category>/index.json + <member>.txt + <member>.jpg
+OUTPUT_JSON = "frontend/public/team.json"  # Выходной JSON файл
+TEAM_MANIFEST = ".cache/team_manifest.json"  # Хэш/mtime и распарсенная анкета каждого участника
+PHOTO_EXTENSION = '.jpg'
+
+# Display order and section titles of the Team page
+CATEGORIES = [
+    {'key': 'principal-investigator', 'title': 'Principal Investigator'},
+    {'key': 'instructors', 'title': 'Instructors'},
+    {'key': 'postdocs', 'title': 'Postdocs'},
+    {'key': 'research-fellows', 'title': 'Research Fellows'},
+    {'key': 'phd-students', 'title': 'PhD Students'},
+    {'key': 'masters-students', 'title': 'Masters Students'},
+    {'key': 'administrative-staff', 'title': 'Administrative Staff'},
+]
+
+def parse_member_file(content):
+    """
+    Распарсить анкету участника
+    Формат: блоки через пустую строку - имя, должность, интересы, Google Scholar
+    """
+    blocks = content.replace('\r\n', '\n').strip().split('\n\n')
+    blocks += [''] * (4 - len(blocks))
+    return {
+        'name': blocks[0],
+        'title': blocks[1],
+        'interests': blocks[2],
+        'scholar': blocks[3],
+    }
+
+def load_team_manifest():
+    """Загрузить манифест распарсенных анкет"""
+    try:
+        with open(TEAM_MANIFEST, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def read_member(filepath, cached):
+    """Анкета участника из манифеста, если файл не менялся, иначе прочитать заново"""
+    stat = os.stat(filepath)
+    if cached and cached['mtime_ns'] == stat.st_mtime_ns and cached['size'] == stat.st_size:
+        return cached, False
+
+    with open(filepath, 'rb') as f:
+        raw = f.read()
+    sha256 = hashlib.sha256(raw).hexdigest()
+    if cached and cached['sha256'] == sha256:
+        return dict(cached, mtime_ns=stat.st_mtime_ns), False
+
+    member = parse_member_file(raw.decode('utf-8'))
+    return dict(member=member, sha256=sha256, mtime_ns=stat.st_mtime_ns, size=stat.st_size), True
+
+def scan_category(category_dir):
+    """Порядок анкет из index.json и фотографии категории за один проход os.scandir"""
+    with open(os.path.join(category_dir, 'index.json'), 'r', encoding='utf-8') as f:
+        filenames = json.load(f)
+    with os.scandir(category_dir) as entries:
+        photos = {entry.name for entry in entries if entry.name.endswith(PHOTO_EXTENSION)}
+    return filenames, photos
+
+def attach_photo_variants(members):
+    """Добавить размеры и srcset адаптивных копий фотографий (нужен Pillow)"""
+    try:
+        from image_derivatives import build_image_variants
+    except ImportError:
+        print("Pillow is not installed, team photos are served without resized copies")
+        return
+
+    variants = build_image_variants([member['photo'] for member in members if 'photo' in member])
+    for member in members:
+        variant = variants.get(member.get('photo'))
+        if variant:
+            member['photo_width'] = variant['width']
+            member['photo_height'] = variant['height']
+            member['photo_srcset'] = variant['srcset']
+
+def generate_team_json():
+    """Генерировать team.json из анкет участников"""
+    print(f"\n{'='*60}")
+    print(f"Generating team.json from {TEAM_DIR}")
+    print(f"{'='*60}\n")
+
+    cached_members = load_team_manifest()
+    members_manifest = {}
+    categories = []
+    all_members = []
+    parsed = 0
+
+    for category in CATEGORIES:
+        category_dir = os.path.join(TEAM_DIR, category['key'])
+        try:
+            filenames, photos = scan_category(category_dir)
+        except (OSError, ValueError) as e:
+            print(f"  Warning: Could not read {category_dir}: {e}")
+            filenames, photos = [], set()
+
+        members = []
+        for filename in filenames:
+            filepath = os.path.join(category_dir, filename)
+            key = f"{category['key']}/{filename}"
+            try:
+                entry, changed = read_member(filepath, cached_members.get(key))
+            except (OSError, UnicodeDecodeError) as e:
+                print(f"  Warning: Could not read {filepath}: {e}")
+                continue
+            members_manifest[key] = entry
+            parsed += changed
+
+            member = dict(entry['member'])
+            photo = filename.replace('.txt', PHOTO_EXTENSION)
+            if photo in photos:
+                member['photo'] = f"/data/team/{category['key']}/{photo}"
+            members.append(member)
+
+        all_members.extend(members)
+        categories.append({'key': category['key'], 'title': category['title'], 'members': members})
+
+    print(f"Reusing {len(members_manifest) - parsed} cached bios, parsing {parsed}")
+    pipeline_metrics.count(members=len(all_members), cache_hits=len(members_manifest) - parsed, parsed=parsed)
+    write_json_atomic(TEAM_MANIFEST, members_manifest, indent=None)
+    with pipeline_metrics.stage('photos'):
+        attach_photo_variants(all_members)
+
+    # Skip the write (and keep generated_at) when nothing the page shows has changed
+    content_hash = hashlib.sha256(
+        json.dumps(categories, ensure_ascii=False, sort_keys=True).encode('utf-8')
+    ).hexdigest()[:16]
+    try:
+        with open(OUTPUT_JSON, 'r', encoding='utf-8') as f:
+            if json.load(f).get('hash') == content_hash:
+                print(f"{OUTPUT_JSON} is up to date")
+                return
+    except (OSError, ValueError):
+        pass
+
+    output_data = {
+        'generated_at': datetime.now().isoformat(),
+        'hash': content_hash,
+        'total_members': len(all_members),
+        'categories': categories,
+    }
+    write_json_atomic(OUTPUT_JSON, output_data, indent=None, separators=(',', ':'))
+
+    print(f"\n{'='*60}")
+    print(f"Team JSON generated successfully!")
+    print(f"{'='*60}")
+    print(f"Total members: {len(all_members)}")
+    print(f"Output file: {OUTPUT_JSON}")
+    print()
+
+def main():
+    """Главная функция"""
+    print("\n" + "="*70)
+    print(" TEAM BACKEND UPDATE SCRIPT ")
+    print("="*70)
+
+    with pipeline_metrics.run('team'), pipeline_metrics.stage('json'):
+        generate_team_json()
+
+    print("\n" + "="*70)
+    print(" UPDATE COMPLETE ")
+    print("="*70)
+    print(f"\nGenerated file:")
+    print(f"  - {OUTPUT_JSON}")
+    print(f"\nFrontend will automatically load data from {OUTPUT_JSON}")
+    print()
+
+if __name__ == "__main__":
+    main()